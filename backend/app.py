@@ -1,7 +1,7 @@
 # backend/app.py
 import os
 import sys
-from flask import Flask, send_from_directory, jsonify
+from flask import jsonify
 from dotenv import load_dotenv  # <- AGREGAR ESTE IMPORT
 
 # ✅ FORZAR RECARGA COMPLETA DEL .env
@@ -18,48 +18,16 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 src_dir = os.path.join(current_dir, 'src')
 sys.path.insert(0, src_dir)
 
-from models.user import db
-from models.event import Event, Category, UserSettings
-from routes.auth import auth_bp, init_oauth
-from routes.events import events_bp
-from routes.telegram import telegram_bp
-from telegram_bot import init_telegram_bot
-from scheduler import init_scheduler
+from app_factory import create_app, shutdown_app
 
-app = Flask(__name__, static_folder=os.path.join(src_dir, 'static'))
-app.config['SECRET_KEY'] = 'clave-temporal-para-pruebas-123456'
-
-# Configurar CORS
-from flask_cors import CORS
-CORS(app, origins="*")
-
-# Configurar OAuth
-google = init_oauth(app)
-
-# Configurar bot de Telegram
-telegram_token = os.environ.get('TELEGRAM_BOT_TOKEN', 'test')
-if telegram_token and telegram_token != 'test':
-    telegram_bot = init_telegram_bot(telegram_token, app.app_context)
-else:
-    telegram_bot = None
-    print("⚠️  Telegram bot token no configurado")
-
-# Configurar scheduler
-scheduler = init_scheduler(app.app_context)
-
-# Configurar base de datos
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(src_dir, 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Crear tablas
-with app.app_context():
-    db.create_all()
-
-# Registrar blueprints
-app.register_blueprint(auth_bp, url_prefix='/auth')
-app.register_blueprint(events_bp, url_prefix='/api')
-app.register_blueprint(telegram_bp, url_prefix='/api')
+# Desarrollo: un solo proceso con web, bot de Telegram y scheduler (rol 'all').
+# En producción usar wsgi.py para los workers web y un proceso aparte para
+# el bot y el scheduler (ver app_factory.py).
+app = create_app('all', 'development', {
+    'SECRET_KEY': 'clave-temporal-para-pruebas-123456',
+    'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(src_dir, 'database', 'app.db')}",
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+})
 
 @app.route('/api/debug/oauth-setup')
 def debug_oauth_setup():
@@ -114,33 +82,6 @@ def privacy():
 def terms():
     return "Términos de servicio - Desarrollo"
 
-# Endpoint para obtener estado del scheduler
-@app.route('/api/scheduler/status')
-def scheduler_status():
-    from scheduler import get_scheduler
-    scheduler = get_scheduler()
-    if scheduler:
-        return scheduler.get_scheduler_status()
-    else:
-        return {'error': 'Scheduler not initialized'}, 500
-
-# Ruta que captura todo - DEBE SER LA ÚLTIMA
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
-
 if __name__ == '__main__':
     try:
         # ✅ FIX: Deshabilitar el reloader de Flask para evitar el conflicto 
@@ -152,12 +93,6 @@ if __name__ == '__main__':
             use_reloader=False
         )
     except KeyboardInterrupt:
-        # El bloque KeyboardInterrupt se ve bien para la limpieza.
-        if scheduler:
-            scheduler.shutdown()
-        if telegram_bot:
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(telegram_bot.stop_bot())
-            loop.close()
\ No newline at end of file
+        pass
+    finally:
+        shutdown_app(app)
@@ -0,0 +1,113 @@
+# backend/benchmarks/bench_event_reads.py
+"""Comparar la serialización de listados: Event.to_dict() frente a event_reads.
+
+Uso (desde backend/):
+    python benchmarks/bench_event_reads.py --events 10000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+sys.path.insert(0, src_dir)
+
+from flask import Flask
+from models.user import db, User
+from models.event import Event, Category
+from event_reads import list_event_dicts
+
+
+def build_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(user_count, events_per_user, categories_per_user=8, seed_value=42):
+    rng = random.Random(seed_value)
+    base = datetime(2024, 1, 1, 8, 0)
+
+    for user_index in range(user_count):
+        user = User(google_id=f'bench-{user_index}', email=f'bench{user_index}@example.com', name=f'Bench {user_index}')
+        db.session.add(user)
+        db.session.flush()
+
+        categories = [
+            Category(user_id=user.id, name=f'Categoría {i}', color='#3498db')
+            for i in range(categories_per_user)
+        ]
+        db.session.add_all(categories)
+        db.session.flush()
+
+        events = []
+        for i in range(events_per_user):
+            start = base + timedelta(minutes=30 * i + rng.randrange(0, 30))
+            events.append(Event(
+                user_id=user.id,
+                title=f'Evento {i}',
+                description='Descripción de prueba' if i % 3 else None,
+                start_time=start,
+                end_time=start + timedelta(minutes=rng.choice((30, 60, 90))),
+                category_id=rng.choice(categories).id if i % 5 else None,
+                reminder_minutes=30,
+                is_active=True
+            ))
+        db.session.add_all(events)
+    db.session.commit()
+
+
+def orm_path(user_id):
+    events = Event.query.filter_by(user_id=user_id, is_active=True).order_by(Event.start_time).all()
+    return [event.to_dict() for event in events]
+
+
+def core_path(user_id):
+    return list_event_dicts(user_id)
+
+
+def measure(func, user_id, repeat):
+    timings = []
+    payload = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        payload = json.dumps({'events': func(user_id)})
+        timings.append(time.perf_counter() - started)
+        db.session.remove()
+    return min(timings), sorted(timings)[len(timings) // 2], len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=10000, help='eventos del usuario medido')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            seed(1, args.events)
+            user_id = User.query.first().id
+
+            assert orm_path(user_id) == core_path(user_id), 'Los dos caminos deben producir el mismo JSON'
+
+            orm_best, orm_median, size = measure(orm_path, user_id, args.repeat)
+            core_best, core_median, _ = measure(core_path, user_id, args.repeat)
+
+    print(f"Eventos: {args.events}  |  Respuesta: {size / 1024:.0f} KiB")
+    print(f"to_dict (ORM):     mejor {orm_best * 1000:8.1f} ms  mediana {orm_median * 1000:8.1f} ms")
+    print(f"event_reads (Core): mejor {core_best * 1000:8.1f} ms  mediana {core_median * 1000:8.1f} ms")
+    print(f"Aceleración: x{orm_median / core_median:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+# backend/benchmarks/bench_hot_paths.py
+"""Benchmarks de los caminos calientes con datos sintéticos reproducibles.
+
+Mide el listado de la API, los jobs del scheduler y los comandos del bot
+(con un bot falso: no se conecta a Telegram) y guarda los resultados en JSON
+para comparar entre commits.
+
+Uso (desde backend/):
+    python benchmarks/bench_hot_paths.py --users 50 --events 200
+    python benchmarks/bench_hot_paths.py --compare benchmarks/results/abc1234.json
+    python benchmarks/bench_hot_paths.py --only events_list,bot_today --repeat 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+sys.path.insert(0, src_dir)
+sys.path.insert(0, current_dir)
+
+# Sin token real: ni el bot ni los envíos tocan la red
+os.environ['TELEGRAM_BOT_TOKEN'] = ''
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from app_factory import create_app
+from models.user import db
+from migrations import run_migrations
+from cache import cache
+from interval_index import event_index
+from query_stats import query_scope
+from clock import SimulatedClock, set_clock
+import telegram_bot as telegram_bot_module
+from scheduler import NotificationScheduler
+from datagen import chat_id_for, seed_database
+
+RESULTS_DIR = os.path.join(current_dir, 'results')
+
+# Los avisos de N+1 de los propios jobs ensuciarían la salida; el número de
+# consultas queda en los resultados
+logging.getLogger('query_stats').setLevel(logging.ERROR)
+
+# Mensajes de texto libre que el bot convierte en eventos
+PARSE_MESSAGES = (
+    'mañana a las 15:00',
+    'viernes a las 10:00',
+    'hoy a las 18:30',
+    '3 de diciembre a las 9:00',
+)
+
+
+class FakeBot:
+    """Sustituye al bot de Telegram: registra los envíos en lugar de hacerlos"""
+
+    def __init__(self):
+        self.reminders = 0
+        self.summaries = 0
+
+    async def send_reminder(self, chat_id, event, timezone='UTC'):
+        self.reminders += 1
+
+    async def send_reminder_digest(self, chat_id, events, timezone='UTC'):
+        self.reminders += len(events)
+
+    async def send_daily_summary(self, chat_id, events, timezone='UTC'):
+        self.summaries += 1
+
+
+class FakeMessage:
+    def __init__(self, text=None):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def fake_update(chat_id, text=None):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=int(chat_id)), message=FakeMessage(text))
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=current_dir,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Suite:
+    def __init__(self, args, workdir):
+        self.args = args
+        # Reloj fijo: los recordatorios generados como vencidos lo siguen
+        # estando durante todo el benchmark
+        self.clock = SimulatedClock(datetime.utcnow().replace(second=0, microsecond=0))
+        set_clock(self.clock)
+        self.template = os.path.join(workdir, 'template.db')
+        self.database = os.path.join(workdir, 'bench.db')
+        self.app = create_app('web', 'testing', {
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.database}',
+            'QUERY_STATS': False,
+        })
+        with self.app.app_context():
+            db.create_all()
+            run_migrations()
+            self.dataset = seed_database(args.users, args.events, seed=args.seed, now=self.clock.utcnow())
+            db.engine.dispose()
+        self._copy(self.database, self.template)
+
+        self.fake_bot = FakeBot()
+        telegram_bot_module.telegram_bot = self.fake_bot
+        self.bot = telegram_bot_module.TelegramBot('0:bench', self.app.app_context)
+
+        # Scheduler pausado: solo se ejecutan los jobs que llama el benchmark
+        self.scheduler = NotificationScheduler(self.app.app_context, BackgroundScheduler())
+        self.scheduler.scheduler.pause()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['user_id'] = 1
+
+    @staticmethod
+    def _copy(source, target):
+        with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+            src.backup(dst)
+
+    def restore(self):
+        """Volver a los datos iniciales (para los benchmarks que escriben)"""
+        with self.app.app_context():
+            db.engine.dispose()
+        self._copy(self.template, self.database)
+        cache.clear()
+        event_index.clear()
+
+    def run(self, name, func, setup=None, repeat=None):
+        repeat = repeat or self.args.repeat
+        timings = []
+        queries = []
+        first = None
+        for index in range(repeat + 1):
+            if setup:
+                setup()
+            # Umbral desactivado: los bucles del benchmark repiten consultas a propósito
+            with query_scope(f'bench:{name}', threshold=float('inf')) as stats:
+                started = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - started
+            if index == 0:
+                # La primera ejecución incluye imports diferidos y cachés frías
+                first = elapsed
+                continue
+            timings.append(elapsed)
+            queries.append(stats.count)
+
+        result = {
+            'median_ms': round(statistics.median(timings) * 1000, 3),
+            'min_ms': round(min(timings) * 1000, 3),
+            'mean_ms': round(statistics.mean(timings) * 1000, 3),
+            'first_ms': round(first * 1000, 3),
+            'repeat': repeat,
+            'queries': round(statistics.median(queries)),
+        }
+        print(f"  {name:<24} mediana {result['median_ms']:>10.2f} ms   "
+              f"mín {result['min_ms']:>10.2f} ms   consultas {result['queries']}")
+        return result
+
+    # --- Benchmarks -------------------------------------------------------
+
+    def bench_events_list(self):
+        def request():
+            response = self.client.get('/api/events')
+            assert response.status_code == 200, response.status_code
+        return self.run('events_list', request)
+
+    def bench_check_event_reminders(self):
+        sent = []
+
+        def job():
+            before = self.fake_bot.reminders
+            self.scheduler.check_event_reminders()
+            sent.append(self.fake_bot.reminders - before)
+        def reopen_window():
+            # Cada repetición vuelve a enviar la misma ventana (sin envíos registrados)
+            self.restore()
+            self.scheduler._reminders_sent_until = None
+        result = self.run('check_event_reminders', job, setup=reopen_window)
+        result['reminders_sent'] = sent[-1]
+        return result
+
+    def bench_send_daily_summaries(self):
+        sent = []
+
+        def job():
+            before = self.fake_bot.summaries
+            self.scheduler.send_daily_summaries()
+            sent.append(self.fake_bot.summaries - before)
+        result = self.run('send_daily_summaries', job)
+        result['summaries_sent'] = sent[-1]
+        return result
+
+    def bench_cleanup_old_events(self):
+        result = self.run('cleanup_old_events', self.scheduler.cleanup_old_events, setup=self.restore)
+        self.restore()
+        return result
+
+    def bench_bot_today(self):
+        chat_ids = [chat_id_for(index) for index in range(min(self.args.users, 20))]
+
+        def command():
+            for chat_id in chat_ids:
+                update = fake_update(chat_id, '/today')
+                asyncio.run(self.bot.today_command(update, None))
+                assert update.message.replies
+        result = self.run('bot_today', command)
+        result['commands'] = len(chat_ids)
+        return result
+
+    def bench_bot_parse(self):
+        chat_id = chat_id_for(0)
+
+        def parse():
+            for text in PARSE_MESSAGES:
+                update = fake_update(chat_id, text)
+                asyncio.run(self.bot.handle_text_message(update, None))
+                assert 'creado' in update.message.replies[-1], update.message.replies
+        result = self.run('bot_parse', parse)
+        result['messages'] = len(PARSE_MESSAGES)
+        return result
+
+
+BENCHMARKS = ('check_event_reminders', 'events_list', 'send_daily_summaries', 'cleanup_old_events', 'bot_today', 'bot_parse')
+
+
+def compare(previous_path, current):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nComparación con {previous['meta']['commit']} ({os.path.basename(previous_path)}):")
+    dataset_params = ('users', 'events', 'seed')
+    if any(previous['meta']['params'].get(key) != current['meta']['params'][key] for key in dataset_params):
+        print(f"  ⚠️  Parámetros distintos: {previous['meta']['params']} frente a {current['meta']['params']}")
+    for name, result in current['results'].items():
+        old = previous['results'].get(name)
+        if not old:
+            continue
+        ratio = old['median_ms'] / result['median_ms'] if result['median_ms'] else float('inf')
+        print(f"  {name:<24} {old['median_ms']:>10.2f} ms -> {result['median_ms']:>10.2f} ms   "
+              f"x{ratio:.2f}   consultas {old['queries']} -> {result['queries']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--events', type=int, default=200, help='eventos por usuario')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help='lista separada por comas de ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--output', help='archivo JSON (por defecto results/<commit>.json)')
+    parser.add_argument('--compare', help='JSON de una ejecución anterior')
+    args = parser.parse_args()
+
+    selected = args.only.split(',') if args.only else BENCHMARKS
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Benchmarks desconocidos: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix='bench-hot-paths-')
+    try:
+        print(f"Generando {args.users} usuarios x {args.events} eventos (semilla {args.seed})...")
+        suite = Suite(args, workdir)
+        print(f"  {suite.dataset}")
+
+        results = {}
+        for name in selected:
+            results[name] = getattr(suite, f'bench_{name}')()
+        suite.scheduler.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    output = {
+        'meta': {
+            'commit': commit,
+            'date': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {'users': args.users, 'events': args.events, 'seed': args.seed, 'repeat': args.repeat},
+            'dataset': suite.dataset,
+        },
+        'results': results,
+    }
+
+    path = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {path}")
+
+    if args.compare:
+        compare(args.compare, output)
+
+
+if __name__ == '__main__':
+    main()
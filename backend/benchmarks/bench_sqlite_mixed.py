@@ -0,0 +1,135 @@
+# backend/benchmarks/bench_sqlite_mixed.py
+"""Carga mixta sobre SQLite: hilos lectores (listados) y escritores (altas de eventos).
+
+Compara la configuración por defecto con el perfil de sqlite_tuning más la
+cola de escritura única.
+
+Uso (desde backend/):
+    python benchmarks/bench_sqlite_mixed.py --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+sys.path.insert(0, src_dir)
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from models.user import db, User
+from models.event import Event
+from event_reads import list_event_dicts
+from sqlite_tuning import init_sqlite_tuning
+from config import Config
+import write_queue as write_queue_module
+
+
+def build_app(database_path, tuned):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Sin perfil: el timeout corto de pysqlite hace visibles los "database is locked"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 0.1}}
+    db.init_app(app)
+    if tuned:
+        app.config['SQLITE_PRAGMAS'] = Config.SQLITE_PRAGMAS
+        init_sqlite_tuning(app)
+        write_queue_module.init_write_queue(app)
+    else:
+        write_queue_module.write_queue = None
+    return app
+
+
+def insert_event(user_id, index):
+    start = datetime(2024, 1, 1) + timedelta(minutes=index)
+    db.session.add(Event(user_id=user_id, title=f'Carga {index}', start_time=start,
+                         end_time=start + timedelta(minutes=30), is_active=True))
+    db.session.commit()
+
+
+def run(tuned, readers, writers, seconds, events):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'), tuned)
+        with app.app_context():
+            db.create_all()
+            user = User(google_id='load', email='load@example.com', name='Load')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            for i in range(events):
+                db.session.add(Event(user_id=user_id, title=f'Base {i}',
+                                     start_time=datetime(2023, 1, 1) + timedelta(hours=i),
+                                     end_time=datetime(2023, 1, 1) + timedelta(hours=i, minutes=30),
+                                     is_active=True))
+            db.session.commit()
+
+        counters = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def count(key):
+            with lock:
+                counters[key] += 1
+
+        def reader():
+            with app.app_context():
+                while time.perf_counter() < deadline:
+                    try:
+                        list_event_dicts(user_id)
+                        count('reads')
+                    except OperationalError:
+                        count('errors')
+                    finally:
+                        db.session.remove()
+
+        def writer(offset):
+            with app.app_context():
+                index = offset
+                while time.perf_counter() < deadline:
+                    index += writers
+                    try:
+                        write_queue_module.submit_write(insert_event, user_id, index).result()
+                        count('writes')
+                    except OperationalError:
+                        db.session.rollback()
+                        count('errors')
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        queue = write_queue_module.get_write_queue()
+        if queue:
+            queue.shutdown()
+            write_queue_module.write_queue = None
+        with app.app_context():
+            db.engine.dispose()
+
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--events', type=int, default=500, help='eventos existentes que devuelve cada lectura')
+    args = parser.parse_args()
+
+    for label, tuned in (('por defecto', False), ('perfil + cola', True)):
+        counters = run(tuned, args.readers, args.writers, args.seconds, args.events)
+        print(f"{label:14} lecturas/s {counters['reads'] / args.seconds:8.1f}  "
+              f"escrituras/s {counters['writes'] / args.seconds:8.1f}  "
+              f"errores 'database is locked' {counters['errors']}")
+
+
+if __name__ == '__main__':
+    main()
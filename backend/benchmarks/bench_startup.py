@@ -0,0 +1,82 @@
+# backend/benchmarks/bench_startup.py
+"""Medir el arranque en frío de un worker y vigilar su presupuesto.
+
+Cada repetición es un proceso nuevo que importa wsgi.py (create_app con el
+rol indicado). Termina con código 1 si la mediana supera el presupuesto o si
+el rol web carga alguno de los módulos pesados que deben ser diferidos.
+
+Uso (desde backend/):
+    python benchmarks/bench_startup.py --runs 7 --budget-ms 800
+    python benchmarks/bench_startup.py --role scheduler --budget-ms 0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, '..'))
+
+# Solo el bot, el scheduler o el primer login deben cargarlos
+DEFERRED_MODULES = ('telegram', 'dateparser', 'apscheduler', 'authlib', 'requests')
+
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import wsgi
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    'ms': elapsed * 1000,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def measure(role, runs):
+    env = dict(os.environ, APP_ROLE=role, FLASK_CONFIG=os.environ.get('FLASK_CONFIG', 'default'))
+    # Sin token: el bot no se conecta a Telegram durante la medición
+    env['TELEGRAM_BOT_TOKEN'] = ''
+    env.setdefault('AUTO_MIGRATE', '0')
+
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT % (DEFERRED_MODULES,)],
+            cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--role', default='web')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=800,
+                        help='mediana máxima permitida (0 = no comprobar)')
+    args = parser.parse_args()
+
+    results = measure(args.role, args.runs)
+    times = sorted(result['ms'] for result in results)
+    loaded = sorted({name for result in results for name in result['loaded']})
+
+    print(f"Rol {args.role}: {args.runs} arranques")
+    print(f"  mediana {statistics.median(times):.0f} ms, mín {times[0]:.0f} ms, máx {times[-1]:.0f} ms")
+    print(f"  módulos pesados cargados: {', '.join(loaded) or 'ninguno'}")
+
+    failed = False
+    if args.budget_ms and statistics.median(times) > args.budget_ms:
+        print(f"❌ La mediana supera el presupuesto de {args.budget_ms:.0f} ms")
+        failed = True
+    if args.role == 'web' and loaded:
+        print("❌ El rol web no debe importar estos módulos al arrancar")
+        failed = True
+    if not failed:
+        print("✅ Dentro del presupuesto")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
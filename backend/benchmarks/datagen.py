@@ -0,0 +1,126 @@
+# backend/benchmarks/datagen.py
+"""Generador de datos sintéticos reproducibles para los benchmarks.
+
+Con la misma semilla y el mismo `now` genera siempre los mismos usuarios,
+categorías, ajustes de Telegram y eventos. Los eventos se reparten para que
+cada camino caliente tenga trabajo:
+
+- eventos de hoy (comando /today y resumen diario),
+- eventos cuyo recordatorio vence ahora (check_event_reminders),
+- eventos terminados hace más de 30 días (cleanup_old_events),
+- el resto repartido entre 30 días antes y `horizon_days` después.
+"""
+import random
+from datetime import datetime, timedelta
+from models.user import db, User
+from models.event import Event, Category, UserSettings
+from calendar_summary import rebuild_all_aggregates
+
+TIMEZONES = ('UTC', 'Europe/Madrid', 'America/Mexico_City', 'America/Bogota', 'America/Argentina/Buenos_Aires')
+CATEGORY_NAMES = ('Trabajo', 'Clases', 'Personal', 'Salud', 'Deporte', 'Familia', 'Viajes', 'Estudio')
+TITLES = ('Reunión', 'Clase', 'Dentista', 'Entrenamiento', 'Llamada', 'Revisión', 'Comida', 'Proyecto')
+REMINDER_CHOICES = (15, 30, 60)
+
+# Proporción de eventos de cada grupo (el resto, repartido en el horizonte)
+SHARE_DUE_REMINDER = 0.02
+SHARE_TODAY = 0.05
+SHARE_OLD = 0.15
+
+# chat_id de Telegram del usuario n: CHAT_ID_BASE + n
+CHAT_ID_BASE = 100000
+
+
+def chat_id_for(user_index):
+    return str(CHAT_ID_BASE + user_index)
+
+
+def _event_times(rng, now, kind, horizon_days):
+    if kind == 'due':
+        reminder = rng.choice(REMINDER_CHOICES)
+        start = now + timedelta(minutes=reminder)
+        return start, start + timedelta(minutes=rng.choice((30, 60, 90))), reminder
+    if kind == 'today':
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(minutes=rng.randrange(6 * 60, 22 * 60, 15))
+    elif kind == 'old':
+        start = now - timedelta(days=rng.randint(31, 120), minutes=rng.randrange(0, 24 * 60, 15))
+    else:
+        start = now + timedelta(days=rng.randint(-30, horizon_days), minutes=rng.randrange(0, 24 * 60, 15))
+    return start, start + timedelta(minutes=rng.choice((30, 60, 90, 120))), rng.choice(REMINDER_CHOICES)
+
+
+def seed_database(users=50, events_per_user=200, categories_per_user=6, seed=42, now=None, summary_share=0.5,
+                  horizon_days=60):
+    """Crear los datos en la base de datos de la aplicación actual.
+
+    Devuelve un resumen con los totales de cada grupo de eventos.
+    """
+    rng = random.Random(seed)
+    now = (now or datetime.utcnow()).replace(second=0, microsecond=0)
+    counts = {'users': users, 'events': 0, 'due': 0, 'today': 0, 'old': 0, 'categories': 0}
+
+    for user_index in range(users):
+        user = User(
+            google_id=f'bench-{user_index}',
+            email=f'bench{user_index}@example.com',
+            name=f'Bench {user_index}'
+        )
+        db.session.add(user)
+        db.session.flush()
+
+        db.session.add(UserSettings(
+            user_id=user.id,
+            telegram_chat_id=chat_id_for(user_index),
+            telegram_username=f'bench{user_index}',
+            timezone=rng.choice(TIMEZONES),
+            notifications_enabled=True,
+            daily_summary_enabled=rng.random() < summary_share,
+            daily_summary_time='08:00'
+        ))
+
+        categories = [
+            Category(user_id=user.id, name=name, color=f'#{rng.randrange(0x1000000):06x}')
+            for name in rng.sample(CATEGORY_NAMES, min(categories_per_user, len(CATEGORY_NAMES)))
+        ]
+        db.session.add_all(categories)
+        db.session.flush()
+        counts['categories'] += len(categories)
+
+        rows = []
+        for _ in range(events_per_user):
+            roll = rng.random()
+            if roll < SHARE_DUE_REMINDER:
+                kind = 'due'
+            elif roll < SHARE_DUE_REMINDER + SHARE_TODAY:
+                kind = 'today'
+            elif roll < SHARE_DUE_REMINDER + SHARE_TODAY + SHARE_OLD:
+                kind = 'old'
+            else:
+                kind = 'other'
+            counts[kind] = counts.get(kind, 0) + 1
+
+            start, end, reminder = _event_times(rng, now, kind, horizon_days)
+            category = rng.choice(categories + [None])
+            rows.append({
+                'user_id': user.id,
+                'title': f'{rng.choice(TITLES)} {rng.randrange(1000)}',
+                'description': rng.choice((None, 'Generado para benchmarks')),
+                'start_time': start,
+                'end_time': end,
+                'category_id': category.id if category else None,
+                'reminder_minutes': reminder,
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now,
+            })
+        db.session.execute(Event.__table__.insert(), rows)
+        counts['events'] += len(rows)
+
+    db.session.commit()
+
+    # Agregados coherentes con los eventos insertados directamente
+    with db.engine.begin() as connection:
+        rebuild_all_aggregates(connection)
+
+    counts.pop('other', None)
+    counts['now'] = now.isoformat()
+    return counts
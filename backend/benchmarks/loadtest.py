@@ -0,0 +1,375 @@
+# backend/benchmarks/loadtest.py
+"""Prueba de carga HTTP de la API con usuarios virtuales autenticados.
+
+Cada usuario virtual (un hilo con su propia conexión keep-alive) usa una
+cookie de sesión firmada con la SECRET_KEY del servidor, sin pasar por
+Google OAuth, y ejecuta una mezcla ponderada de operaciones: listado, alta,
+edición y borrado de eventos, categorías, ajustes y estado de Telegram.
+
+Las etapas (--stages) suben o bajan linealmente el número de usuarios
+virtuales; el informe da peticiones por segundo y percentiles de latencia
+por etapa y operación.
+
+Uso (desde backend/):
+    # Servidor propio en proceso sobre una SQLite temporal con datos sintéticos
+    python benchmarks/loadtest.py --serve --stages 10:20,50:30,50:30
+
+    # Contra un servidor real (gunicorn, SQLite o PostgreSQL): preparar los
+    # datos una vez y lanzar la carga con la misma SECRET_KEY que el servidor
+    python benchmarks/loadtest.py --prepare --database-url postgresql://... --users 200
+    SECRET_KEY=... python benchmarks/loadtest.py --url http://127.0.0.1:8000 --users 200 --stages 50:60
+
+Con --serve, el generador de carga y el servidor comparten proceso (y GIL):
+sirve para comparar cambios, no para medir la capacidad real del despliegue.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+sys.path.insert(0, src_dir)
+sys.path.insert(0, current_dir)
+
+import requests
+from flask import Flask
+
+DEFAULT_MIX = {
+    'list_events': 40,
+    'create_event': 10,
+    'update_event': 8,
+    'delete_event': 5,
+    'categories': 15,
+    'settings_get': 5,
+    'settings_update': 5,
+    'telegram_status': 12,
+}
+DEFAULT_STAGES = '10:15,25:15,25:15'
+REQUEST_TIMEOUT = 30
+# Cada cuánto recalcula el controlador el número de usuarios activos
+RAMP_TICK = 0.1
+
+TIMEZONES = ('UTC', 'Europe/Madrid', 'America/Mexico_City')
+
+
+def parse_stages(text):
+    """'10:30,50:60' -> [(10, 30.0), (50, 60.0)] (usuarios objetivo, segundos)"""
+    stages = []
+    for part in text.split(','):
+        users, seconds = part.split(':')
+        stages.append((int(users), float(seconds)))
+    return stages
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for part in text.split(','):
+            name, weight = part.split('=')
+            if name not in DEFAULT_MIX:
+                raise ValueError(f"Operación desconocida: {name}")
+            mix[name] = int(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def session_cookie(secret_key, user_id):
+    """Cookie de sesión de Flask firmada como la emitiría /auth/callback"""
+    app = Flask(__name__)
+    app.secret_key = secret_key
+    return app.session_interface.get_signing_serializer(app).dumps({'user_id': user_id})
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latencias por (etapa, operación); una lista por serie bajo un lock"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, name, seconds, ok):
+        with self._lock:
+            self.samples.setdefault((stage, name), []).append(seconds)
+            if not ok:
+                self.errors[(stage, name)] = self.errors.get((stage, name), 0) + 1
+
+    def summary(self, stage_durations):
+        result = {}
+        for (stage, name), values in sorted(self.samples.items()):
+            values = sorted(values)
+            result.setdefault(stage, {})[name] = {
+                'requests': len(values),
+                'errors': self.errors.get((stage, name), 0),
+                'rps': round(len(values) / stage_durations[stage], 2),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                'p90_ms': round(percentile(values, 0.90) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+                'mean_ms': round(statistics.mean(values) * 1000, 2),
+            }
+        return result
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index, runner, user_id):
+        super().__init__(name=f'vu-{index}', daemon=True)
+        self.index = index
+        self.runner = runner
+        self.user_id = user_id
+        self.rng = random.Random(runner.seed + index)
+        self.http = requests.Session()
+        self.http.cookies.set(runner.cookie_name, session_cookie(runner.secret_key, user_id))
+        self.created = []
+        self.category_ids = []
+
+    def call(self, name, method, path, **kwargs):
+        stage = self.runner.current_stage
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.runner.url + path, timeout=REQUEST_TIMEOUT, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.runner.recorder.record(stage, name, time.perf_counter() - started, ok)
+        return response if ok else None
+
+    # --- Operaciones -------------------------------------------------------
+
+    def list_events(self):
+        start = datetime.utcnow() - timedelta(days=self.rng.randint(0, 30))
+        self.call('list_events', 'GET', '/api/events', params={
+            'start_date': start.isoformat() + 'Z',
+            'end_date': (start + timedelta(days=31)).isoformat() + 'Z',
+        })
+
+    def create_event(self):
+        start = datetime.utcnow().replace(second=0, microsecond=0) + timedelta(
+            days=self.rng.randint(0, 30), minutes=self.rng.randrange(0, 24 * 60, 15)
+        )
+        response = self.call('create_event', 'POST', '/api/events', json={
+            'title': f'Carga {self.rng.randrange(10000)}',
+            'start_time': start.isoformat() + 'Z',
+            'end_time': (start + timedelta(minutes=60)).isoformat() + 'Z',
+            'category_id': self.rng.choice(self.category_ids) if self.category_ids else None,
+            'reminder_minutes': self.rng.choice((15, 30, 60)),
+        })
+        if response is not None:
+            self.created.append(response.json()['event']['id'])
+
+    def update_event(self):
+        if not self.created:
+            return self.create_event()
+        event_id = self.rng.choice(self.created)
+        self.call('update_event', 'PUT', f'/api/events/{event_id}', json={'title': f'Editado {self.rng.randrange(10000)}'})
+
+    def delete_event(self):
+        if not self.created:
+            return self.create_event()
+        event_id = self.created.pop(self.rng.randrange(len(self.created)))
+        self.call('delete_event', 'DELETE', f'/api/events/{event_id}')
+
+    def categories(self):
+        response = self.call('categories', 'GET', '/api/categories')
+        if response is not None:
+            self.category_ids = [category['id'] for category in response.json().get('categories', [])]
+
+    def settings_get(self):
+        self.call('settings_get', 'GET', '/api/settings')
+
+    def settings_update(self):
+        self.call('settings_update', 'PUT', '/api/settings', json={
+            'default_reminder_minutes': self.rng.choice((15, 30, 60)),
+            'daily_summary_enabled': self.rng.random() < 0.5,
+        })
+
+    def telegram_status(self):
+        self.call('telegram_status', 'GET', '/api/telegram/status')
+
+    def run(self):
+        names = list(self.runner.mix)
+        weights = [self.runner.mix[name] for name in names]
+        self.categories()
+        while not self.runner.finished.is_set():
+            if self.index >= self.runner.active_users:
+                # Fuera de la rampa actual: esperar sin generar carga
+                time.sleep(RAMP_TICK)
+                continue
+            getattr(self, self.rng.choices(names, weights)[0])()
+            if self.runner.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.runner.think_time))
+
+
+class LoadRunner:
+    def __init__(self, url, secret_key, user_ids, stages, mix, think_time=0.0, seed=42, cookie_name='session'):
+        self.url = url.rstrip('/')
+        self.secret_key = secret_key
+        self.user_ids = user_ids
+        self.stages = stages
+        self.mix = mix
+        self.think_time = think_time
+        self.seed = seed
+        self.cookie_name = cookie_name
+        self.recorder = Recorder()
+        self.finished = threading.Event()
+        self.active_users = 0
+        self.current_stage = 0
+
+    def run(self):
+        max_users = max(users for users, _ in self.stages)
+        virtual_users = [
+            VirtualUser(index, self, self.user_ids[index % len(self.user_ids)])
+            for index in range(max_users)
+        ]
+        for virtual_user in virtual_users:
+            virtual_user.start()
+
+        durations = {}
+        previous = 0
+        for stage_index, (target, seconds) in enumerate(self.stages):
+            self.current_stage = stage_index
+            print(f"▶️  Etapa {stage_index + 1}: {previous} -> {target} usuarios en {seconds:.0f} s")
+            started = time.monotonic()
+            while (elapsed := time.monotonic() - started) < seconds:
+                # Rampa lineal desde el objetivo anterior
+                self.active_users = round(previous + (target - previous) * min(1.0, elapsed / seconds))
+                time.sleep(RAMP_TICK)
+            durations[stage_index] = time.monotonic() - started
+            previous = target
+
+        self.finished.set()
+        for virtual_user in virtual_users:
+            virtual_user.join(REQUEST_TIMEOUT)
+        return self.recorder.summary(durations)
+
+
+def print_report(summary, stages):
+    for stage_index, operations in summary.items():
+        target, seconds = stages[stage_index]
+        total = sum(row['requests'] for row in operations.values())
+        errors = sum(row['errors'] for row in operations.values())
+        print(f"\nEtapa {stage_index + 1} ({target} usuarios, {seconds:.0f} s): "
+              f"{total / seconds:.1f} pet/s, {errors} errores")
+        print(f"  {'operación':<18}{'pet':>7}{'pet/s':>9}{'err':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'máx':>10}")
+        for name, row in operations.items():
+            print(f"  {name:<18}{row['requests']:>7}{row['rps']:>9.1f}{row['errors']:>6}"
+                  f"{row['p50_ms']:>8.1f}ms{row['p90_ms']:>8.1f}ms{row['p99_ms']:>8.1f}ms{row['max_ms']:>8.1f}ms")
+
+
+def build_app(database_url):
+    """Aplicación web (rol 'web') con el esquema creado"""
+    os.environ['TELEGRAM_BOT_TOKEN'] = ''
+    from app_factory import create_app
+    from models.user import db
+    from migrations import run_migrations
+
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'loadtest-secret'),
+        'QUERY_STATS': False,
+    }
+    app = create_app('web', os.environ.get('FLASK_CONFIG', 'production'), overrides)
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+    return app
+
+
+def prepare(app, users, events, seed):
+    """Generar usuarios y eventos si la base de datos está vacía; devuelve los ids"""
+    from models.user import db, User
+    from datagen import seed_database
+
+    with app.app_context():
+        if not db.session.query(User.id).first():
+            print(f"Generando {users} usuarios x {events} eventos...")
+            seed_database(users, events, seed=seed)
+        return [user_id for (user_id,) in db.session.query(User.id).order_by(User.id).limit(users)]
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+    # Una línea de log por petición falsearía las latencias
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--serve', action='store_true', help='servidor en proceso (werkzeug con hilos)')
+    target.add_argument('--url', help='servidor ya en marcha')
+    target.add_argument('--prepare', action='store_true', help='solo generar los datos en --database-url')
+    parser.add_argument('--database-url', help='por defecto, una SQLite temporal (con --serve)')
+    parser.add_argument('--users', type=int, default=50, help='usuarios distintos (ids 1..N)')
+    parser.add_argument('--events', type=int, default=200, help='eventos por usuario al generar datos')
+    parser.add_argument('--stages', default=DEFAULT_STAGES, help='usuarios:segundos separados por comas')
+    parser.add_argument('--mix', help='pesos, p. ej. list_events=60,create_event=5')
+    parser.add_argument('--think-time', type=float, default=0.0, help='pausa media entre peticiones (s)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='guardar el resumen en JSON')
+    args = parser.parse_args()
+
+    stages = parse_stages(args.stages)
+    mix = parse_mix(args.mix)
+    secret_key = os.environ.get('SECRET_KEY', 'loadtest-secret')
+
+    if args.prepare:
+        if not args.database_url:
+            parser.error('--prepare necesita --database-url')
+        prepare(build_app(args.database_url), args.users, args.events, args.seed)
+        return
+
+    server = None
+    if args.serve:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='loadtest-'), 'loadtest.db')}"
+        app = build_app(database_url)
+        user_ids = prepare(app, args.users, args.events, args.seed)
+        secret_key = app.config['SECRET_KEY']
+        server, url = serve(app)
+        print(f"Servidor en {url} ({database_url.split(':', 1)[0]})")
+    else:
+        url = args.url
+        user_ids = list(range(1, args.users + 1))
+
+    runner = LoadRunner(url, secret_key, user_ids, stages, mix, args.think_time, args.seed)
+    try:
+        summary = runner.run()
+    finally:
+        if server:
+            server.shutdown()
+
+    print_report(summary, stages)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'url': url if not args.serve else 'serve',
+                    'date': datetime.utcnow().isoformat(timespec='seconds'),
+                    'stages': stages,
+                    'mix': mix,
+                    'users': args.users,
+                },
+                'stages': {str(stage + 1): operations for stage, operations in summary.items()},
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nResumen guardado en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+# backend/benchmarks/oauth_standin.py
+"""Proveedor OAuth/OpenID local que sustituye a Google en pruebas.
+
+Sirve el endpoint de token, las claves JWKS (con Cache-Control) y userinfo,
+firma id_tokens RS256 con una clave propia y permite rotarla. El código de
+autorización elige el caso que devuelve el endpoint de token:
+
+    ok            id_token válido
+    wrong-aud     audiencia de otro client_id
+    wrong-iss     emisor distinto del de Google
+    expired       caducado hace una hora
+    forged        firmado con una clave que no está en el JWKS
+    no-id-token   sin id_token (la app debe recurrir a userinfo)
+    stalled       no responde hasta pasado el timeout de lectura
+
+Uso (desde backend/):
+    # Comprobar IdTokenVerifier: rotación de claves y rechazo de iss/aud/firma
+    python benchmarks/oauth_standin.py --check
+
+    # Servidor para la app: exportar las variables que imprime y abrir
+    # /auth/callback?code=ok (o wrong-aud, forged, stalled...)
+    python benchmarks/oauth_standin.py --port 8099
+    curl -X POST http://127.0.0.1:8099/rotate     # rotar la clave de firma
+    curl http://127.0.0.1:8099/stats              # peticiones por endpoint
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+sys.path.insert(0, src_dir)
+
+from authlib.jose import JsonWebKey, JsonWebToken
+
+GOOGLE_ISSUER = 'https://accounts.google.com'
+DEFAULT_CLIENT_ID = 'standin-client.apps.googleusercontent.com'
+JWKS_MAX_AGE = 3600
+# Más que el timeout de lectura de http_client (10 s)
+STALL_SECONDS = 12
+
+SCENARIOS = ('ok', 'wrong-aud', 'wrong-iss', 'expired', 'forged', 'no-id-token', 'stalled')
+
+
+def generate_key():
+    return JsonWebKey.generate_key('RSA', 2048, is_private=True, options={'kid': uuid.uuid4().hex[:12]})
+
+
+class OAuthStandIn:
+    """Estado del proveedor: claves publicadas, usuario y contadores"""
+
+    def __init__(self, client_id=DEFAULT_CLIENT_ID, issuer=GOOGLE_ISSUER, keep_previous=True):
+        self.client_id = client_id
+        self.issuer = issuer
+        self.keep_previous = keep_previous
+        self.keys = [generate_key()]
+        # Clave que nunca se publica (firmas falsificadas)
+        self.rogue_key = generate_key()
+        self.stats = Counter()
+        self._jwt = JsonWebToken(['RS256'])
+        self._lock = threading.Lock()
+
+    @property
+    def signing_key(self):
+        return self.keys[-1]
+
+    def rotate(self):
+        """Nueva clave de firma; la anterior se sigue publicando si keep_previous"""
+        with self._lock:
+            new_key = generate_key()
+            self.keys = (self.keys[-1:] if self.keep_previous else []) + [new_key]
+            return new_key.as_dict()['kid']
+
+    def jwks(self):
+        with self._lock:
+            return {'keys': [key.as_dict(is_private=False) for key in self.keys]}
+
+    def userinfo(self, subject='standin-user'):
+        return {
+            'sub': subject,
+            'email': f'{subject}@example.com',
+            'email_verified': True,
+            'name': 'Usuario de prueba',
+            'picture': '',
+        }
+
+    def id_token(self, scenario='ok', subject='standin-user'):
+        now = int(time.time())
+        claims = dict(self.userinfo(subject), iss=self.issuer, aud=self.client_id, iat=now, exp=now + 3600)
+        key = self.signing_key
+        if scenario == 'wrong-aud':
+            claims['aud'] = 'otra-app.apps.googleusercontent.com'
+        elif scenario == 'wrong-iss':
+            claims['iss'] = 'https://issuer.invalid'
+        elif scenario == 'expired':
+            claims['iat'], claims['exp'] = now - 7200, now - 3600
+        elif scenario == 'forged':
+            # Mismo kid que la clave publicada, firma de otra clave
+            key = JsonWebKey.import_key(
+                self.rogue_key.as_dict(is_private=True, kid=self.signing_key.as_dict()['kid'])
+            )
+        header = {'alg': 'RS256', 'kid': key.as_dict()['kid']}
+        return self._jwt.encode(header, claims, key).decode()
+
+    def token_response(self, code):
+        scenario = code if code in SCENARIOS else 'ok'
+        if scenario == 'stalled':
+            time.sleep(STALL_SECONDS)
+        body = {
+            'access_token': f'standin-{uuid.uuid4().hex}',
+            'token_type': 'Bearer',
+            'expires_in': 3599,
+            'scope': 'openid email profile',
+        }
+        if scenario != 'no-id-token':
+            body['id_token'] = self.id_token(scenario)
+        return body
+
+
+def make_handler(provider):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, body, status=200, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_form(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return dict(urllib.parse.parse_qsl(self.rfile.read(length).decode()))
+
+        def do_GET(self):
+            path = urllib.parse.urlparse(self.path).path
+            provider.stats[f'GET {path}'] += 1
+            base = f'http://{self.headers.get("Host")}'
+            if path == '/.well-known/openid-configuration':
+                self._send_json({
+                    'issuer': provider.issuer,
+                    'token_endpoint': f'{base}/token',
+                    'userinfo_endpoint': f'{base}/userinfo',
+                    'jwks_uri': f'{base}/certs',
+                    'id_token_signing_alg_values_supported': ['RS256'],
+                })
+            elif path == '/certs':
+                self._send_json(provider.jwks(), headers={
+                    'Cache-Control': f'public, max-age={JWKS_MAX_AGE}, must-revalidate'
+                })
+            elif path == '/userinfo':
+                if not self.headers.get('Authorization', '').startswith('Bearer '):
+                    self._send_json({'error': 'invalid_request'}, 401)
+                else:
+                    self._send_json(provider.userinfo())
+            elif path == '/stats':
+                self._send_json(dict(provider.stats))
+            else:
+                self._send_json({'error': 'not_found'}, 404)
+
+        def do_POST(self):
+            path = urllib.parse.urlparse(self.path).path
+            provider.stats[f'POST {path}'] += 1
+            if path == '/token':
+                form = self._read_form()
+                if form.get('client_id') != provider.client_id:
+                    self._send_json({'error': 'invalid_client'}, 401)
+                else:
+                    self._send_json(provider.token_response(form.get('code')))
+            elif path == '/rotate':
+                self._read_form()
+                self._send_json({'kid': provider.rotate()})
+            else:
+                self._send_json({'error': 'not_found'}, 404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(provider, host='127.0.0.1', port=0):
+    """Arrancar el proveedor en un hilo; devuelve (servidor, URL base)"""
+    server = ThreadingHTTPServer((host, port), make_handler(provider))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def run_check(provider, base_url):
+    """Verificar IdTokenVerifier contra el proveedor; devuelve el número de fallos"""
+    from id_tokens import MIN_REFRESH_INTERVAL, IdTokenError, IdTokenVerifier
+
+    verifier = IdTokenVerifier(f'{base_url}/certs', [provider.issuer], provider.client_id)
+
+    def verify(token):
+        try:
+            verifier.verify(token)
+            return 'aceptado'
+        except IdTokenError:
+            return 'rechazado'
+
+    def jwks_fetches():
+        return provider.stats['GET /certs']
+
+    results = []
+
+    def expect(name, outcome, expected, fetches):
+        results.append((name, outcome, expected, fetches))
+
+    expect('válido', verify(provider.id_token()), 'aceptado', jwks_fetches())
+    for _ in range(4):
+        verify(provider.id_token())
+    expect('5 tokens válidos más', verify(provider.id_token()), 'aceptado', jwks_fetches())
+    for scenario in ('wrong-aud', 'wrong-iss', 'expired', 'forged'):
+        expect(scenario, verify(provider.id_token(scenario)), 'rechazado', jwks_fetches())
+
+    # Rotación: un kid desconocido fuerza una descarga, como mucho una por minuto
+    provider.rotate()
+    expect('rotación dentro del minuto', verify(provider.id_token()), 'rechazado', jwks_fetches())
+    verifier._fetched_at -= MIN_REFRESH_INTERVAL
+    expect('rotación pasado el minuto', verify(provider.id_token()), 'aceptado', jwks_fetches())
+    expect('tras la rotación', verify(provider.id_token()), 'aceptado', jwks_fetches())
+
+    print(f"\n  {'caso':<28} {'resultado':<10} {'esperado':<10} descargas JWKS")
+    failures = 0
+    for name, outcome, expected, fetches in results:
+        mark = '✅' if outcome == expected else '❌'
+        failures += outcome != expected
+        print(f"  {mark} {name:<26} {outcome:<10} {expected:<10} {fetches}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--client-id', default=os.environ.get('GOOGLE_CLIENT_ID') or DEFAULT_CLIENT_ID)
+    parser.add_argument('--issuer', default=GOOGLE_ISSUER)
+    parser.add_argument('--drop-previous', action='store_true',
+                        help='al rotar, dejar de publicar la clave anterior')
+    parser.add_argument('--check', action='store_true',
+                        help='comprobar IdTokenVerifier contra el proveedor y salir')
+    args = parser.parse_args()
+
+    provider = OAuthStandIn(args.client_id, args.issuer, keep_previous=not args.drop_previous)
+
+    if args.check:
+        server, base_url = start_server(provider, args.host, 0)
+        failures = run_check(provider, base_url)
+        server.shutdown()
+        print(f"\n{'✅ Todo correcto' if not failures else f'❌ {failures} casos fallidos'}")
+        sys.exit(1 if failures else 0)
+
+    server, base_url = start_server(provider, args.host, args.port)
+    print(f"🔐 Proveedor OAuth local en {base_url}")
+    print("Variables para la app:")
+    print(f"  export GOOGLE_CLIENT_ID={provider.client_id}")
+    print("  export GOOGLE_CLIENT_SECRET=standin-secret")
+    print(f"  export GOOGLE_TOKEN_URL={base_url}/token")
+    print(f"  export GOOGLE_JWKS_URL={base_url}/certs")
+    print(f"  export GOOGLE_USERINFO_URL={base_url}/userinfo")
+    print(f"  export GOOGLE_ISSUERS={provider.issuer}")
+    print(f"Casos (parámetro code del callback): {', '.join(SCENARIOS)}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
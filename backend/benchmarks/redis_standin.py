@@ -0,0 +1,307 @@
+# backend/benchmarks/redis_standin.py
+"""Servidor RESP mínimo que sustituye a Redis para probar la caché compartida.
+
+Implementa lo que usa RedisCacheBackend (AUTH, SELECT, GET, SET EX/PX, DEL,
+FLUSHDB) más PING, EXISTS, TTL y DBSIZE, con caducidad por clave y un
+contador de comandos. No persiste nada: sirve para pruebas, no como caché
+de producción.
+
+Uso (desde backend/):
+    # Comprobar la caché: compartida entre procesos, invalidación, caída del
+    # servidor (se lee de la base de datos) y reconexión
+    python benchmarks/redis_standin.py --check
+
+    # Servidor para la app (CACHE_BACKEND=redis)
+    python benchmarks/redis_standin.py --port 6399
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6399/0 python app.py
+"""
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+sys.path.insert(0, src_dir)
+
+
+class RespError(Exception):
+    """Error que se devuelve al cliente como respuesta '-ERR ...'"""
+
+
+class RedisStandIn:
+    """Datos en memoria por base de datos: clave -> (valor, caducidad monotónica)"""
+
+    def __init__(self, password=None):
+        self.password = password
+        self.databases = {}
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def _live(self, database, key):
+        entry = database.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del database[key]
+            entry = None
+        return entry
+
+    def execute(self, state, args):
+        """Ejecutar un comando; state guarda la base seleccionada y la autenticación"""
+        command = args[0].decode().upper()
+        self.stats[command] += 1
+        if command == 'AUTH':
+            if args[-1].decode() != self.password:
+                raise RespError('WRONGPASS invalid username-password pair')
+            state['authenticated'] = True
+            return 'OK'
+        if self.password and not state.get('authenticated'):
+            raise RespError('NOAUTH Authentication required.')
+        if command == 'PING':
+            return args[1] if len(args) > 1 else 'PONG'
+        if command == 'SELECT':
+            state['db'] = int(args[1])
+            return 'OK'
+
+        with self._lock:
+            database = self.databases.setdefault(state.get('db', 0), {})
+            if command == 'GET':
+                entry = self._live(database, args[1])
+                return entry[0] if entry else None
+            if command == 'SET':
+                expires_at = None
+                options = [arg.decode().upper() for arg in args[3:]]
+                for option, value in zip(options, options[1:]):
+                    if option == 'EX':
+                        expires_at = time.monotonic() + int(value)
+                    elif option == 'PX':
+                        expires_at = time.monotonic() + int(value) / 1000
+                database[args[1]] = (args[2], expires_at)
+                return 'OK'
+            if command == 'DEL':
+                return sum(database.pop(key, None) is not None for key in args[1:])
+            if command == 'EXISTS':
+                return sum(self._live(database, key) is not None for key in args[1:])
+            if command == 'TTL':
+                entry = self._live(database, args[1])
+                if entry is None:
+                    return -2
+                return -1 if entry[1] is None else int(entry[1] - time.monotonic())
+            if command == 'DBSIZE':
+                return sum(self._live(database, key) is not None for key in list(database))
+            if command == 'FLUSHDB':
+                database.clear()
+                return 'OK'
+        raise RespError(f"ERR unknown command '{command}'")
+
+
+def encode_reply(value):
+    if isinstance(value, RespError):
+        return f'-{value}\r\n'.encode()
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, str):
+        return f'+{value}\r\n'.encode()
+    if isinstance(value, int):
+        return f':{value}\r\n'.encode()
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def read_command(reader):
+    """Leer un array RESP de bulk strings; None si el cliente cerró la conexión"""
+    line = reader.readline()
+    if not line:
+        return None
+    if line[:1] != b'*':
+        # Comando en línea (redis-cli, telnet)
+        return line.split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int(reader.readline()[1:-2])
+        args.append(reader.read(length + 2)[:-2])
+    return args
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, store):
+        self.store = store
+        self.connections = set()
+        super().__init__(address, RespHandler)
+
+    def stop(self):
+        """Parar y cortar también las conexiones abiertas (simula la caída)"""
+        self.shutdown()
+        self.server_close()
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(2)
+                connection.close()
+            except OSError:
+                pass
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        self.server.connections.add(self.connection)
+        self.server.store.stats['connections'] += 1
+        state = {}
+        try:
+            while True:
+                args = read_command(self.rfile)
+                if not args:
+                    return
+                try:
+                    reply = self.server.store.execute(state, args)
+                except RespError as e:
+                    reply = e
+                except (ValueError, IndexError):
+                    reply = RespError('ERR syntax error')
+                self.wfile.write(encode_reply(reply))
+        except OSError:
+            pass
+        finally:
+            self.server.connections.discard(self.connection)
+
+
+def start_server(store, host='127.0.0.1', port=0):
+    """Arrancar el servidor en un hilo; devuelve (servidor, puerto)"""
+    server = RespServer((host, port), store)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def run_check(host):
+    """Comprobar RedisCacheBackend y la API contra el servidor; devuelve el número de fallos"""
+    import logging
+    from cache import ReadThroughCache, RedisCacheBackend
+
+    logging.getLogger('cache').setLevel(logging.ERROR)
+    store = RedisStandIn(password='standin')
+    server, port = start_server(store, host)
+    url = f'redis://:standin@{host}:{port}/2'
+    results = []
+
+    def expect(name, value, expected):
+        results.append((name, value, expected))
+
+    # Tres "procesos" (clientes independientes) leyendo las mismas claves
+    loads = Counter()
+
+    def loader(identifier):
+        def load():
+            loads[identifier] += 1
+            return {'user_id': identifier, 'timezone': 'Europe/Madrid'}
+        return load
+
+    workers = [ReadThroughCache(RedisCacheBackend(url), default_ttl=60) for _ in range(3)]
+    for i in range(12):
+        workers[i % 3].get_or_load('settings', i // 4, loader(i // 4))
+    expect('12 lecturas, 3 claves: cargas desde la BD', sum(loads.values()), 3)
+
+    workers[0].invalidate('settings', 1)
+    workers[2].get_or_load('settings', 1, loader(1))
+    expect('invalidación vista por otro proceso: cargas', loads[1], 2)
+
+    short = ReadThroughCache(RedisCacheBackend(url), ttls={'user': 1})
+    short.get_or_load('user', 7, loader(7))
+    time.sleep(1.1)
+    short.get_or_load('user', 7, loader(7))
+    expect('TTL vencido: cargas', loads[7], 2)
+
+    # Caída del servidor: se lee de la base de datos sin errores y sin
+    # reintentar la conexión en cada petición
+    server.stop()
+    before = sum(loads.values())
+    for i in range(6):
+        workers[0].get_or_load('settings', 0, loader(0))
+    expect('servidor caído: lecturas servidas desde la BD', sum(loads.values()) - before, 6)
+
+    server, port = start_server(RedisStandIn(password='standin'), host, port)
+    backend = workers[0].backend
+    backend._down_until = 0
+    workers[0].get_or_load('settings', 0, loader(0))
+    expect('reconexión tras RETRY_AFTER: conexiones nuevas', server.store.stats['connections'], 1)
+    server.stop()
+
+    failures = 0
+    print(f"\n  {'caso':<48} {'valor':>6} {'esperado':>9}")
+    for name, value, expected in results:
+        mark = '✅' if value == expected else '❌'
+        failures += value != expected
+        print(f"  {mark} {name:<46} {value:>6} {expected:>9}")
+    return failures + run_app_check(host)
+
+
+def run_app_check(host):
+    """GET /api/settings repetido con CACHE_BACKEND=redis: consultas por petición"""
+    os.environ['TELEGRAM_BOT_TOKEN'] = ''
+    from app_factory import create_app
+    from models.user import db, User
+
+    store = RedisStandIn()
+    server, port = start_server(store, host)
+    database_dir = tempfile.mkdtemp()
+    app = create_app('web', 'testing', {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_dir}/standin.db',
+        'CACHE_BACKEND': 'redis',
+        'CACHE_REDIS_URL': f'redis://{host}:{port}/0',
+        'QUERY_STATS': True,
+        'QUERY_STATS_HEADERS': True,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(google_id='standin', email='standin@example.com', name='Standin')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+    counts = []
+    for _ in range(12):
+        response = client.get('/api/settings')
+        counts.append(int(response.headers.get('X-Query-Count', -1)))
+    server.stop()
+
+    first, rest = counts[0], counts[1:]
+    print(f"\n  GET /api/settings x12 con Redis: consultas {counts}; comandos {dict(store.stats)}")
+    ok = store.stats['GET'] == 12 and max(rest) < first
+    print(f"  {'✅' if ok else '❌'} las lecturas repetidas no consultan la configuración en la BD")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6399)
+    parser.add_argument('--password', help='exigir AUTH con esta contraseña')
+    parser.add_argument('--check', action='store_true',
+                        help='comprobar la caché contra el servidor y salir')
+    args = parser.parse_args()
+
+    if args.check:
+        failures = run_check(args.host)
+        print(f"\n{'✅ Todo correcto' if not failures else f'❌ {failures} casos fallidos'}")
+        sys.exit(1 if failures else 0)
+
+    store = RedisStandIn(args.password)
+    server, port = start_server(store, args.host, args.port)
+    print(f"🧠 Servidor RESP local en redis://{args.host}:{port}/0")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+        print(f"Comandos: {dict(store.stats)}")
+
+
+if __name__ == '__main__':
+    main()
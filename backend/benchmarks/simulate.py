@@ -0,0 +1,330 @@
+# backend/benchmarks/simulate.py
+"""Simulación del scheduler en tiempo virtual.
+
+Ejecuta los jobs reales de NotificationScheduler (recordatorios, resúmenes,
+limpieza, archivo, mantenimiento) con un reloj simulado que salta de un
+disparo al siguiente, sobre una SQLite temporal con datos sintéticos. Los
+envíos van a un bot falso que los registra con su hora virtual.
+
+Informa, por job, del coste real de cada disparo (tiempo, consultas, envíos)
+y, para los recordatorios, del retraso respecto a la hora prevista, los
+duplicados y los que no llegaron a enviarse.
+
+Uso (desde backend/):
+    python benchmarks/simulate.py --users 100 --events 300 --days 7
+    python benchmarks/simulate.py --users 10000 --events 50 --days 365 --jobs check_reminders,daily_summaries
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+sys.path.insert(0, src_dir)
+sys.path.insert(0, current_dir)
+
+# Sin token real: ni el bot ni los envíos tocan la red
+os.environ['TELEGRAM_BOT_TOKEN'] = ''
+
+from apscheduler.events import EVENT_JOB_ADDED, EVENT_JOB_MODIFIED, EVENT_JOB_REMOVED
+from apscheduler.schedulers.background import BackgroundScheduler
+from app_factory import create_app
+from models.user import db
+from models.event import Event
+from migrations import run_migrations
+from clock import SimulatedClock, set_clock
+from query_stats import query_scope
+import telegram_bot as telegram_bot_module
+from scheduler import NotificationScheduler
+from datagen import seed_database
+
+# Los jobs registran cada envío; en una simulación larga solo molestan
+logging.getLogger('scheduler').setLevel(logging.WARNING)
+logging.getLogger('query_stats').setLevel(logging.ERROR)
+logging.getLogger('apscheduler').setLevel(logging.WARNING)
+
+# Jobs recurrentes de NotificationScheduler (los que admite --jobs)
+RECURRING_JOBS = ('check_reminders', 'daily_summaries', 'cleanup_events', 'archive_events', 'database_maintenance')
+
+
+class RecordingBot:
+    """Bot falso: guarda cada envío con la hora virtual en que se hizo"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.reminders = []  # (enviado, id del evento, hora prevista)
+        self.reminder_messages = 0
+        self.summaries = Counter()  # día virtual -> resúmenes
+        self._lock = threading.Lock()
+
+    async def send_reminder(self, chat_id, event, timezone='UTC'):
+        await self.send_reminder_digest(chat_id, [event], timezone)
+
+    async def send_reminder_digest(self, chat_id, events, timezone='UTC'):
+        sent_at = self.clock.utcnow()
+        with self._lock:
+            self.reminder_messages += 1
+            for event in events:
+                due = event.start_time - timedelta(minutes=event.reminder_minutes)
+                self.reminders.append((sent_at, event.id, due))
+
+    async def send_daily_summary(self, chat_id, events, timezone='UTC'):
+        with self._lock:
+            self.summaries[self.clock.utcnow().date().isoformat()] += 1
+
+    def sent_count(self):
+        return len(self.reminders) + sum(self.summaries.values())
+
+
+class Simulation:
+    def __init__(self, app, clock, bot, jobs=None):
+        self.app = app
+        self.clock = clock
+        self.bot = bot
+        self.jobs = jobs
+        # Scheduler en pausa: la simulación decide cuándo dispara cada job
+        self.notifications = NotificationScheduler(app.app_context, BackgroundScheduler(timezone='UTC'))
+        self.notifications.scheduler.pause()
+        self.notifications.scheduler.add_listener(
+            self._jobs_changed, EVENT_JOB_ADDED | EVENT_JOB_MODIFIED | EVENT_JOB_REMOVED
+        )
+        self._changed = None  # None = revisar todos los jobs
+        self._queue = []
+        self._next_fire = {}
+        self.ticks = {}  # job -> [(ms, consultas, envíos), ...]
+
+    def _jobs_changed(self, event):
+        if self._changed is not None:
+            self._changed.add(event.job_id)
+
+    def _aware(self, value):
+        return value.replace(tzinfo=timezone.utc)
+
+    def _schedule(self, job, previous, now):
+        previous = self._aware(previous) if previous else None
+        fire_time = job.trigger.get_next_fire_time(previous, self._aware(now))
+        if fire_time is None:
+            self._next_fire.pop(job.id, None)
+            return
+        fire_time = fire_time.astimezone(timezone.utc).replace(tzinfo=None)
+        self._next_fire[job.id] = fire_time
+        heapq.heappush(self._queue, (fire_time, job.id))
+
+    def _selected(self, job_id):
+        return self.jobs is None or job_id in self.jobs or job_id not in RECURRING_JOBS
+
+    def _refresh(self, now):
+        """Incorporar los jobs añadidos, cambiados o quitados desde el último disparo"""
+        scheduler = self.notifications.scheduler
+        if self._changed is None:
+            jobs = {job.id: job for job in scheduler.get_jobs()}
+        else:
+            jobs = {job_id: scheduler.get_job(job_id) for job_id in self._changed}
+        self._changed = set()
+        for job_id, job in jobs.items():
+            self._next_fire.pop(job_id, None)
+            if job is not None and self._selected(job_id):
+                self._schedule(job, None, now)
+
+    def run(self, until, progress=True):
+        wall_started = time.perf_counter()
+        next_report = self.clock.utcnow().date() + timedelta(days=1)
+        while True:
+            if self._changed is None or self._changed:
+                self._refresh(self.clock.utcnow())
+            if not self._queue:
+                break
+            fire_time, job_id = heapq.heappop(self._queue)
+            # Entradas obsoletas (job quitado o reprogramado)
+            if self._next_fire.get(job_id) != fire_time:
+                continue
+            if fire_time >= until:
+                break
+
+            del self._next_fire[job_id]
+            self.clock.set(fire_time)
+            job = self.notifications.scheduler.get_job(job_id)
+            sent_before = self.bot.sent_count()
+            with query_scope(f'sim:{job_id}', threshold=float('inf')) as stats:
+                started = time.perf_counter()
+                job.func(*job.args, **job.kwargs)
+                elapsed = time.perf_counter() - started
+            self.ticks.setdefault(self._job_group(job_id), []).append(
+                (elapsed * 1000, stats.count, self.bot.sent_count() - sent_before)
+            )
+            self._schedule(job, fire_time, fire_time)
+
+            if progress and fire_time.date() >= next_report:
+                print(f"  {fire_time.date()}  ({time.perf_counter() - wall_started:.1f} s reales)")
+                next_report = fire_time.date() + timedelta(days=1)
+
+        self.clock.set(max(self.clock.utcnow(), until))
+        return time.perf_counter() - wall_started
+
+    @staticmethod
+    def _job_group(job_id):
+        # Los jobs por usuario (daily_summary_45...) se agrupan por tipo
+        return job_id.rstrip('0123456789').rstrip('_') or job_id
+
+    def shutdown(self):
+        self.notifications.shutdown()
+
+
+def expected_reminders(start, until):
+    """Eventos activos cuyo recordatorio cae dentro del periodo simulado"""
+    rows = db.session.execute(
+        db.select(Event.id, Event.start_time, Event.reminder_minutes).where(
+            Event.is_active == True,
+            Event.start_time > start,
+            Event.start_time <= until + timedelta(days=1)
+        )
+    ).all()
+    return {
+        event_id: start_time - timedelta(minutes=reminder_minutes)
+        for event_id, start_time, reminder_minutes in rows
+        if start <= start_time - timedelta(minutes=reminder_minutes) < until
+    }
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize(simulation, bot, expected):
+    jobs = {}
+    for name, ticks in sorted(simulation.ticks.items()):
+        durations = [tick[0] for tick in ticks]
+        jobs[name] = {
+            'ticks': len(ticks),
+            'total_ms': round(sum(durations), 1),
+            'p50_ms': round(percentile(durations, 0.50), 3),
+            'p99_ms': round(percentile(durations, 0.99), 3),
+            'max_ms': round(max(durations), 3),
+            'queries': sum(tick[1] for tick in ticks),
+            'max_queries': max(tick[1] for tick in ticks),
+            'sends': sum(tick[2] for tick in ticks),
+            'max_sends': max(tick[2] for tick in ticks),
+        }
+
+    lateness = [(sent - due).total_seconds() for sent, _, due in bot.reminders]
+    per_event = Counter(event_id for _, event_id, _ in bot.reminders)
+    reminders = {
+        'expected': len(expected),
+        'sent': len(bot.reminders),
+        'messages': bot.reminder_messages,
+        'events_reminded': len(per_event),
+        'duplicates': sum(count - 1 for count in per_event.values()),
+        'missed': len(set(expected) - set(per_event)),
+    }
+    if lateness:
+        reminders.update({
+            'lateness_min_s': min(lateness),
+            'lateness_p50_s': percentile(lateness, 0.50),
+            'lateness_p99_s': percentile(lateness, 0.99),
+            'lateness_max_s': max(lateness),
+        })
+    return {'jobs': jobs, 'reminders': reminders, 'summaries_per_day': dict(sorted(bot.summaries.items()))}
+
+
+def print_report(summary):
+    print(f"\n  {'job':<22}{'disparos':>9}{'total':>11}{'p50':>10}{'p99':>10}{'máx':>10}{'consultas':>11}{'envíos':>9}")
+    for name, row in summary['jobs'].items():
+        print(f"  {name:<22}{row['ticks']:>9}{row['total_ms']:>9.0f}ms{row['p50_ms']:>8.2f}ms"
+              f"{row['p99_ms']:>8.2f}ms{row['max_ms']:>8.2f}ms{row['queries']:>11}{row['sends']:>9}")
+
+    reminders = summary['reminders']
+    print(f"\nRecordatorios: {reminders['sent']} enviados en {reminders['messages']} mensajes "
+          f"para {reminders['events_reminded']} eventos "
+          f"(esperados {reminders['expected']}, duplicados {reminders['duplicates']}, sin enviar {reminders['missed']})")
+    if 'lateness_p50_s' in reminders:
+        print(f"  Retraso sobre la hora prevista: mín {reminders['lateness_min_s']:.0f} s, "
+              f"p50 {reminders['lateness_p50_s']:.0f} s, p99 {reminders['lateness_p99_s']:.0f} s, "
+              f"máx {reminders['lateness_max_s']:.0f} s")
+    days = summary['summaries_per_day']
+    if days:
+        print(f"Resúmenes diarios: {sum(days.values())} en {len(days)} días")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--events', type=int, default=200, help='eventos por usuario')
+    parser.add_argument('--days', type=float, default=7, help='duración simulada')
+    parser.add_argument('--start', help='inicio en UTC (ISO 8601); por defecto, hoy a las 00:00')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jobs', help='jobs recurrentes a simular (por defecto, todos)')
+    parser.add_argument('--digest-window', type=int, help='REMINDER_DIGEST_WINDOW_SECONDS (por defecto, el de la configuración)')
+    parser.add_argument('--output', help='guardar el resumen en JSON')
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start) if args.start else datetime.utcnow().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    until = start + timedelta(days=args.days)
+    jobs = set(args.jobs.split(',')) if args.jobs else None
+    if jobs and jobs - set(RECURRING_JOBS):
+        parser.error(f"Jobs desconocidos: {', '.join(sorted(jobs - set(RECURRING_JOBS)))}")
+
+    clock = SimulatedClock(start)
+    set_clock(clock)
+    bot = RecordingBot(clock)
+    telegram_bot_module.telegram_bot = bot
+
+    workdir = tempfile.mkdtemp(prefix='simulate-')
+    try:
+        overrides = {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'simulate.db')}",
+            'QUERY_STATS': False,
+        }
+        if args.digest_window is not None:
+            overrides['REMINDER_DIGEST_WINDOW_SECONDS'] = args.digest_window
+        app = create_app('web', 'testing', overrides)
+        with app.app_context():
+            db.create_all()
+            run_migrations()
+            print(f"Generando {args.users} usuarios x {args.events} eventos desde {start:%Y-%m-%d %H:%M}...")
+            dataset = seed_database(args.users, args.events, seed=args.seed, now=start,
+                                    horizon_days=max(60, int(args.days) + 1))
+            expected = expected_reminders(start, until)
+
+        simulation = Simulation(app, clock, bot, jobs)
+        print(f"Simulando {args.days:g} días...")
+        wall = simulation.run(until)
+        simulation.shutdown()
+
+        summary = summarize(simulation, bot, expected)
+        print(f"\n{args.days:g} días simulados en {wall:.1f} s reales")
+        print_report(summary)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'start': start.isoformat(),
+                    'days': args.days,
+                    'params': {
+                        'users': args.users, 'events': args.events, 'seed': args.seed,
+                        'digest_window': app.config['REMINDER_DIGEST_WINDOW_SECONDS'],
+                    },
+                    'dataset': dataset,
+                    'wall_seconds': round(wall, 2),
+                },
+                **summary,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nResumen guardado en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
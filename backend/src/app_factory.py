@@ -0,0 +1,183 @@
+import os
+import sys
+import click
+from flask import Flask
+from flask_cors import CORS
+
+# Permitir los imports planos (models, routes...) al cargar desde fuera de src
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from config import config, is_postgres_url, normalize_database_url, postgres_engine_options
+from models.user import db
+from routes.auth import auth_bp, init_oauth
+from routes.events import events_bp
+from routes.telegram import telegram_bp
+from routes.user import user_bp
+from migrations import run_migrations
+from compression import init_compression
+from static_manifest import init_static_manifest
+from sqlite_tuning import init_sqlite_tuning
+from write_queue import init_write_queue, get_write_queue
+from cache import init_cache
+from startup_profile import step
+from metrics import TimedQueuePool, init_metrics
+from query_stats import init_query_stats
+from profiler import init_profiler
+
+# Roles de proceso:
+#   web       - solo HTTP; se pueden lanzar tantos workers como núcleos
+#   bot       - polling de Telegram (un único proceso)
+#   scheduler - recordatorios, resúmenes y tareas nocturnas (un único proceso)
+#   worker    - bot, scheduler y envíos en un único event loop (worker.py)
+#   all       - todo en un proceso, para desarrollo
+ROLES = ('web', 'bot', 'scheduler', 'worker', 'all')
+WEB_ROLES = ('web', 'all')
+BOT_ROLES = ('bot', 'all')
+SCHEDULER_ROLES = ('scheduler', 'all')
+# Por defecto migra solo el proceso único que ejecuta las tareas programadas
+MIGRATING_ROLES = ('scheduler', 'worker', 'all')
+
+
+def create_app(role='web', config_name=None, config_overrides=None):
+    """Construir la aplicación para un rol de proceso"""
+    if role not in ROLES:
+        raise ValueError(f"Rol desconocido '{role}'; usa uno de {', '.join(ROLES)}")
+
+    with step('config'):
+        app = Flask(__name__, static_folder=os.path.join(src_dir, 'static'))
+        app.config.from_object(config[config_name or os.environ.get('FLASK_CONFIG', 'default')])
+        if config_overrides:
+            app.config.update(config_overrides)
+        app.config['APP_ROLE'] = role
+
+        app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        
+        # Pool de PostgreSQL dimensionado según el rol de este proceso; las
+        # opciones de conexión (connect_timeout, options...) son parámetros de
+        # libpq, válidos con psycopg 3 (el driver de requirements.txt)
+        if is_postgres_url(app.config['SQLALCHEMY_DATABASE_URI']):
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+                **postgres_engine_options(role),
+                'poolclass': TimedQueuePool,  # Espera por conexión en /metrics
+            }
+
+    # Base de datos, perfil de SQLite, cola de escritura y caché
+    with step('db'):
+        db.init_app(app)
+        init_sqlite_tuning(app)
+        init_write_queue(app)
+    with step('cache'):
+        init_cache(app)
+    # /healthz, /readyz y /metrics (en los procesos sin web, con METRICS_PORT)
+    init_metrics(app)
+    # Consultas por petición, update o job; avisos de N+1
+    init_query_stats(app)
+
+    auto_migrate = os.environ.get('AUTO_MIGRATE')
+    if auto_migrate is None:
+        auto_migrate = role in MIGRATING_ROLES
+    else:
+        auto_migrate = auto_migrate.lower() in ('1', 'true', 'yes')
+
+    # Fuera del camino crítico de los workers web (salvo AUTO_MIGRATE=1)
+    if auto_migrate:
+        with step('migraciones'), app.app_context():
+            db.create_all()
+            run_migrations()
+
+    register_cli(app)
+
+    if role in WEB_ROLES:
+        with step('web'):
+            init_web(app)
+
+    telegram_token = os.environ.get('TELEGRAM_BOT_TOKEN')
+    if not telegram_token or telegram_token in ('test', 'your-telegram-bot-token'):
+        telegram_token = None
+
+    # El rol worker arranca el bot y el scheduler dentro de su propio loop
+    telegram_bot = None
+    if role in BOT_ROLES or role in SCHEDULER_ROLES:
+        if telegram_token:
+            # telegram (y dateparser al primer mensaje) solo se cargan en estos roles
+            with step('bot'):
+                from telegram_bot import init_telegram_bot
+                # El scheduler sin polling solo necesita el bot para enviar mensajes
+                telegram_bot = init_telegram_bot(telegram_token, app.app_context, polling=role in BOT_ROLES)
+        else:
+            print("⚠️  Telegram bot token no configurado")
+
+    scheduler = None
+    if role in SCHEDULER_ROLES:
+        with step('scheduler'):
+            from scheduler import init_scheduler
+            scheduler = init_scheduler(app.app_context)
+
+    app.extensions['background'] = {'telegram_bot': telegram_bot, 'scheduler': scheduler}
+    print(f"✅ Aplicación creada con rol '{role}'")
+    return app
+
+
+def init_web(app):
+    """Rutas HTTP: API, estáticos con manifiesto y compresión"""
+    CORS(app, origins=app.config.get('CORS_ORIGINS', '*'))
+    init_compression(app)
+    with step('static'):
+        static_manifest = init_static_manifest(app)
+    with step('oauth'):
+        init_oauth(app)
+    init_profiler(app)
+
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(events_bp, url_prefix='/api')
+    app.register_blueprint(telegram_bp, url_prefix='/api')
+    app.register_blueprint(user_bp, url_prefix='/api')
+
+    @app.route('/api/scheduler/status')
+    def scheduler_status():
+        scheduler = app.extensions['background']['scheduler']
+        if scheduler:
+            return scheduler.get_scheduler_status()
+        return {'error': f"Scheduler no disponible en el rol '{app.config['APP_ROLE']}'"}, 503
+
+    # Ruta que captura todo: Werkzeug prioriza las rutas más específicas
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        # Búsqueda en el manifiesto en memoria: sin accesos al disco por petición
+        return static_manifest.serve(path)
+
+
+def register_cli(app):
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Crear tablas y aplicar migraciones pendientes"""
+        db.create_all()
+        applied = run_migrations()
+        click.echo(f"Migraciones aplicadas: {applied or 'ninguna'}")
+
+
+def shutdown_app(app):
+    """Detener el scheduler y el bot de este proceso, si los hay"""
+    background = app.extensions.get('background', {})
+
+    scheduler = background.get('scheduler')
+    if scheduler:
+        scheduler.shutdown()
+
+    telegram_bot = background.get('telegram_bot')
+    if telegram_bot:
+        import asyncio
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(telegram_bot.stop_bot())
+        finally:
+            loop.close()
+
+    # Escrituras encoladas por el bot o el scheduler
+    write_queue = get_write_queue()
+    if write_queue:
+        write_queue.shutdown()
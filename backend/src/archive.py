@@ -0,0 +1,101 @@
+import logging
+from datetime import timedelta
+from sqlalchemy import or_, text
+from models.user import db
+from models.event import Event, EventArchive
+from interval_index import event_index
+from calendar_summary import EventState, record_event_changes
+from change_log import DELETE, EVENT, record_changes
+from clock import utcnow
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Eventos activos que terminaron hace más de estos días también se archivan
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+# Filas movidas por transacción
+DEFAULT_ARCHIVE_BATCH_SIZE = 1000
+
+# Columnas comunes a events y events_archive
+ARCHIVED_COLUMNS = (
+    'id', 'user_id', 'title', 'description', 'start_time', 'end_time', 'category_id',
+    'reminder_minutes', 'is_active', 'created_at', 'updated_at', 'external_uid',
+)
+
+
+def archive_events(archive_after_days=DEFAULT_ARCHIVE_AFTER_DAYS, batch_size=DEFAULT_ARCHIVE_BATCH_SIZE):
+    """Mover a events_archive los eventos eliminados (soft delete) y los muy antiguos.
+
+    Cada lote se copia y se borra de events en la misma transacción, así la
+    tabla caliente solo conserva lo que los listados y recordatorios usan.
+    """
+    cutoff = utcnow() - timedelta(days=archive_after_days)
+    archived = 0
+
+    while True:
+        batch = db.session.execute(
+            db.select(
+                Event.id, Event.user_id, Event.start_time, Event.end_time,
+                Event.category_id, Event.is_active
+            )
+            .where(or_(Event.is_active == False, Event.end_time < cutoff))
+            .order_by(Event.id)
+            .limit(batch_size)
+        ).all()
+
+        if not batch:
+            break
+
+        event_ids = [row.id for row in batch]
+        source_columns = [getattr(Event, name) for name in ARCHIVED_COLUMNS]
+
+        # Los eventos todavía activos salen también de los agregados del calendario
+        active_by_user = {}
+        for row in batch:
+            if row.is_active:
+                active_by_user.setdefault(row.user_id, []).append(row)
+
+        try:
+            for user_id, rows in active_by_user.items():
+                record_event_changes(user_id, [
+                    (EventState(row.start_time, row.end_time, row.category_id, True), None) for row in rows
+                ])
+                # Para los clientes sincronizados el evento archivado desaparece
+                record_changes(user_id, EVENT, [row.id for row in rows], DELETE)
+            db.session.execute(
+                EventArchive.__table__.insert().from_select(
+                    list(ARCHIVED_COLUMNS) + ['archived_at'],
+                    db.select(*source_columns, db.literal(utcnow()))
+                    .where(Event.id.in_(event_ids))
+                )
+            )
+            db.session.execute(Event.__table__.delete().where(Event.id.in_(event_ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for user_id in {row.user_id for row in batch}:
+            event_index.invalidate_user(user_id)
+
+        archived += len(event_ids)
+        if len(event_ids) < batch_size:
+            break
+
+    return archived
+
+
+def maintain_database():
+    """Recuperar espacio y actualizar estadísticas después de archivar"""
+    engine = db.engine
+
+    # VACUUM no puede ejecutarse dentro de una transacción
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if engine.dialect.name == 'sqlite':
+            connection.execute(text('VACUUM'))
+            connection.execute(text('ANALYZE'))
+        elif engine.dialect.name == 'postgresql':
+            connection.execute(text('VACUUM ANALYZE events'))
+            connection.execute(text('ANALYZE events_archive'))
+
+    logger.info(f"Mantenimiento de base de datos completado ({engine.dialect.name})")
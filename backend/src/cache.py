@@ -0,0 +1,248 @@
+import json
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class LRUCacheBackend:
+    """Caché en memoria del proceso con expiración y desalojo LRU"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCacheBackend:
+    """Caché compartida entre procesos usando el protocolo de Redis (RESP).
+
+    Implementa solo GET, SET EX y DEL sobre un socket por hilo. Si el
+    servidor no responde, la caché se comporta como un fallo (se lee de la
+    base de datos) en lugar de romper la petición.
+    """
+
+    # Segundos sin intentar reconectar después de un fallo
+    RETRY_AFTER = 5
+
+    def __init__(self, url, socket_timeout=0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.database = int(parsed.path.lstrip('/') or 0)
+        self.socket_timeout = socket_timeout
+        self._local = threading.local()
+        self._down_until = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.socket_timeout)
+            connection = (sock, sock.makefile('rb'))
+            self._local.connection = connection
+            if self.password:
+                self._command('AUTH', self.password)
+            if self.database:
+                self._command('SELECT', self.database)
+        return connection
+
+    def _reset(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection:
+            try:
+                connection[1].close()
+                connection[0].close()
+            except OSError:
+                pass
+
+    def _command(self, *args):
+        sock, reader = self._connection()
+        payload = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            payload.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        sock.sendall(b''.join(payload))
+        return self._read_reply(reader)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError('Conexión cerrada por el servidor')
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b'+':
+            return rest.decode()
+        if prefix == b'-':
+            raise RuntimeError(rest.decode())
+        if prefix == b':':
+            return int(rest)
+        if prefix == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            return [self._read_reply(reader) for _ in range(int(rest))]
+        raise RuntimeError(f'Respuesta RESP inválida: {line!r}')
+
+    def _safe(self, *args):
+        if self._down_until > time.monotonic():
+            return None
+        try:
+            return self._command(*args)
+        except (OSError, ConnectionError, RuntimeError) as e:
+            logger.warning(f"Caché Redis no disponible ({args[0]}): {e}")
+            self._reset()
+            self._down_until = time.monotonic() + self.RETRY_AFTER
+            return None
+
+    def get(self, key):
+        data = self._safe('GET', key)
+        return json.loads(data) if data is not None else None
+
+    def set(self, key, value, ttl):
+        self._safe('SET', key, json.dumps(value), 'EX', int(ttl))
+
+    def delete(self, *keys):
+        if keys:
+            self._safe('DEL', *keys)
+
+    def clear(self):
+        self._safe('FLUSHDB')
+
+
+class ReadThroughCache:
+    """Caché de lectura: si la clave no está, se carga con la función dada"""
+
+    def __init__(self, backend, ttls=None, default_ttl=DEFAULT_TTL, prefix='horarios'):
+        self.backend = backend
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def key(self, kind, identifier):
+        return f'{self.prefix}:{kind}:{identifier}'
+
+    def get_or_load(self, kind, identifier, loader):
+        """Devolver el valor cacheado o cargarlo; None no se guarda"""
+        key = self.key(kind, identifier)
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+
+        value = loader()
+        if value is not None:
+            self.backend.set(key, value, self.ttls.get(kind, self.default_ttl))
+        return value
+
+    def invalidate(self, kind, identifier):
+        self.backend.delete(self.key(kind, identifier))
+
+    def clear(self):
+        self.backend.clear()
+
+
+class NullCacheBackend:
+    """Caché desactivada: todas las lecturas van a la base de datos"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+# Instancia global de la caché (en memoria hasta que se llame a init_cache)
+cache = ReadThroughCache(LRUCacheBackend())
+
+
+def init_cache(app):
+    """Configurar la caché según CACHE_BACKEND: memory, redis o none"""
+    backend_name = app.config.get('CACHE_BACKEND', 'memory')
+    if backend_name == 'redis':
+        backend = RedisCacheBackend(app.config.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    elif backend_name == 'none':
+        backend = NullCacheBackend()
+    else:
+        backend = LRUCacheBackend(app.config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+
+    cache.backend = backend
+    cache.default_ttl = app.config.get('CACHE_DEFAULT_TTL', DEFAULT_TTL)
+    cache.ttls = {
+        'settings': app.config.get('CACHE_TTL_SETTINGS', cache.default_ttl),
+        'categories': app.config.get('CACHE_TTL_CATEGORIES', cache.default_ttl),
+        'user': app.config.get('CACHE_TTL_USER', cache.default_ttl),
+    }
+    logger.info(f"Caché inicializada con backend {backend_name}")
+    return cache
+
+
+def get_cache():
+    """Obtener la instancia de la caché"""
+    return cache
+
+
+def get_settings_dict(user_id):
+    """Configuración del usuario (UserSettings.to_dict()) a través de la caché"""
+    from models.event import UserSettings
+
+    def load():
+        settings = UserSettings.query.filter_by(user_id=user_id).first()
+        return settings.to_dict() if settings else None
+
+    return cache.get_or_load('settings', user_id, load)
+
+
+def get_user_dict(user_id):
+    """Perfil del usuario (User.to_dict()) a través de la caché"""
+    from models.user import User
+
+    def load():
+        user = User.query.get(user_id)
+        return user.to_dict() if user else None
+
+    return cache.get_or_load('user', user_id, load)
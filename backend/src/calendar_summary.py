@@ -0,0 +1,225 @@
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from sqlalchemy.dialects import postgresql, sqlite
+from models.user import db
+from models.event import Event, CalendarAggregate, UserSettings
+from timezones import local_day_bounds_utc, to_local, zone_name
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# category_id guardado para los eventos sin categoría
+NO_CATEGORY = 0
+# Un evento muy largo solo suma minutos en sus primeros días
+MAX_SPAN_DAYS = 62
+# Rango máximo que se puede pedir al endpoint de resumen
+MAX_SUMMARY_DAYS = 400
+
+# Estado de un evento que afecta a los agregados
+EventState = namedtuple('EventState', ('start_time', 'end_time', 'category_id', 'is_active'))
+
+
+def event_state(event):
+    """Capturar el estado de un evento antes o después de modificarlo"""
+    return EventState(event.start_time, event.end_time, event.category_id, bool(event.is_active))
+
+
+def contributions(state, timezone):
+    """Aportación de un evento: {(día local, categoría): [eventos, minutos]}.
+
+    El evento cuenta una vez en el día en que empieza; sus minutos se reparten
+    entre los días locales que ocupa.
+    """
+    if state is None or not state.is_active or state.end_time <= state.start_time:
+        return {}
+
+    category_id = state.category_id or NO_CATEGORY
+    day = to_local(state.start_time, timezone).date()
+    result = {(day, category_id): [1, 0]}
+
+    for _ in range(MAX_SPAN_DAYS):
+        day_start, day_end = local_day_bounds_utc(timezone, day)
+        overlap = min(state.end_time, day_end) - max(state.start_time, day_start)
+        minutes = round(overlap.total_seconds() / 60)
+        if minutes > 0:
+            result.setdefault((day, category_id), [0, 0])[1] += minutes
+        if state.end_time <= day_end:
+            break
+        day += timedelta(days=1)
+
+    return result
+
+
+def _accumulate(totals, values, sign=1):
+    for key, (count, minutes) in values.items():
+        total = totals.setdefault(key, [0, 0])
+        total[0] += sign * count
+        total[1] += sign * minutes
+
+
+def user_timezone(user_id, executor=None):
+    """Zona horaria del usuario leída en la transacción que escribe los agregados.
+
+    No se usa la caché: en otro proceso puede seguir la zona anterior. En
+    PostgreSQL la fila queda bloqueada hasta confirmar, así que un cambio de
+    zona (que bloquea la misma fila antes de recalcular) no se cruza con la
+    escritura; SQLite ya serializa las escrituras.
+    """
+    executor = executor or db.session
+    timezone = executor.execute(
+        db.select(UserSettings.timezone)
+        .where(UserSettings.user_id == user_id)
+        .with_for_update()
+    ).scalar()
+    return zone_name(timezone)
+
+
+def _rows(user_id, totals):
+    return [
+        {
+            'user_id': user_id,
+            'day': day,
+            'category_id': category_id,
+            'event_count': count,
+            'busy_minutes': minutes,
+        }
+        for (day, category_id), (count, minutes) in totals.items()
+        if count or minutes
+    ]
+
+
+def _apply_deltas(executor, rows):
+    """Sumar las diferencias a las filas existentes (INSERT ... ON CONFLICT)"""
+    table = CalendarAggregate.__table__
+    dialect = executor.get_bind().dialect.name if hasattr(executor, 'get_bind') else executor.dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day, table.c.category_id],
+            set_={
+                'event_count': table.c.event_count + statement.excluded.event_count,
+                'busy_minutes': table.c.busy_minutes + statement.excluded.busy_minutes,
+            }
+        )
+        executor.execute(statement, rows)
+    else:
+        for row in rows:
+            updated = executor.execute(
+                table.update()
+                .where(
+                    table.c.user_id == row['user_id'],
+                    table.c.day == row['day'],
+                    table.c.category_id == row['category_id']
+                )
+                .values(
+                    event_count=table.c.event_count + row['event_count'],
+                    busy_minutes=table.c.busy_minutes + row['busy_minutes']
+                )
+            )
+            if not updated.rowcount:
+                executor.execute(table.insert(), [row])
+
+    # Las filas que quedan en cero no aportan nada al resumen
+    executor.execute(
+        table.delete().where(
+            table.c.user_id == rows[0]['user_id'],
+            table.c.day.in_({row['day'] for row in rows}),
+            table.c.event_count == 0,
+            table.c.busy_minutes == 0
+        )
+    )
+
+
+def record_event_changes(user_id, changes, timezone=None):
+    """Actualizar los agregados con una lista de cambios [(antes, después)].
+
+    Cada lado es un EventState o None (evento nuevo / borrado). Se ejecuta en
+    la sesión actual: el llamador confirma la transacción junto con el evento.
+    """
+    timezone = zone_name(timezone) if timezone else user_timezone(user_id)
+    totals = {}
+    for before, after in changes:
+        _accumulate(totals, contributions(before, timezone), -1)
+        _accumulate(totals, contributions(after, timezone))
+
+    rows = _rows(user_id, totals)
+    if rows:
+        _apply_deltas(db.session, rows)
+
+
+def record_event_change(user_id, before, after, timezone=None):
+    record_event_changes(user_id, [(before, after)], timezone)
+
+
+def rebuild_user_aggregates(user_id, timezone=None, executor=None):
+    """Recalcular desde cero los agregados de un usuario (p. ej. al cambiar de zona)"""
+    executor = executor or db.session
+    timezone = zone_name(timezone) if timezone else user_timezone(user_id, executor)
+    table = CalendarAggregate.__table__
+
+    totals = {}
+    rows = executor.execute(
+        db.select(Event.start_time, Event.end_time, Event.category_id).where(
+            Event.user_id == user_id,
+            Event.is_active == True
+        )
+    )
+    for start_time, end_time, category_id in rows:
+        _accumulate(totals, contributions(EventState(start_time, end_time, category_id, True), timezone))
+
+    executor.execute(table.delete().where(table.c.user_id == user_id))
+    rows = _rows(user_id, totals)
+    if rows:
+        executor.execute(table.insert(), rows)
+    return len(rows)
+
+
+def rebuild_all_aggregates(connection):
+    """Recalcular los agregados de todos los usuarios con eventos activos"""
+    users = connection.execute(
+        db.select(Event.user_id, UserSettings.timezone)
+        .outerjoin(UserSettings, UserSettings.user_id == Event.user_id)
+        .where(Event.is_active == True)
+        .distinct()
+    ).all()
+
+    for user_id, timezone in users:
+        rebuild_user_aggregates(user_id, timezone or 'UTC', executor=connection)
+    logger.info(f"Agregados de calendario recalculados para {len(users)} usuarios")
+
+
+def summarize(user_id, start_day, end_day, granularity='day'):
+    """Resumen de [start_day, end_day) por día o por semana (lunes) y por categoría"""
+    rows = db.session.execute(
+        db.select(
+            CalendarAggregate.day,
+            CalendarAggregate.category_id,
+            CalendarAggregate.event_count,
+            CalendarAggregate.busy_minutes
+        ).where(
+            CalendarAggregate.user_id == user_id,
+            CalendarAggregate.day >= start_day,
+            CalendarAggregate.day < end_day
+        )
+    )
+
+    buckets = {}
+    categories = {}
+    for day, category_id, count, minutes in rows:
+        bucket = day if granularity == 'day' else day - timedelta(days=day.weekday())
+        _accumulate(buckets, {bucket: (count, minutes)})
+        _accumulate(categories, {category_id: (count, minutes)})
+
+    return {
+        'buckets': [
+            {'start': bucket.isoformat(), 'count': count, 'busy_minutes': minutes}
+            for bucket, (count, minutes) in sorted(buckets.items())
+        ],
+        'categories': [
+            {'category_id': category_id or None, 'count': count, 'busy_minutes': minutes}
+            for category_id, (count, minutes) in sorted(categories.items())
+        ]
+    }
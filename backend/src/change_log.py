@@ -0,0 +1,136 @@
+import logging
+from datetime import timedelta
+from models.user import db
+from models.event import ChangeLog, Category, Event
+from event_reads import rows_to_dicts, select_events
+from clock import utcnow
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Cambios devueltos como máximo por petición (el resto con has_more)
+DEFAULT_CHANGES_LIMIT = 1000
+# Días que se conservan en change_log antes de purgar
+DEFAULT_RETENTION_DAYS = 30
+
+EVENT = 'event'
+CATEGORY = 'category'
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+# Clave del bloqueo de PostgreSQL que ordena las escrituras en change_log
+CHANGE_LOG_LOCK_KEY = 40_040
+
+
+class ChangeTokenExpired(Exception):
+    """El token es anterior a los cambios purgados: el cliente debe resincronizar"""
+
+
+def record_changes(user_id, entity, entity_ids, op=UPSERT):
+    """Anotar cambios en la sesión actual; se confirman junto con la escritura.
+
+    Los ids deben existir ya (hacer flush antes al crear filas nuevas).
+    """
+    entity_ids = [entity_id for entity_id in entity_ids if entity_id is not None]
+    if not entity_ids:
+        return
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Hasta el commit nadie más obtiene números: un token nunca deja
+        # atrás una transacción con un número menor que aún no confirmó
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(:key)'), {'key': CHANGE_LOG_LOCK_KEY})
+    now = utcnow()
+    db.session.execute(ChangeLog.__table__.insert(), [
+        {'user_id': user_id, 'entity': entity, 'entity_id': entity_id, 'op': op, 'created_at': now}
+        for entity_id in entity_ids
+    ])
+
+
+def record_change(user_id, entity, entity_id, op=UPSERT):
+    record_changes(user_id, entity, [entity_id], op)
+
+
+def latest_token():
+    """Token que representa 'ahora': el último número de secuencia asignado"""
+    return str(db.session.execute(db.select(db.func.max(ChangeLog.seq))).scalar() or 0)
+
+
+def parse_token(token):
+    if token is None or token == '':
+        raise ValueError('Token requerido')
+    value = int(token)
+    if value < 0:
+        raise ValueError('Token inválido')
+    return value
+
+
+def changes_since(user_id, since, limit=DEFAULT_CHANGES_LIMIT):
+    """Eventos y categorías cambiados después de `since`.
+
+    Devuelve el estado actual de cada entidad (no cada cambio intermedio):
+    las que siguen activas van completas y las borradas como tombstones.
+    """
+    current = db.session.execute(db.select(db.func.max(ChangeLog.seq))).scalar() or 0
+
+    oldest = db.session.execute(db.select(db.func.min(ChangeLog.seq))).scalar()
+    if oldest is not None and since + 1 < oldest:
+        raise ChangeTokenExpired(f'Token {since} anterior a los cambios conservados')
+
+    rows = db.session.execute(
+        db.select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id)
+        .where(ChangeLog.user_id == user_id, ChangeLog.seq > since, ChangeLog.seq <= current)
+        .order_by(ChangeLog.seq)
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    token = rows[-1].seq if has_more else current
+
+    event_ids = {row.entity_id for row in rows if row.entity == EVENT}
+    category_ids = {row.entity_id for row in rows if row.entity == CATEGORY}
+
+    events = []
+    if event_ids:
+        events = rows_to_dicts(db.session.execute(select_events(
+            Event.user_id == user_id,
+            Event.id.in_(event_ids),
+            Event.is_active == True
+        )))
+
+    categories = []
+    if category_ids:
+        categories = [
+            category.to_dict() for category in Category.query.filter(
+                Category.user_id == user_id,
+                Category.id.in_(category_ids)
+            ).order_by(Category.id)
+        ]
+
+    return {
+        'token': str(token),
+        'has_more': has_more,
+        'events': events,
+        'categories': categories,
+        'deleted': {
+            'events': sorted(event_ids - {event['id'] for event in events}),
+            'categories': sorted(category_ids - {category['id'] for category in categories}),
+        }
+    }
+
+
+def prune_change_log(retention_days=DEFAULT_RETENTION_DAYS):
+    """Borrar cambios antiguos conservando siempre el último (marca la secuencia)"""
+    cutoff = utcnow() - timedelta(days=retention_days)
+    newest = db.session.execute(db.select(db.func.max(ChangeLog.seq))).scalar()
+    if newest is None:
+        return 0
+
+    result = db.session.execute(
+        ChangeLog.__table__.delete().where(
+            ChangeLog.created_at < cutoff,
+            ChangeLog.seq < newest
+        )
+    )
+    db.session.commit()
+    logger.info(f"Purgados {result.rowcount} cambios de change_log")
+    return result.rowcount
@@ -0,0 +1,62 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class SystemClock:
+    """Hora real (UTC naive, como se guarda en la base de datos)"""
+
+    def utcnow(self):
+        return datetime.utcnow()
+
+
+class SimulatedClock:
+    """Hora virtual que solo avanza cuando se le indica (simulaciones y benchmarks)"""
+
+    def __init__(self, start):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def utcnow(self):
+        return self._now
+
+    def set(self, value):
+        with self._lock:
+            if value < self._now:
+                raise ValueError(f"El reloj simulado no retrocede ({value} < {self._now})")
+            self._now = value
+        return value
+
+    def advance(self, delta):
+        with self._lock:
+            self._now += delta
+            return self._now
+
+
+# Reloj del proceso: global y no por contexto, los jobs corren en otros hilos
+_clock = SystemClock()
+
+
+def utcnow():
+    """Hora actual según el reloj del proceso"""
+    return _clock.utcnow()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Sustituir el reloj del proceso; devuelve el anterior"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+@contextmanager
+def use_clock(clock):
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
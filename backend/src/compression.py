@@ -0,0 +1,118 @@
+import gzip
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+# Tipos de contenido que vale la pena comprimir
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/calendar',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+}
+
+DEFAULTS = {
+    'COMPRESS_BLUEPRINTS': ('events', 'telegram', 'auth'),
+    'COMPRESS_MIN_SIZE': 500,
+    'COMPRESS_GZIP_LEVEL': 6,
+    'COMPRESS_BROTLI_QUALITY': 4,
+    'COMPRESS_STREAMS': True,
+}
+
+
+def init_compression(app):
+    """Comprimir las respuestas de la API según el Accept-Encoding del cliente"""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+
+    @app.after_request
+    def compress_response(response):
+        return compress(response, app.config)
+
+    return app
+
+
+def choose_encoding(accept_encodings):
+    """Elegir la codificación preferida por el cliente entre las disponibles"""
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_bytes(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'])
+
+
+def compress_stream(chunks, encoding, config):
+    """Comprimir una respuesta generada por partes sin esperar a que termine"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            # Z_SYNC_FLUSH entrega cada parte al cliente en cuanto se genera
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def compress(response, config):
+    """Aplicar la compresión negociada a una respuesta si corresponde"""
+    if request.blueprint not in config['COMPRESS_BLUEPRINTS'] or request.method == 'HEAD':
+        return response
+
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    # La respuesta depende del Accept-Encoding aunque al final no se comprima
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding(request.accept_encodings)
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        if not config['COMPRESS_STREAMS']:
+            return response
+        response.response = compress_stream(response.response, encoding, config)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    data = response.get_data()
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    compressed = compress_bytes(data, encoding, config)
+    if len(compressed) >= len(data):
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from models.user import db
+from models.event import Event, EventArchive, Category
+
+# Filas por lote al recorrer resultados grandes (exportaciones, recordatorios)
+STREAM_BATCH_SIZE = 500
+
+EPOCH = datetime(1970, 1, 1)
+ONE_SECOND = timedelta(seconds=1)
+
+# Campos del formato columnar (format=columnar), en este orden
+COLUMNAR_FIELDS = (
+    'id', 'title', 'description', 'start_time', 'end_time', 'category_id',
+    'reminder_minutes', 'is_active', 'created_at', 'updated_at',
+)
+COLUMNAR_TIMESTAMPS = ('start_time', 'end_time', 'created_at', 'updated_at')
+
+# Columnas necesarias para el formato de Event.to_dict(), sin cargar objetos ORM
+EVENT_COLUMNS = (
+    Event.id,
+    Event.user_id,
+    Event.title,
+    Event.description,
+    Event.start_time,
+    Event.end_time,
+    Event.category_id,
+    Event.reminder_minutes,
+    Event.is_active,
+    Event.created_at,
+    Event.updated_at,
+)
+
+CATEGORY_COLUMNS = (
+    Category.user_id.label('category_user_id'),
+    Category.name.label('category_name'),
+    Category.color.label('category_color'),
+    Category.created_at.label('category_created_at'),
+)
+
+
+def select_events(*criteria):
+    """SELECT de eventos unidos a su categoría, ordenados por inicio"""
+    return (
+        db.select(*EVENT_COLUMNS, *CATEGORY_COLUMNS)
+        .select_from(Event)
+        .outerjoin(Category, Event.category_id == Category.id)
+        .where(*criteria)
+        .order_by(Event.start_time)
+    )
+
+
+def select_archived_events(*criteria):
+    """Mismo SELECT que select_events, sobre la tabla events_archive"""
+    columns = [getattr(EventArchive, column.key) for column in EVENT_COLUMNS]
+    return (
+        db.select(*columns, *CATEGORY_COLUMNS, EventArchive.external_uid)
+        .select_from(EventArchive)
+        .outerjoin(Category, EventArchive.category_id == Category.id)
+        .where(*criteria)
+        .order_by(EventArchive.start_time)
+    )
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def rows_to_dicts(rows):
+    """Convertir filas al mismo formato JSON que Event.to_dict()"""
+    categories = {}
+    events = []
+    append = events.append
+
+    for row in rows:
+        category = None
+        category_id = row.category_id
+        if category_id is not None and row.category_name is not None:
+            # Cada categoría se serializa una sola vez y se comparte entre eventos
+            category = categories.get(category_id)
+            if category is None:
+                category = categories[category_id] = {
+                    'id': category_id,
+                    'user_id': row.category_user_id,
+                    'name': row.category_name,
+                    'color': row.category_color,
+                    'created_at': _isoformat(row.category_created_at)
+                }
+
+        append({
+            'id': row.id,
+            'user_id': row.user_id,
+            'title': row.title,
+            'description': row.description,
+            'start_time': _isoformat(row.start_time),
+            'end_time': _isoformat(row.end_time),
+            'category_id': category_id,
+            'reminder_minutes': row.reminder_minutes,
+            'is_active': row.is_active,
+            'created_at': _isoformat(row.created_at),
+            'updated_at': _isoformat(row.updated_at),
+            'category': category
+        })
+
+    return events
+
+
+def _epoch(value):
+    return (value - EPOCH) // ONE_SECOND if value else None
+
+
+def rows_to_columns(rows):
+    """Formato columnar: un array por campo, fechas en segundos epoch (UTC)
+    y una tabla de categorías referenciada por category_id.
+
+    Los eventos de una misma consulta son todos del mismo usuario, así que
+    user_id no se repite por evento.
+    """
+    columns = {field: [] for field in COLUMNAR_FIELDS}
+    (add_id, add_title, add_description, add_start, add_end, add_category,
+     add_reminder, add_active, add_created, add_updated) = [columns[field].append for field in COLUMNAR_FIELDS]
+    categories = {}
+
+    for row in rows:
+        category_id = row.category_id
+        if category_id is not None and row.category_name is not None and category_id not in categories:
+            categories[category_id] = {
+                'name': row.category_name,
+                'color': row.category_color,
+                'created_at': _epoch(row.category_created_at)
+            }
+
+        add_id(row.id)
+        add_title(row.title)
+        add_description(row.description)
+        add_start(_epoch(row.start_time))
+        add_end(_epoch(row.end_time))
+        add_category(category_id)
+        add_reminder(row.reminder_minutes)
+        add_active(row.is_active)
+        add_created(_epoch(row.created_at))
+        add_updated(_epoch(row.updated_at))
+
+    return {
+        'format': 'columnar',
+        'count': len(columns['id']),
+        'timestamps': list(COLUMNAR_TIMESTAMPS),
+        'columns': columns,
+        # Claves de texto: JSON no admite claves enteras
+        'categories': {str(category_id): category for category_id, category in categories.items()}
+    }
+
+
+def stream_rows(statement, batch_size=STREAM_BATCH_SIZE):
+    """Recorrer un SELECT por lotes sin cargarlo entero.
+
+    Con PostgreSQL, yield_per abre un cursor del lado del servidor
+    (stream_results), así que la memoria no crece con el número de filas.
+    """
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _listing_criteria(user_id, start_time, end_time):
+    criteria = [Event.user_id == user_id, Event.is_active == True]
+    if start_time is not None:
+        criteria.append(Event.start_time >= start_time)
+    if end_time is not None:
+        criteria.append(Event.end_time <= end_time)
+    return criteria
+
+
+def list_event_dicts(user_id, start_time=None, end_time=None):
+    """Eventos activos del usuario listos para serializar, filtrados por rango opcional"""
+    criteria = _listing_criteria(user_id, start_time, end_time)
+    return rows_to_dicts(db.session.execute(select_events(*criteria)))
+
+
+def list_event_columns(user_id, start_time=None, end_time=None):
+    """Mismos eventos que list_event_dicts en formato columnar"""
+    criteria = _listing_criteria(user_id, start_time, end_time)
+    return rows_to_columns(db.session.execute(select_events(*criteria)))
+
+
+def list_agenda(user_id, day_start, day_end):
+    """Filas de los eventos activos que empiezan en [day_start, day_end), para mensajes del bot.
+
+    Cada fila expone title, description, start_time, end_time y category_name.
+    """
+    return db.session.execute(
+        select_events(
+            Event.user_id == user_id,
+            Event.is_active == True,
+            Event.start_time >= day_start,
+            Event.start_time < day_end
+        )
+    ).all()
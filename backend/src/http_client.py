@@ -0,0 +1,43 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (conexión, lectura) en segundos: un proveedor lento no bloquea al worker
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Solo se reintentan peticiones idempotentes; un POST se reintenta únicamente
+# si la conexión no llegó a establecerse (el código OAuth es de un solo uso)
+DEFAULT_RETRY = Retry(
+    total=2,
+    connect=2,
+    read=1,
+    status=2,
+    backoff_factor=0.2,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({'GET', 'HEAD'}),
+    raise_on_status=False,
+)
+
+
+class PooledSession(requests.Session):
+    """Sesión HTTP con conexiones keep-alive reutilizables y timeout por defecto"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retry=DEFAULT_RETRY, pool_connections=10, pool_maxsize=20):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+# Instancia global compartida por todos los hilos del proceso
+http_session = PooledSession()
+
+
+def get_http_session():
+    """Obtener la sesión HTTP compartida"""
+    return http_session
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+# Identificador del producto en la cabecera del calendario
+PRODID = '-//Sistema de Horarios con Telegram//ES'
+
+
+def escape_text(value):
+    """Escapar un valor TEXT según RFC 5545"""
+    return (
+        value.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Plegar líneas de más de 75 octetos"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = ''
+            limit = 74  # las líneas de continuación empiezan con un espacio
+        current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(value):
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def vevent_lines(row, stamp):
+    """Líneas de un VEVENT a partir de una fila de event_reads.select_events"""
+    uid = row.external_uid or f'event-{row.id}@horarios'
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{escape_text(uid)}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{format_utc(row.start_time)}',
+        f'DTEND:{format_utc(row.end_time)}',
+        f'SUMMARY:{escape_text(row.title)}',
+    ]
+    if row.description:
+        lines.append(f'DESCRIPTION:{escape_text(row.description)}')
+    if row.category_name:
+        lines.append(f'CATEGORIES:{escape_text(row.category_name)}')
+    if not row.is_active:
+        lines.append('STATUS:CANCELLED')
+    if row.reminder_minutes:
+        lines.extend([
+            'BEGIN:VALARM',
+            'ACTION:DISPLAY',
+            f'DESCRIPTION:{escape_text(row.title)}',
+            f'TRIGGER:-PT{row.reminder_minutes}M',
+            'END:VALARM',
+        ])
+    lines.append('END:VEVENT')
+    return lines
+
+
+def iter_ics(rows):
+    """Generar el calendario por partes, un VEVENT por fila"""
+    stamp = format_utc(datetime.utcnow())
+    yield f'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\nCALSCALE:GREGORIAN\r\n'
+    for row in rows:
+        yield ''.join(fold_line(line) for line in vevent_lines(row, stamp))
+    yield 'END:VCALENDAR\r\n'
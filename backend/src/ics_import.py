@@ -0,0 +1,343 @@
+import logging
+import re
+from datetime import datetime, timedelta
+import pytz
+from models.user import db
+from models.event import Event, Category
+from calendar_summary import event_state, record_event_changes
+from change_log import CATEGORY, DELETE, EVENT, record_change, record_changes
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Número de eventos que se confirman en cada transacción
+DEFAULT_BATCH_SIZE = 500
+
+# Duración por defecto si el VEVENT no trae DTEND ni DURATION
+DEFAULT_DURATION_MINUTES = 60
+
+_DURATION_RE = re.compile(
+    r'^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$'
+)
+
+
+class ICSImportError(Exception):
+    """Error de formato en el archivo iCalendar"""
+
+
+def iter_unfolded_lines(stream):
+    """Leer el archivo línea a línea deshaciendo el plegado de RFC 5545"""
+    pending = None
+    for raw_line in stream:
+        if isinstance(raw_line, bytes):
+            raw_line = raw_line.decode('utf-8', errors='replace')
+        line = raw_line.rstrip('\r\n')
+        if pending is None:
+            line = line.lstrip('\ufeff')
+        if not line:
+            continue
+        if line[0] in (' ', '\t') and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending is not None:
+        yield pending
+
+
+def parse_property(line):
+    """Separar una línea en (nombre, parámetros, valor)"""
+    in_quotes = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ':' and not in_quotes:
+            head, value = line[:index], line[index + 1:]
+            break
+    else:
+        raise ICSImportError(f'Línea inválida: {line[:50]}')
+
+    parts = head.split(';')
+    params = {}
+    for param in parts[1:]:
+        if '=' in param:
+            key, param_value = param.split('=', 1)
+            params[key.upper()] = param_value.strip('"')
+    return parts[0].upper(), params, value
+
+
+def iter_vevents(stream):
+    """Generar un diccionario de propiedades por cada VEVENT del archivo"""
+    current = None
+    in_alarm = False
+    for line_number, line in enumerate(iter_unfolded_lines(stream)):
+        try:
+            name, params, value = parse_property(line)
+        except ICSImportError as e:
+            if line_number == 0:
+                raise
+            logger.warning(f"Línea ignorada en archivo .ics: {e}")
+            continue
+
+        if line_number == 0 and (name, value.upper()) != ('BEGIN', 'VCALENDAR'):
+            raise ICSImportError('El archivo no es un calendario iCalendar válido')
+
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            current = {}
+        elif name == 'END' and value.upper() == 'VEVENT':
+            if current is not None:
+                yield current
+            current = None
+        elif current is None:
+            continue
+        elif name == 'BEGIN' and value.upper() == 'VALARM':
+            in_alarm = True
+        elif name == 'END' and value.upper() == 'VALARM':
+            in_alarm = False
+        elif in_alarm:
+            # Solo nos interesa el primer aviso relativo al inicio
+            if name == 'TRIGGER' and 'VALARM_TRIGGER' not in current:
+                current['VALARM_TRIGGER'] = (params, value)
+        elif name not in current:
+            current[name] = (params, value)
+
+
+def unescape_text(value):
+    """Deshacer el escapado de valores TEXT"""
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            following = next(chars, '')
+            result.append('\n' if following in ('n', 'N') else following)
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def parse_duration(value):
+    """Convertir una duración iCalendar (ej. -PT15M) en timedelta"""
+    match = _DURATION_RE.match(value.strip())
+    if not match:
+        raise ICSImportError(f'Duración inválida: {value}')
+    parts = {key: int(val) for key, val in match.groupdict().items() if val and key != 'sign'}
+    delta = timedelta(
+        weeks=parts.get('weeks', 0),
+        days=parts.get('days', 0),
+        hours=parts.get('hours', 0),
+        minutes=parts.get('minutes', 0),
+        seconds=parts.get('seconds', 0)
+    )
+    return -delta if match.group('sign') == '-' else delta
+
+
+def _get_timezone(name, fallback):
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        return fallback
+
+
+def parse_ics_datetime(params, value, default_tz):
+    """Convertir DTSTART/DTEND a datetime naive en UTC. Devuelve (datetime, es_fecha)"""
+    value = value.strip()
+    if params.get('VALUE', '').upper() == 'DATE' or len(value) == 8:
+        local = datetime.strptime(value[:8], '%Y%m%d')
+        return default_tz.localize(local).astimezone(pytz.utc).replace(tzinfo=None), True
+
+    if value.endswith('Z'):
+        return datetime.strptime(value[:-1], '%Y%m%dT%H%M%S'), False
+
+    local = datetime.strptime(value, '%Y%m%dT%H%M%S')
+    tz = _get_timezone(params['TZID'], default_tz) if 'TZID' in params else default_tz
+    return tz.localize(local).astimezone(pytz.utc).replace(tzinfo=None), False
+
+
+def vevent_to_fields(props, default_tz, default_reminder_minutes):
+    """Mapear las propiedades de un VEVENT a los campos de Event"""
+    if 'UID' not in props or 'DTSTART' not in props:
+        return None
+
+    uid = props['UID'][1].strip()
+    if 'RECURRENCE-ID' in props:
+        # Las excepciones de una serie comparten UID con el evento maestro
+        uid = f"{uid}/{props['RECURRENCE-ID'][1].strip()}"
+
+    start_time, all_day = parse_ics_datetime(*props['DTSTART'], default_tz)
+
+    if 'DTEND' in props:
+        end_time, _ = parse_ics_datetime(*props['DTEND'], default_tz)
+    elif 'DURATION' in props:
+        end_time = start_time + parse_duration(props['DURATION'][1])
+    elif all_day:
+        end_time = start_time + timedelta(days=1)
+    else:
+        end_time = start_time + timedelta(minutes=DEFAULT_DURATION_MINUTES)
+
+    if end_time <= start_time:
+        end_time = start_time + timedelta(minutes=DEFAULT_DURATION_MINUTES)
+
+    reminder_minutes = default_reminder_minutes
+    if 'VALARM_TRIGGER' in props:
+        trigger_params, trigger_value = props['VALARM_TRIGGER']
+        if trigger_params.get('VALUE', '').upper() != 'DATE-TIME':
+            offset = parse_duration(trigger_value)
+            if offset <= timedelta(0):
+                reminder_minutes = int(-offset.total_seconds() // 60)
+
+    category_name = None
+    if 'CATEGORIES' in props:
+        names = [unescape_text(name).strip() for name in re.split(r'(?<!\\),', props['CATEGORIES'][1])]
+        category_name = next((name for name in names if name), None)
+
+    return {
+        'external_uid': uid[:255],
+        'title': unescape_text(props.get('SUMMARY', ({}, 'Sin título'))[1]).strip()[:200] or 'Sin título',
+        'description': unescape_text(props['DESCRIPTION'][1]) if 'DESCRIPTION' in props else '',
+        'start_time': start_time,
+        'end_time': end_time,
+        'reminder_minutes': reminder_minutes,
+        'category_name': category_name,
+        'cancelled': props.get('STATUS', ({}, ''))[1].strip().upper() == 'CANCELLED'
+    }
+
+
+class ICSImporter:
+    """Importa un archivo .ics en lotes, actualizando eventos ya importados por su UID"""
+
+    def __init__(self, user_id, timezone='UTC', default_reminder_minutes=30, batch_size=DEFAULT_BATCH_SIZE):
+        self.user_id = user_id
+        self.timezone = timezone or 'UTC'
+        self.default_tz = _get_timezone(timezone or 'UTC', pytz.utc)
+        self.default_reminder_minutes = default_reminder_minutes
+        self.batch_size = batch_size
+        self.categories = None
+        self.stats = {'created': 0, 'updated': 0, 'cancelled': 0, 'skipped': 0, 'failed': 0, 'batches': 0}
+
+    def import_stream(self, stream):
+        """Procesar el archivo sin cargarlo completo en memoria"""
+        batch = {}
+        for props in iter_vevents(stream):
+            try:
+                fields = vevent_to_fields(props, self.default_tz, self.default_reminder_minutes)
+            except (ICSImportError, ValueError) as e:
+                logger.warning(f"VEVENT ignorado para usuario {self.user_id}: {e}")
+                fields = None
+
+            if not fields:
+                self.stats['skipped'] += 1
+                continue
+
+            # Dentro de un mismo lote gana la última aparición del UID
+            batch[fields['external_uid']] = fields
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = {}
+
+        if batch:
+            self._flush(batch)
+
+        return self.stats
+
+    def _category_id(self, name):
+        """Resolver la categoría por nombre, creándola si no existe"""
+        if not name:
+            return None
+
+        if self.categories is None:
+            self.categories = {
+                category.name: category.id
+                for category in Category.query.filter_by(user_id=self.user_id).all()
+            }
+
+        if name not in self.categories:
+            category = Category(user_id=self.user_id, name=name[:100])
+            db.session.add(category)
+            db.session.flush()
+            record_change(self.user_id, CATEGORY, category.id)
+            self.categories[name] = category.id
+
+        return self.categories[name]
+
+    def _flush(self, batch):
+        """Insertar o actualizar un lote completo en una sola transacción"""
+        categories_snapshot = dict(self.categories) if self.categories is not None else None
+        try:
+            existing = {
+                event.external_uid: event
+                for event in Event.query.filter(
+                    Event.user_id == self.user_id,
+                    Event.external_uid.in_(list(batch.keys()))
+                ).all()
+            }
+
+            new_events = []
+            changes = []
+            upserted_ids = []
+            cancelled_ids = []
+            created = updated = cancelled = 0
+            now = datetime.utcnow()
+
+            for uid, fields in batch.items():
+                event = existing.get(uid)
+
+                if fields['cancelled']:
+                    if event and event.is_active:
+                        changes.append((event_state(event), None))
+                        cancelled_ids.append(event.id)
+                        event.is_active = False
+                        event.updated_at = now
+                        cancelled += 1
+                    continue
+
+                category_id = self._category_id(fields['category_name'])
+
+                if event:
+                    previous_state = event_state(event)
+                    event.title = fields['title']
+                    event.description = fields['description']
+                    event.start_time = fields['start_time']
+                    event.end_time = fields['end_time']
+                    event.reminder_minutes = fields['reminder_minutes']
+                    event.category_id = category_id
+                    event.is_active = True
+                    event.updated_at = now
+                    changes.append((previous_state, event_state(event)))
+                    upserted_ids.append(event.id)
+                    updated += 1
+                else:
+                    new_events.append(Event(
+                        user_id=self.user_id,
+                        external_uid=uid,
+                        title=fields['title'],
+                        description=fields['description'],
+                        start_time=fields['start_time'],
+                        end_time=fields['end_time'],
+                        category_id=category_id,
+                        reminder_minutes=fields['reminder_minutes'],
+                        is_active=True
+                    ))
+                    created += 1
+
+            db.session.add_all(new_events)
+            db.session.flush()
+            changes.extend((None, event_state(event)) for event in new_events)
+            # Zona actual del usuario, no la del inicio de la importación
+            record_event_changes(self.user_id, changes)
+            record_changes(self.user_id, EVENT, [event.id for event in new_events] + upserted_ids)
+            record_changes(self.user_id, EVENT, cancelled_ids, DELETE)
+            db.session.commit()
+
+            self.stats['created'] += created
+            self.stats['updated'] += updated
+            self.stats['cancelled'] += cancelled
+            self.stats['batches'] += 1
+
+        except Exception as e:
+            db.session.rollback()
+            # Las categorías creadas en el lote fallido no llegaron a guardarse
+            self.categories = categories_snapshot
+            self.stats['failed'] += len(batch)
+            logger.error(f"Error importando lote para usuario {self.user_id}: {e}")
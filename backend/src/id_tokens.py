@@ -0,0 +1,121 @@
+import logging
+import os
+import re
+import threading
+import time
+import requests
+from authlib.jose import JsonWebKey, JsonWebToken
+from authlib.jose.errors import JoseError
+from http_client import get_http_session
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+GOOGLE_JWKS_URL = 'https://www.googleapis.com/oauth2/v3/certs'
+GOOGLE_ISSUERS = ('https://accounts.google.com', 'accounts.google.com')
+
+# Sin Cache-Control, las claves se vuelven a descargar cada hora
+DEFAULT_JWKS_TTL = 3600
+# Tiempo mínimo entre descargas forzadas por un 'kid' desconocido
+MIN_REFRESH_INTERVAL = 60
+# Margen para diferencias de reloj al validar exp/iat
+CLOCK_LEEWAY = 60
+
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class IdTokenError(Exception):
+    """El id_token no se pudo verificar"""
+
+
+class IdTokenVerifier:
+    """Verificación local de id_tokens (JWT RS256) con las claves JWKS en caché.
+
+    Las claves se descargan una vez y se reutilizan hasta que caduca el
+    Cache-Control del proveedor; un 'kid' desconocido fuerza una nueva
+    descarga (como mucho una por minuto) para seguir la rotación de claves.
+    """
+
+    def __init__(self, jwks_url, issuers, audience):
+        self.jwks_url = jwks_url
+        self.issuers = list(issuers)
+        self.audience = audience
+        self._jwt = JsonWebToken(['RS256'])
+        self._keys = None
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+
+    def _fetch_keys(self):
+        response = get_http_session().get(self.jwks_url)
+        response.raise_for_status()
+
+        ttl = DEFAULT_JWKS_TTL
+        match = MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+        if match:
+            ttl = int(match.group(1))
+
+        self._keys = JsonWebKey.import_key_set(response.json())
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + ttl
+        logger.info(f"Claves JWKS descargadas de {self.jwks_url} (válidas {ttl}s)")
+
+    def get_keys(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if self._keys is None or now >= self._expires_at:
+                self._fetch_keys()
+            elif force and now - self._fetched_at >= MIN_REFRESH_INTERVAL:
+                self._fetch_keys()
+            return self._keys
+
+    def _load_key(self, header, payload):
+        kid = header.get('kid')
+        try:
+            return self.get_keys().find_by_kid(kid)
+        except ValueError:
+            # Posible rotación de claves: volver a descargar y reintentar
+            return self.get_keys(force=True).find_by_kid(kid)
+
+    def verify(self, token):
+        """Devolver las claims del id_token o lanzar IdTokenError"""
+        if not token:
+            raise IdTokenError('Respuesta sin id_token')
+
+        try:
+            claims = self._jwt.decode(
+                token,
+                self._load_key,
+                claims_options={
+                    'iss': {'essential': True, 'values': self.issuers},
+                    'aud': {'essential': True, 'value': self.audience},
+                    'exp': {'essential': True},
+                    'sub': {'essential': True},
+                }
+            )
+            claims.validate(leeway=CLOCK_LEEWAY)
+        except (JoseError, ValueError, requests.RequestException) as e:
+            raise IdTokenError(str(e)) from e
+
+        return dict(claims)
+
+
+# Instancias por client_id (la configuración se lee del entorno)
+_verifiers = {}
+_verifiers_lock = threading.Lock()
+
+
+def get_google_verifier(client_id):
+    """Verificador de id_tokens de Google para un client_id"""
+    jwks_url = os.environ.get('GOOGLE_JWKS_URL', GOOGLE_JWKS_URL)
+    key = (client_id, jwks_url)
+    with _verifiers_lock:
+        verifier = _verifiers.get(key)
+        if verifier is None:
+            issuers = os.environ.get('GOOGLE_ISSUERS')
+            verifier = _verifiers[key] = IdTokenVerifier(
+                jwks_url,
+                issuers.split(',') if issuers else GOOGLE_ISSUERS,
+                client_id
+            )
+        return verifier
@@ -0,0 +1,263 @@
+import random
+import threading
+from collections import Counter, OrderedDict
+from models.user import db
+from models.event import Event, ChangeLog
+
+# Número máximo de usuarios con índice cargado en memoria
+DEFAULT_MAX_USERS = 1000
+
+
+class _Node:
+    __slots__ = ('start', 'end', 'event_id', 'priority', 'max_end', 'left', 'right')
+
+    def __init__(self, start, end, event_id):
+        self.start = start
+        self.end = end
+        self.event_id = event_id
+        self.priority = random.random()
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+    @property
+    def key(self):
+        return (self.start, self.end, self.event_id)
+
+    def update(self):
+        max_end = self.end
+        if self.left and self.left.max_end > max_end:
+            max_end = self.left.max_end
+        if self.right and self.right.max_end > max_end:
+            max_end = self.right.max_end
+        self.max_end = max_end
+
+
+def _rotate_right(node):
+    left = node.left
+    node.left = left.right
+    left.right = node
+    node.update()
+    left.update()
+    return left
+
+
+def _rotate_left(node):
+    right = node.right
+    node.right = right.left
+    right.left = node
+    node.update()
+    right.update()
+    return right
+
+
+class IntervalTree:
+    """Árbol de intervalos (treap ordenado por inicio y aumentado con el fin máximo).
+
+    Inserción y borrado en O(log n); la búsqueda de solapamientos descarta
+    cualquier subárbol cuyo fin máximo no alcance la ventana consultada.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def insert(self, start, end, event_id):
+        self.root = self._insert(self.root, _Node(start, end, event_id))
+        self.size += 1
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if new.key < node.key:
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = _rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = _rotate_left(node)
+        node.update()
+        return node
+
+    def remove(self, start, end, event_id):
+        self.root = self._remove(self.root, (start, end, event_id))
+        self.size -= 1
+
+    def _remove(self, node, key):
+        if node is None:
+            return None
+        if key < node.key:
+            node.left = self._remove(node.left, key)
+        elif key > node.key:
+            node.right = self._remove(node.right, key)
+        else:
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            # Bajar el nodo rotando hacia el hijo de mayor prioridad
+            if node.left.priority > node.right.priority:
+                node = _rotate_right(node)
+                node.right = self._remove(node.right, key)
+            else:
+                node = _rotate_left(node)
+                node.left = self._remove(node.left, key)
+        node.update()
+        return node
+
+    def overlapping(self, start, end):
+        """Intervalos que se solapan con [start, end), ordenados por inicio"""
+        result = []
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+                continue
+            if not stack:
+                break
+            node = stack.pop()
+            if node.start >= end:
+                break
+            if node.end > start:
+                result.append((node.start, node.end, node.event_id))
+            node = node.right
+        return result
+
+
+class UserIntervalIndex:
+    """Intervalos de los eventos activos de un usuario"""
+
+    def __init__(self):
+        self.tree = IntervalTree()
+        self.events = {}
+
+    def add(self, event_id, start, end):
+        self.discard(event_id)
+        self.tree.insert(start, end, event_id)
+        self.events[event_id] = (start, end)
+
+    def discard(self, event_id):
+        interval = self.events.pop(event_id, None)
+        if interval:
+            self.tree.remove(interval[0], interval[1], event_id)
+
+    def conflicts(self, start, end, exclude_id=None):
+        return [
+            event_id for _, _, event_id in self.tree.overlapping(start, end)
+            if event_id != exclude_id
+        ]
+
+    def busy_blocks(self, start, end):
+        """Bloques ocupados fusionados y recortados a la ventana [start, end)"""
+        blocks = []
+        for block_start, block_end, _ in self.tree.overlapping(start, end):
+            block_start = max(block_start, start)
+            block_end = min(block_end, end)
+            if blocks and block_start <= blocks[-1][1]:
+                if block_end > blocks[-1][1]:
+                    blocks[-1][1] = block_end
+            else:
+                blocks.append([block_start, block_end])
+        return [tuple(block) for block in blocks]
+
+
+class EventIntervalIndex:
+    """Índices por usuario construidos desde la tabla events y mantenidos al escribir"""
+
+    def __init__(self, max_users=DEFAULT_MAX_USERS):
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_seq = None
+        # Cambios ya aplicados por sync_event que aún no pasaron por catch_up
+        self._own_changes = Counter()
+
+    def _load(self, user_id):
+        index = UserIntervalIndex()
+        rows = db.session.execute(
+            db.select(Event.id, Event.start_time, Event.end_time).where(
+                Event.user_id == user_id,
+                Event.is_active == True
+            )
+        )
+        for event_id, start, end in rows:
+            index.add(event_id, start, end)
+        return index
+
+    def get(self, user_id):
+        """Obtener (y construir si hace falta) el índice de un usuario"""
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                self._users.move_to_end(user_id)
+                return index
+
+            index = self._load(user_id)
+            self._users[user_id] = index
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            return index
+
+    def catch_up(self):
+        """Descartar los usuarios cuyos eventos cambiaron en otro proceso.
+
+        Con varios workers cada uno tiene su propio índice; change_log dice
+        qué eventos cambiaron desde la última consulta. Los cambios que este
+        proceso ya aplicó con sync_event no obligan a recargar al usuario.
+        """
+        latest = db.session.execute(db.select(db.func.max(ChangeLog.seq))).scalar() or 0
+        if self._last_seq is not None and latest > self._last_seq:
+            changes = db.session.execute(
+                db.select(ChangeLog.user_id, ChangeLog.entity_id).where(
+                    ChangeLog.seq > self._last_seq,
+                    ChangeLog.seq <= latest,
+                    ChangeLog.entity == 'event'
+                )
+            )
+            for user_id, event_id in changes:
+                if self._own_changes[(user_id, event_id)] > 0:
+                    self._own_changes[(user_id, event_id)] -= 1
+                elif user_id in self._users:
+                    self._users.pop(user_id)
+        # Un sync_event sin fila en change_log no debe ocultar cambios posteriores
+        self._own_changes.clear()
+        self._last_seq = latest
+
+    def find_conflicts(self, user_id, start, end, exclude_id=None):
+        with self._lock:
+            self.catch_up()
+            return self.get(user_id).conflicts(start, end, exclude_id)
+
+    def busy_blocks(self, user_id, start, end):
+        with self._lock:
+            self.catch_up()
+            return self.get(user_id).busy_blocks(start, end)
+
+    def sync_event(self, event):
+        """Reflejar en el índice el estado ya confirmado de un evento"""
+        with self._lock:
+            index = self._users.get(event.user_id)
+            if index is None:
+                return
+            self._own_changes[(event.user_id, event.id)] += 1
+            if event.is_active:
+                index.add(event.id, event.start_time, event.end_time)
+            else:
+                index.discard(event.id)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._own_changes.clear()
+            self._last_seq = None
+
+
+# Instancia global del índice
+event_index = EventIntervalIndex()
@@ -0,0 +1,395 @@
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from models.user import db
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+PREFIX = 'horarios_'
+
+# Límites de los histogramas en segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5, 30, 60, 300)
+
+# Intervalo del temporizador que mide el retraso del event loop del bot
+LOOP_LAG_INTERVAL = 1.0
+# /readyz falla si el loop del bot va más retrasado que esto
+MAX_READY_LOOP_LAG = 5.0
+# Roles cuyo bot hace polling y debe estar arrancado para estar listo
+POLLING_ROLES = ('bot', 'worker', 'all')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    """Valor puntual; con `function` se calcula en cada lectura de /metrics"""
+
+    def __init__(self, name, help_text, function=None):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.function = function
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+    def collect(self):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception as e:
+                logger.warning(f"No se pudo calcular {self.name}: {e}")
+                value = None
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        if value is not None:
+            lines.append(f'{self.name} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Histograma acumulativo con límites fijos: observar es un bisect y dos sumas"""
+
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # labels -> [conteos por límite..., +Inf, suma]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames + ('le',), labels + (_format_value(float(bound)),))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+# Registro global del proceso (cada proceso expone sus propias métricas)
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'Tiempo hasta generar la respuesta por endpoint',
+    LATENCY_BUCKETS, ('endpoint', 'method')
+))
+REQUESTS = registry.register(Counter(
+    'http_requests_total', 'Peticiones atendidas por endpoint y código', ('endpoint', 'status')
+))
+POOL_WAIT = registry.register(Histogram(
+    'db_pool_wait_seconds', 'Espera para obtener una conexión del pool', LATENCY_BUCKETS
+))
+POOL_HOLD = registry.register(Histogram(
+    'db_pool_checkout_seconds', 'Tiempo que cada conexión pasa fuera del pool', LATENCY_BUCKETS
+))
+POOL_TIMEOUTS = registry.register(Counter(
+    'db_pool_timeouts_total', 'Peticiones de conexión que agotaron pool_timeout'
+))
+LOOP_LAG = registry.register(Histogram(
+    'bot_loop_lag_seconds', 'Retraso del temporizador periódico del event loop del bot', LAG_BUCKETS
+))
+LOOP_LAG_LAST = registry.register(Gauge(
+    'bot_loop_lag_last_seconds', 'Último retraso medido en el event loop del bot'
+))
+UPDATE_LAG = registry.register(Histogram(
+    'bot_update_lag_seconds', 'Tiempo entre el envío de un mensaje en Telegram y su procesamiento', LAG_BUCKETS
+))
+JOB_DELAY = registry.register(Histogram(
+    'scheduler_job_delay_seconds', 'Retraso de cada ejecución respecto a su hora programada',
+    LAG_BUCKETS, ('job',)
+))
+JOB_EVENTS = registry.register(Counter(
+    'scheduler_job_events_total', 'Ejecuciones de jobs por resultado', ('job', 'result')
+))
+
+
+# Proceso instrumentado: los gauges se calculan al leer /metrics
+_instrumented = {'engine': None, 'app': None}
+
+
+def _pool_value(method):
+    engine = _instrumented['engine']
+    if engine is None or not isinstance(engine.pool, QueuePool):
+        return None
+    return getattr(engine.pool, method)()
+
+
+def _background(name):
+    app = _instrumented['app']
+    return app.extensions.get('background', {}).get(name) if app else None
+
+
+def _scheduler_value(function):
+    notification_scheduler = _background('scheduler')
+    if notification_scheduler is None or not notification_scheduler.scheduler.running:
+        return None
+    return function(notification_scheduler)
+
+
+registry.register(Gauge('db_pool_size', 'Conexiones permanentes del pool', lambda: _pool_value('size')))
+registry.register(Gauge('db_pool_checked_out', 'Conexiones en uso', lambda: _pool_value('checkedout')))
+registry.register(Gauge('db_pool_overflow', 'Conexiones por encima de pool_size', lambda: _pool_value('overflow')))
+registry.register(Gauge(
+    'scheduler_backlog_jobs', 'Jobs vencidos pendientes de ejecutar',
+    lambda: _scheduler_value(scheduler_backlog)
+))
+registry.register(Gauge(
+    'scheduler_jobs', 'Jobs programados',
+    lambda: _scheduler_value(lambda scheduler: len(scheduler.scheduler.get_jobs()))
+))
+registry.register(Gauge(
+    'telegram_sends_in_flight', 'Mensajes de Telegram en envío',
+    lambda: _scheduler_value(lambda scheduler: scheduler.in_flight_count())
+))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada checkout por una conexión"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception as e:
+            if type(e).__name__ == 'TimeoutError':
+                POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info['checkout_started'] = time.perf_counter()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    started = connection_record.info.pop('checkout_started', None)
+    if started is not None:
+        POOL_HOLD.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """Medir el tiempo que cada conexión pasa fuera del pool"""
+    if not event.contains(engine, 'checkout', _on_checkout):
+        event.listen(engine, 'checkout', _on_checkout)
+        event.listen(engine, 'checkin', _on_checkin)
+    _instrumented['engine'] = engine
+
+
+async def monitor_loop_lag(interval=LOOP_LAG_INTERVAL):
+    """Medir el retraso del loop actual: un sleep que despierta tarde indica un loop ocupado"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+
+
+def observe_update(message_date):
+    """Retraso de un update de Telegram (polling o webhook) desde que se envió"""
+    if message_date is not None:
+        UPDATE_LAG.observe(max(0.0, time.time() - message_date.timestamp()))
+
+
+def _job_name(job_id):
+    # Un job por usuario (daily_summary_3, daily_summary_7...): una sola serie
+    return job_id.rstrip('0123456789').rstrip('_') or job_id
+
+
+def instrument_scheduler(scheduler):
+    """Retraso y resultado de cada ejecución de jobs de APScheduler"""
+    from apscheduler.events import (
+        EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+    )
+    results = {
+        EVENT_JOB_EXECUTED: 'ok',
+        EVENT_JOB_ERROR: 'error',
+        EVENT_JOB_MISSED: 'missed',
+        EVENT_JOB_MAX_INSTANCES: 'skipped',
+    }
+
+    def listener(job_event):
+        name = _job_name(job_event.job_id)
+        if job_event.code == EVENT_JOB_SUBMITTED:
+            now = time.time()
+            for run_time in job_event.scheduled_run_times:
+                JOB_DELAY.observe(max(0.0, now - run_time.timestamp()), name)
+        else:
+            JOB_EVENTS.inc(name, results[job_event.code])
+
+    scheduler.add_listener(listener, EVENT_JOB_SUBMITTED | sum(results))
+
+
+def scheduler_backlog(notification_scheduler):
+    """Jobs cuya hora ya pasó y siguen sin ejecutarse"""
+    now = time.time()
+    return sum(
+        1 for job in notification_scheduler.scheduler.get_jobs()
+        if job.next_run_time is not None and job.next_run_time.timestamp() < now
+    )
+
+
+def check_database():
+    started = time.perf_counter()
+    db.session.execute(db.text('SELECT 1'))
+    db.session.rollback()
+    return time.perf_counter() - started
+
+
+def readiness(app):
+    """Estado de cada dependencia del proceso: (listo, detalle)"""
+    checks = {}
+    ready = True
+
+    try:
+        checks['database'] = {'ok': True, 'seconds': round(check_database(), 4)}
+    except Exception:
+        # /readyz es público: el texto del driver (host, base, usuario) va al log
+        logger.exception("Readiness: la base de datos no responde")
+        checks['database'] = {'ok': False}
+        ready = False
+
+    background = app.extensions.get('background', {})
+    notification_scheduler = background.get('scheduler')
+    if notification_scheduler is not None:
+        running = notification_scheduler.scheduler.running
+        checks['scheduler'] = {
+            'ok': running,
+            'backlog': scheduler_backlog(notification_scheduler) if running else None
+        }
+        ready = ready and running
+
+    telegram_bot = background.get('telegram_bot')
+    if telegram_bot is not None and telegram_bot.application is not None:
+        lag = LOOP_LAG_LAST.value
+        polling = app.config.get('APP_ROLE') in POLLING_ROLES
+        # Sin polling (rol scheduler) la Application solo envía y nunca se arranca
+        ok = (telegram_bot.application.running or not polling) and (lag is None or lag < MAX_READY_LOOP_LAG)
+        checks['bot'] = {'ok': ok, 'polling': polling, 'loop_lag': lag}
+        ready = ready and ok
+
+    return ready, checks
+
+
+def init_metrics(app):
+    """Registrar /healthz, /readyz y /metrics y medir la latencia por endpoint"""
+    with app.app_context():
+        instrument_engine(db.engine)
+    _instrumented['app'] = app
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'not_found'
+            REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+            REQUESTS.inc(endpoint, response.status_code)
+        return response
+
+    @app.route('/healthz')
+    def healthz():
+        """Liveness: el proceso responde (no consulta dependencias)"""
+        return jsonify({'status': 'ok'}), 200
+
+    @app.route('/readyz')
+    def readyz():
+        """Readiness: base de datos y, si los hay, scheduler y bot"""
+        ready, checks = readiness(app)
+        return jsonify({'status': 'ok' if ready else 'unavailable', 'checks': checks}), 200 if ready else 503
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    return registry
+
+
+def serve_metrics(app, port, host='0.0.0.0'):
+    """Servir /healthz, /readyz y /metrics en procesos sin servidor HTTP (worker, bot, scheduler)"""
+    from werkzeug.serving import make_server
+    server = make_server(host, port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    print(f"📈 Métricas en http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,133 @@
+import logging
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+from models.user import db
+from models.event import CalendarAggregate, ChangeLog, Event, EventArchive, ReminderDelivery
+from calendar_summary import rebuild_all_aggregates
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Migraciones registradas: (versión, descripción, función)
+MIGRATIONS = []
+
+schema_migrations = db.Table(
+    'schema_migrations',
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('description', db.String(200), nullable=False),
+    db.Column('applied_at', db.DateTime, nullable=False),
+)
+
+
+def migration(version, description):
+    """Registrar una función de migración. Debe ser idempotente: en una base
+    de datos nueva db.create_all() ya dejó el esquema en su estado final."""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return decorator
+
+
+def add_missing_column(connection, table_name, column_name):
+    """ALTER TABLE ADD COLUMN si la columna del modelo no existe todavía"""
+    columns = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    if column_name in columns:
+        return
+    column = db.metadata.tables[table_name].columns[column_name]
+    column_type = column.type.compile(dialect=connection.dialect)
+    connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}'))
+    logger.info(f"Columna agregada: {table_name}.{column_name}")
+
+
+def create_model_indexes(connection, table_name):
+    """Crear los índices declarados en el modelo que falten en la tabla"""
+    for index in db.metadata.tables[table_name].indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+@migration(1, 'Columna external_uid en events para importaciones .ics')
+def add_event_external_uid(connection):
+    add_missing_column(connection, 'events', 'external_uid')
+    create_model_indexes(connection, 'events')
+
+
+@migration(2, 'Índices compuestos para listados, recordatorios, categorías y Telegram')
+def add_query_indexes(connection):
+    for table_name in ('events', 'categories', 'user_settings'):
+        create_model_indexes(connection, table_name)
+    if connection.dialect.name == 'sqlite':
+        # Estadísticas para que el planificador elija los índices nuevos
+        connection.execute(text('ANALYZE'))
+
+
+@migration(3, 'Tabla calendar_aggregates con los totales por día de cada usuario')
+def add_calendar_aggregates(connection):
+    CalendarAggregate.__table__.create(bind=connection, checkfirst=True)
+    rebuild_all_aggregates(connection)
+
+
+@migration(4, 'Tabla change_log para la sincronización incremental de eventos')
+def add_change_log(connection):
+    ChangeLog.__table__.create(bind=connection, checkfirst=True)
+
+
+@migration(5, 'Tabla reminder_deliveries con el estado de envío de cada recordatorio')
+def add_reminder_deliveries(connection):
+    ReminderDelivery.__table__.create(bind=connection, checkfirst=True)
+
+
+@migration(6, 'AUTOINCREMENT en events para no reutilizar ids archivados (SQLite)')
+def add_events_autoincrement(connection):
+    if connection.dialect.name != 'sqlite':
+        return  # Las secuencias de PostgreSQL nunca reutilizan valores
+    
+    table_sql = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'events'")
+    ).scalar()
+    if 'AUTOINCREMENT' not in table_sql.upper():
+        # SQLite no permite cambiar la clave primaria: reconstruir la tabla
+        columns = ', '.join(
+            column['name'] for column in inspect(connection).get_columns('events')
+            if column['name'] in Event.__table__.columns
+        )
+        create_sql = str(CreateTable(Event.__table__).compile(dialect=connection.dialect))
+        connection.execute(text(create_sql.replace('CREATE TABLE events', 'CREATE TABLE events_rebuild', 1)))
+        connection.execute(text(f'INSERT INTO events_rebuild ({columns}) SELECT {columns} FROM events'))
+        connection.execute(text('DROP TABLE events'))
+        connection.execute(text('ALTER TABLE events_rebuild RENAME TO events'))
+        create_model_indexes(connection, 'events')
+    
+    # El siguiente id queda por encima de todos los ya usados, también los archivados
+    newest = max(
+        connection.execute(db.select(db.func.max(Event.id))).scalar() or 0,
+        connection.execute(db.select(db.func.max(EventArchive.id))).scalar() or 0,
+    )
+    updated = connection.execute(
+        text("UPDATE sqlite_sequence SET seq = MAX(seq, :newest) WHERE name = 'events'"), {'newest': newest}
+    ).rowcount
+    if not updated:
+        connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('events', :newest)"), {'newest': newest})
+    logger.info(f"events con AUTOINCREMENT; próximo id > {newest}")
+
+
+def run_migrations():
+    """Aplicar en orden las migraciones pendientes, cada una en su transacción"""
+    schema_migrations.create(bind=db.engine, checkfirst=True)
+
+    with db.engine.connect() as connection:
+        applied = set(connection.execute(db.select(schema_migrations.c.version)).scalars())
+
+    pending = [item for item in MIGRATIONS if item[0] not in applied]
+    for version, description, func in pending:
+        with db.engine.begin() as connection:
+            func(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+        logger.info(f"Migración {version} aplicada: {description}")
+
+    return [version for version, _, _ in pending]
@@ -17,6 +17,26 @@ class Event(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    external_uid = db.Column(db.String(255))  # UID del evento importado desde .ics
+    
+    __table_args__ = (
+        # Listados del usuario y comandos del bot (solo eventos activos)
+        db.Index(
+            'ix_events_user_active_start', 'user_id', 'is_active', 'start_time',
+            sqlite_where=db.text('is_active = 1'),
+            postgresql_where=db.text('is_active')
+        ),
+        # Búsqueda de recordatorios de todos los usuarios
+        db.Index(
+            'ix_events_active_start', 'is_active', 'start_time',
+            sqlite_where=db.text('is_active = 1'),
+            postgresql_where=db.text('is_active')
+        ),
+        db.Index('ix_events_user_external_uid', 'user_id', 'external_uid'),
+        # AUTOINCREMENT: SQLite no reutiliza ids de eventos borrados o archivados
+        # (events_archive, change_log y reminder_deliveries conservan el id)
+        {'sqlite_autoincrement': True},
+    )
     
     # Relaciones
     user = db.relationship('User', backref=db.backref('events', lazy=True))
@@ -38,6 +58,74 @@ class Event(db.Model):
             'category': self.category.to_dict() if self.category else None
         }
 
+class EventArchive(db.Model):
+    """Eventos inactivos o muy antiguos movidos fuera de la tabla events"""
+    __tablename__ = 'events_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)  # Mismo id que tenía en events
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    category_id = db.Column(db.Integer)  # Sin FK: la categoría puede borrarse después
+    reminder_minutes = db.Column(db.Integer)
+    is_active = db.Column(db.Boolean)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    external_uid = db.Column(db.String(255))
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_events_archive_user_start', 'user_id', 'start_time'),
+    )
+
+class CalendarAggregate(db.Model):
+    """Totales por usuario, día local y categoría para las vistas de mes y semana"""
+    __tablename__ = 'calendar_aggregates'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # Día en la zona horaria del usuario
+    category_id = db.Column(db.Integer, primary_key=True, default=0)  # 0 = sin categoría
+    event_count = db.Column(db.Integer, nullable=False, default=0)  # Eventos que empiezan ese día
+    busy_minutes = db.Column(db.Integer, nullable=False, default=0)  # Minutos ocupados dentro del día
+
+class ChangeLog(db.Model):
+    """Secuencia de cambios de eventos y categorías para la sincronización incremental"""
+    __tablename__ = 'change_log'
+
+    seq = db.Column(db.Integer, primary_key=True)  # Creciente; nunca se reutiliza
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # 'event' o 'category'
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # 'upsert' o 'delete'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_change_log_user_seq', 'user_id', 'seq'),
+        # AUTOINCREMENT: SQLite no reutiliza números tras borrar las últimas filas
+        {'sqlite_autoincrement': True},
+    )
+
+class ReminderDelivery(db.Model):
+    """Estado de envío de cada recordatorio (uno por evento y hora prevista)"""
+    __tablename__ = 'reminder_deliveries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, nullable=False)  # Sin FK: el evento puede archivarse después
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    due_at = db.Column(db.DateTime, nullable=False)  # Inicio del evento menos reminder_minutes
+    status = db.Column(db.String(10), nullable=False, default='pending')  # 'pending', 'sent' o 'failed'
+    digest_size = db.Column(db.Integer, nullable=False, default=1)  # Recordatorios del mismo mensaje
+    sent_at = db.Column(db.DateTime)
+    error = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'due_at', name='uq_reminder_deliveries_event_due'),
+        db.Index('ix_reminder_deliveries_due_at', 'due_at'),
+    )
+
 class Category(db.Model):
     __tablename__ = 'categories'
     
@@ -47,6 +135,10 @@ class Category(db.Model):
     color = db.Column(db.String(7), default='#3498db')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_categories_user_name', 'user_id', 'name'),
+    )
+    
     # Relaciones
     user = db.relationship('User', backref=db.backref('categories', lazy=True))
     
@@ -74,6 +166,11 @@ class UserSettings(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_user_settings_telegram_chat_id', 'telegram_chat_id'),
+        db.Index('ix_user_settings_user_id', 'user_id'),
+    )
+    
     # Relaciones
     user = db.relationship('User', backref=db.backref('settings', uselist=False))
     
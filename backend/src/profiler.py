@@ -0,0 +1,140 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MS = 5
+PROFILE_HEADER = 'X-Profile'
+
+SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def fold_stack(frame):
+    """Pila en formato 'collapsed' (raíz primero, separada por ';')"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Muestrea periódicamente las pilas de los hilos registrados.
+
+    Un solo hilo de muestreo para todo el proceso: solo trabaja mientras hay
+    algún hilo registrado y no añade nada al código que se está midiendo.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL_MS / 1000):
+        self.interval = interval
+        self._targets = {}  # thread_id -> Counter de pilas
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        thread_id = thread_id or threading.get_ident()
+        samples = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return samples
+
+    def stop(self, thread_id=None):
+        with self._lock:
+            return self._targets.pop(thread_id or threading.get_ident(), Counter())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                targets = list(self._targets.items())
+            if not targets:
+                self._wakeup.clear()
+                self._wakeup.wait()
+                continue
+
+            frames = sys._current_frames()
+            for thread_id, samples in targets:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[fold_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+def write_folded(samples, directory, name):
+    """Guardar las muestras en formato de flamegraph.pl / speedscope"""
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{SAFE_NAME_RE.sub('_', name)}.folded"
+    path = os.path.join(directory, filename)
+    with open(path, 'w') as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+# Instancia global del perfilador (se crea con init_profiler)
+profiler = None
+
+
+def init_profiler(app):
+    """Perfilar peticiones con la cabecera X-Profile: 1 o más lentas que PROFILE_SLOW_MS"""
+    global profiler
+
+    app.config.setdefault('PROFILE_HEADER_ENABLED', app.debug)
+    app.config.setdefault('PROFILE_SLOW_MS', 0)
+    app.config.setdefault('PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS)
+    app.config.setdefault('PROFILE_DIR', None)
+
+    header_enabled = app.config['PROFILE_HEADER_ENABLED']
+    slow_ms = app.config['PROFILE_SLOW_MS']
+    if not header_enabled and not slow_ms:
+        return None
+
+    directory = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+    profiler = SamplingProfiler(app.config['PROFILE_INTERVAL_MS'] / 1000)
+
+    @app.before_request
+    def start_profile():
+        forced = header_enabled and request.headers.get(PROFILE_HEADER) == '1'
+        if forced or slow_ms:
+            g.profile = (profiler.start(), time.perf_counter(), forced)
+
+    def finish_profile():
+        samples, started, forced = g.pop('profile')
+        profiler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not samples or not (forced or elapsed_ms >= slow_ms):
+            return None
+        path = write_folded(samples, directory, f"{request.endpoint or 'not_found'}-{elapsed_ms:.0f}ms")
+        logger.info(f"🔥 Perfil de {request.method} {request.path} ({elapsed_ms:.0f} ms): {path}")
+        return path
+
+    @app.after_request
+    def save_profile(response):
+        if 'profile' in g:
+            path = finish_profile()
+            if path:
+                response.headers['X-Profile-Stacks'] = os.path.basename(path)
+        return response
+
+    @app.teardown_request
+    def stop_profile(exception=None):
+        # Peticiones que terminaron con una excepción no pasan por after_request
+        if 'profile' in g:
+            finish_profile()
+
+    logger.info(f"Perfilador de muestreo activo (salida en {directory})")
+    return profiler
@@ -0,0 +1,146 @@
+import contextvars
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+from models.user import db
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Una misma sentencia repetida tantas veces en un ámbito es un posible N+1
+DEFAULT_REPEAT_THRESHOLD = 5
+# Caracteres de SQL que se muestran en logs y cabeceras
+STATEMENT_PREVIEW = 160
+
+# Estadísticas del ámbito actual (petición, update del bot o job); None = sin medir
+_current = contextvars.ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """Consultas ejecutadas dentro de un ámbito (también cuentan en el ámbito padre)"""
+
+    def __init__(self, label, parent=None):
+        self.label = label
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        if self.parent is not None:
+            self.parent.record(statement, seconds)
+
+    def repeated(self, threshold=DEFAULT_REPEAT_THRESHOLD):
+        """Sentencias idénticas (mismo SQL, distintos parámetros) repetidas >= threshold"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def summary(self):
+        return f"{self.label}: {self.count} consultas, {self.seconds * 1000:.1f} ms en base de datos"
+
+
+def current_stats():
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get('query_started')
+    if started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+def instrument_queries(engine):
+    """Contar consultas del ámbito actual (sin coste fuera de un ámbito medido)"""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def report(stats, threshold=DEFAULT_REPEAT_THRESHOLD):
+    """Registrar el resumen del ámbito y avisar de las sentencias repetidas"""
+    repeated = stats.repeated(threshold)
+    if repeated:
+        for statement, count in repeated:
+            logger.warning(
+                f"🔁 Posible N+1 en {stats.label}: {count}x {' '.join(statement.split())[:STATEMENT_PREVIEW]}"
+            )
+    logger.debug(stats.summary())
+    return repeated
+
+
+@contextmanager
+def use_stats(stats):
+    """Sumar las consultas de otro hilo (p. ej. la cola de escritura) a un ámbito ya abierto"""
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def query_scope(label, threshold=DEFAULT_REPEAT_THRESHOLD):
+    """Medir las consultas de un bloque (update del bot, job del scheduler...)"""
+    stats = QueryStats(label, parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        report(stats, threshold)
+
+
+def init_query_stats(app):
+    """Medir las consultas de cada petición si QUERY_STATS está activo"""
+    app.config.setdefault('QUERY_STATS', app.debug)
+    app.config.setdefault('QUERY_STATS_HEADERS', app.debug)
+    app.config.setdefault('QUERY_STATS_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+
+    with app.app_context():
+        instrument_queries(db.engine)
+
+    if not app.config['QUERY_STATS']:
+        return
+
+    threshold = app.config['QUERY_STATS_REPEAT_THRESHOLD']
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats_token = _current.set(QueryStats(f"{request.method} {request.path}"))
+
+    @app.after_request
+    def add_query_headers(response):
+        # Las respuestas en streaming siguen consultando después de este punto:
+        # las cabeceras cuentan lo ejecutado hasta generarlas
+        stats = _current.get()
+        if stats is None or not app.config['QUERY_STATS_HEADERS']:
+            return response
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers['X-Query-Time-Ms'] = f"{stats.seconds * 1000:.1f}"
+        repeated = stats.repeated(threshold)
+        if repeated:
+            statement, count = repeated[0]
+            response.headers['X-Query-Repeated'] = f"{count}x {' '.join(statement.split())[:STATEMENT_PREVIEW]}"
+        return response
+
+    @app.teardown_request
+    def finish_query_stats(exception=None):
+        token = g.pop('query_stats_token', None)
+        if token is None:
+            return
+        stats = _current.get()
+        _current.reset(token)
+        report(stats, threshold)
@@ -0,0 +1,84 @@
+import logging
+from datetime import timedelta
+from sqlalchemy import bindparam
+from models.user import db
+from models.event import ReminderDelivery
+from clock import utcnow
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Días que se conserva el estado de los recordatorios ya vencidos
+DEFAULT_RETENTION_DAYS = 30
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+# Caracteres del error que se guardan
+ERROR_PREVIEW = 200
+
+
+def delivered_keys(keys):
+    """De las claves (event_id, due_at) dadas, las que ya tienen envío registrado.
+
+    Un registro pendiente o fallido también cuenta: cada recordatorio se
+    intenta como mucho una vez.
+    """
+    keys = list(keys)
+    if not keys:
+        return set()
+    rows = db.session.execute(
+        db.select(ReminderDelivery.event_id, ReminderDelivery.due_at).where(
+            ReminderDelivery.event_id.in_({event_id for event_id, _ in keys})
+        )
+    )
+    return set(keys) & {(event_id, due_at) for event_id, due_at in rows}
+
+
+def record_deliveries(deliveries):
+    """Registrar como pendientes [(event_id, user_id, due_at, digest_size), ...]"""
+    if not deliveries:
+        return 0
+    now = utcnow()
+    db.session.execute(ReminderDelivery.__table__.insert(), [
+        {
+            'event_id': event_id,
+            'user_id': user_id,
+            'due_at': due_at,
+            'status': PENDING,
+            'digest_size': digest_size,
+            'created_at': now,
+        }
+        for event_id, user_id, due_at, digest_size in deliveries
+    ])
+    db.session.commit()
+    return len(deliveries)
+
+
+def mark_deliveries(keys, status, error=None):
+    """Marcar como enviados o fallidos los recordatorios (event_id, due_at)"""
+    if not keys:
+        return 0
+    table = ReminderDelivery.__table__
+    sent_at = utcnow() if status == SENT else None
+    db.session.execute(
+        table.update()
+        .where(table.c.event_id == bindparam('key_event_id'), table.c.due_at == bindparam('key_due_at'))
+        .values(status=status, sent_at=sent_at, error=error[:ERROR_PREVIEW] if error else None),
+        [{'key_event_id': event_id, 'key_due_at': due_at} for event_id, due_at in keys]
+    )
+    db.session.commit()
+    return len(keys)
+
+
+def prune_reminder_deliveries(retention_days=DEFAULT_RETENTION_DAYS):
+    """Borrar el estado de recordatorios vencidos hace más de retention_days"""
+    cutoff = utcnow() - timedelta(days=retention_days)
+    result = db.session.execute(
+        ReminderDelivery.__table__.delete().where(ReminderDelivery.due_at < cutoff)
+    )
+    db.session.commit()
+    if result.rowcount:
+        logger.info(f"Purgados {result.rowcount} envíos de recordatorios anteriores a {cutoff:%Y-%m-%d}")
+    return result.rowcount
@@ -1,13 +1,17 @@
 from flask import Blueprint, request, jsonify, session, redirect, url_for
 from models.user import db, User
 from models.event import UserSettings
+from cache import cache, get_user_dict
 from datetime import datetime
 import os
-import requests
 import urllib.parse
 
 auth_bp = Blueprint('auth', __name__)
 
+# Endpoints de Google (sobrescribibles por entorno, p. ej. para un servidor OAuth local)
+GOOGLE_TOKEN_URL = 'https://oauth2.googleapis.com/token'
+GOOGLE_USERINFO_URL = 'https://www.googleapis.com/oauth2/v3/userinfo'
+
 # No usamos Authlib - lo hacemos manualmente
 
 def init_oauth(app):
@@ -71,6 +75,11 @@ def callback():
     try:
         print("🔄 Procesando callback OAuth manual")
         
+        # requests y authlib solo se cargan con el primer login, no al arrancar
+        import requests
+        from http_client import get_http_session
+        from id_tokens import IdTokenError, get_google_verifier
+        
         # Obtener el código de autorización
         auth_code = request.args.get('code')
         error = request.args.get('error')
@@ -99,10 +108,15 @@ def callback():
         }
         
         print("🔄 Intercambiando código por token...")
-        token_response = requests.post(
-            'https://oauth2.googleapis.com/token',
-            data=token_data
-        )
+        http = get_http_session()
+        try:
+            token_response = http.post(
+                os.environ.get('GOOGLE_TOKEN_URL', GOOGLE_TOKEN_URL),
+                data=token_data
+            )
+        except requests.RequestException as e:
+            print(f"❌ Google no respondió al intercambiar el código: {e}")
+            return jsonify({'error': 'El proveedor de autenticación no responde'}), 504
         
         if token_response.status_code != 200:
             print(f"❌ Error obteniendo token: {token_response.text}")
@@ -117,17 +131,31 @@ def callback():
         
         print("✅ Token de acceso obtenido")
         
-        # Obtener información del usuario
-        userinfo_response = requests.get(
-            'https://www.googleapis.com/oauth2/v3/userinfo',
-            headers={'Authorization': f'Bearer {access_token}'}
-        )
-        
-        if userinfo_response.status_code != 200:
-            print(f"❌ Error obteniendo userinfo: {userinfo_response.text}")
-            return jsonify({'error': 'Error obteniendo información del usuario'}), 400
-        
-        user_info = userinfo_response.json()
+        # Verificar el id_token localmente (claves JWKS en caché) y evitar
+        # la petición a userinfo; si no es posible, se consulta userinfo
+        user_info = None
+        try:
+            claims = get_google_verifier(client_id).verify(token_json.get('id_token'))
+            if claims.get('email') and claims.get('name'):
+                user_info = claims
+        except IdTokenError as e:
+            print(f"⚠️ id_token no verificado, se usa userinfo: {e}")
+        
+        if user_info is None:
+            try:
+                userinfo_response = http.get(
+                    os.environ.get('GOOGLE_USERINFO_URL', GOOGLE_USERINFO_URL),
+                    headers={'Authorization': f'Bearer {access_token}'}
+                )
+            except requests.RequestException as e:
+                print(f"❌ Google no respondió a userinfo: {e}")
+                return jsonify({'error': 'El proveedor de autenticación no responde'}), 504
+            
+            if userinfo_response.status_code != 200:
+                print(f"❌ Error obteniendo userinfo: {userinfo_response.text}")
+                return jsonify({'error': 'Error obteniendo información del usuario'}), 400
+            
+            user_info = userinfo_response.json()
         print(f"✅ Usuario autenticado: {user_info.get('email')}")
         
         # Buscar o crear el usuario en la base de datos
@@ -163,6 +191,7 @@ def callback():
             # Actualizar última conexión
             user.last_login = datetime.utcnow()
             db.session.commit()
+            cache.invalidate('user', user.id)
             print(f"✅ Usuario existente: {user.email}")
         
         # Guardar información del usuario en la sesión
@@ -197,7 +226,7 @@ def get_current_user():
             return jsonify({'authenticated': False}), 401
             
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = get_user_dict(user_id)
         
         if not user:
             session.clear()
@@ -205,7 +234,7 @@ def get_current_user():
             
         return jsonify({
             'authenticated': True,
-            'user': user.to_dict()
+            'user': user
         }), 200
         
     except Exception as e:
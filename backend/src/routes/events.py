@@ -1,8 +1,21 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
 
 from models.user import db, User
-from models.event import Event, Category, UserSettings
-from datetime import datetime, timedelta
+from models.event import Event, EventArchive, Category, UserSettings
+from ics_import import ICSImporter, ICSImportError
+from interval_index import event_index
+from event_reads import list_event_columns, list_event_dicts, select_events, select_archived_events, stream_rows
+from ics_export import iter_ics
+from cache import cache, get_settings_dict
+from calendar_summary import (
+    MAX_SUMMARY_DAYS, event_state, rebuild_user_aggregates, record_event_change, summarize
+)
+from change_log import (
+    CATEGORY, DELETE, EVENT, ChangeTokenExpired, changes_since, latest_token, parse_token,
+    record_change
+)
+from timezones import zone_name
+from datetime import date, datetime, timedelta
 import pytz
 
 events_bp = Blueprint('events', __name__)
@@ -17,6 +30,30 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def parse_datetime(value):
+    """Convertir una fecha ISO 8601 a datetime naive en UTC (formato de la base de datos)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(pytz.utc).replace(tzinfo=None)
+    return parsed
+
+def wants_conflict_check(data):
+    """El chequeo de solapamiento es opcional: campo check_conflicts o ?check_conflicts=true"""
+    if data.get('check_conflicts'):
+        return True
+    return request.args.get('check_conflicts', '').lower() in ('1', 'true', 'yes')
+
+def conflicts_response(user_id, conflict_ids):
+    """Respuesta 409 con los eventos que se superponen"""
+    conflicts = Event.query.filter(
+        Event.user_id == user_id,
+        Event.id.in_(conflict_ids)
+    ).order_by(Event.start_time).all()
+    return jsonify({
+        'error': 'El evento se superpone con otros eventos',
+        'conflicts': [event.to_dict() for event in conflicts]
+    }), 409
+
 @events_bp.route('/events', methods=['GET'])
 @require_auth
 def get_events():
@@ -28,20 +65,22 @@ def get_events():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = Event.query.filter_by(user_id=user_id, is_active=True)
+        start_dt = parse_datetime(start_date) if start_date else None
+        end_dt = parse_datetime(end_date) if end_date else None
         
-        if start_date:
-            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            query = query.filter(Event.start_time >= start_dt)
-            
-        if end_date:
-            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            query = query.filter(Event.end_time <= end_dt)
+        # Token leído antes del listado: lo que cambie después llega por /events/changes
+        change_token = latest_token()
+        
+        # Formato columnar opcional: arrays por campo y fechas en segundos epoch
+        if request.args.get('format') == 'columnar':
+            return jsonify({**list_event_columns(user_id, start_dt, end_dt), 'change_token': change_token}), 200
         
-        events = query.order_by(Event.start_time).all()
+        # Lectura directa de columnas (sin objetos ORM) en el formato de Event.to_dict()
+        events = list_event_dicts(user_id, start_dt, end_dt)
         
         return jsonify({
-            'events': [event.to_dict() for event in events]
+            'events': events,
+            'change_token': change_token
         }), 200
         
     except Exception as e:
@@ -65,13 +104,19 @@ def create_event():
                 return jsonify({'error': f'Campo requerido: {field}'}), 400
         
         # Convertir fechas
-        start_time = datetime.fromisoformat(data['start_time'].replace('Z', '+00:00'))
-        end_time = datetime.fromisoformat(data['end_time'].replace('Z', '+00:00'))
+        start_time = parse_datetime(data['start_time'])
+        end_time = parse_datetime(data['end_time'])
         
         # Validar que la fecha de fin sea posterior a la de inicio
         if end_time <= start_time:
             return jsonify({'error': 'La fecha de fin debe ser posterior a la de inicio'}), 400
         
+        # Verificar solapamientos si se solicitó
+        if wants_conflict_check(data):
+            conflict_ids = event_index.find_conflicts(user_id, start_time, end_time)
+            if conflict_ids:
+                return conflicts_response(user_id, conflict_ids)
+        
         # Crear el evento
         event = Event(
             user_id=user_id,
@@ -85,7 +130,11 @@ def create_event():
         )
         
         db.session.add(event)
+        db.session.flush()
+        record_event_change(user_id, None, event_state(event))
+        record_change(user_id, EVENT, event.id)
         db.session.commit()
+        event_index.sync_event(event)
         
         return jsonify({
             'message': 'Evento creado exitosamente',
@@ -96,6 +145,102 @@ def create_event():
         db.session.rollback()
         return jsonify({'error': f'Error al crear evento: {str(e)}'}), 500
 
+@events_bp.route('/events/import', methods=['POST'])
+@require_auth
+def import_events():
+    """Importar eventos desde un archivo iCalendar (.ics)"""
+    try:
+        user_id = session['user_id']
+        
+        # Aceptar el archivo como multipart (campo "file") o como cuerpo text/calendar
+        upload = request.files.get('file')
+        if upload:
+            stream = upload.stream
+        elif request.mimetype == 'text/calendar':
+            stream = request.stream
+        else:
+            return jsonify({'error': 'Archivo .ics requerido'}), 400
+        
+        settings = UserSettings.query.filter_by(user_id=user_id).first()
+        
+        importer = ICSImporter(
+            user_id,
+            timezone=settings.timezone if settings else 'UTC',
+            default_reminder_minutes=settings.default_reminder_minutes if settings else 30
+        )
+        try:
+            stats = importer.import_stream(stream)
+        finally:
+            # Los lotes ya confirmados cambiaron los eventos y quizá las categorías
+            event_index.invalidate_user(user_id)
+            cache.invalidate('categories', user_id)
+        
+        return jsonify({
+            'message': 'Importación completada',
+            **stats
+        }), 200
+        
+    except ICSImportError as e:
+        db.session.rollback()
+        return jsonify({'error': f'Archivo inválido: {str(e)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Error al importar eventos: {str(e)}'}), 500
+
+@events_bp.route('/events/export', methods=['GET'])
+@require_auth
+def export_events():
+    """Exportar los eventos activos del usuario como archivo iCalendar (.ics)"""
+    try:
+        user_id = session['user_id']
+        include_archived = request.args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+        
+        statement = select_events(
+            Event.user_id == user_id,
+            Event.is_active == True
+        ).add_columns(Event.external_uid)
+        
+        def rows():
+            yield from stream_rows(statement)
+            if include_archived:
+                # Los eventos archivados siguen disponibles para exportar
+                yield from stream_rows(select_archived_events(EventArchive.user_id == user_id))
+        
+        # Se genera por partes a medida que el cursor devuelve filas
+        return Response(
+            stream_with_context(iter_ics(rows())),
+            mimetype='text/calendar',
+            headers={'Content-Disposition': 'attachment; filename=horarios.ics'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': f'Error al exportar eventos: {str(e)}'}), 500
+
+@events_bp.route('/events/changes', methods=['GET'])
+@require_auth
+def get_event_changes():
+    """Eventos y categorías creados, modificados o eliminados desde un token.
+
+    Un cambio de categoría llega solo en 'categories': el cliente actualiza
+    la copia incluida en sus eventos por category_id.
+    """
+    try:
+        user_id = session['user_id']
+        
+        try:
+            since = parse_token(request.args.get('since'))
+        except ValueError:
+            return jsonify({'error': 'Parámetro since inválido (token de /events o /events/changes)'}), 400
+        
+        try:
+            return jsonify(changes_since(user_id, since)), 200
+        except ChangeTokenExpired:
+            # El cliente debe volver a descargar la lista completa
+            return jsonify({'error': 'Token expirado, vuelve a sincronizar', 'token': latest_token()}), 410
+        
+    except Exception as e:
+        return jsonify({'error': f'Error al obtener cambios: {str(e)}'}), 500
+
 @events_bp.route('/events/<int:event_id>', methods=['PUT'])
 @require_auth
 def update_event(event_id):
@@ -113,15 +258,17 @@ def update_event(event_id):
         if not event:
             return jsonify({'error': 'Evento no encontrado'}), 404
         
+        previous_state = event_state(event)
+        
         # Actualizar campos
         if 'title' in data:
             event.title = data['title']
         if 'description' in data:
             event.description = data['description']
         if 'start_time' in data:
-            event.start_time = datetime.fromisoformat(data['start_time'].replace('Z', '+00:00'))
+            event.start_time = parse_datetime(data['start_time'])
         if 'end_time' in data:
-            event.end_time = datetime.fromisoformat(data['end_time'].replace('Z', '+00:00'))
+            event.end_time = parse_datetime(data['end_time'])
         if 'category_id' in data:
             event.category_id = data['category_id']
         if 'reminder_minutes' in data:
@@ -129,10 +276,23 @@ def update_event(event_id):
         
         # Validar fechas si se actualizaron
         if event.end_time <= event.start_time:
+            db.session.rollback()
             return jsonify({'error': 'La fecha de fin debe ser posterior a la de inicio'}), 400
         
+        # Verificar solapamientos si se solicitó
+        if wants_conflict_check(data):
+            conflict_ids = event_index.find_conflicts(
+                user_id, event.start_time, event.end_time, exclude_id=event.id
+            )
+            if conflict_ids:
+                db.session.rollback()
+                return conflicts_response(user_id, conflict_ids)
+        
         event.updated_at = datetime.utcnow()
+        record_event_change(user_id, previous_state, event_state(event))
+        record_change(user_id, EVENT, event.id)
         db.session.commit()
+        event_index.sync_event(event)
         
         return jsonify({
             'message': 'Evento actualizado exitosamente',
@@ -157,9 +317,13 @@ def delete_event(event_id):
             return jsonify({'error': 'Evento no encontrado'}), 404
         
         # Soft delete
+        previous_state = event_state(event)
         event.is_active = False
         event.updated_at = datetime.utcnow()
+        record_event_change(user_id, previous_state, None)
+        record_change(user_id, EVENT, event.id, DELETE)
         db.session.commit()
+        event_index.sync_event(event)
         
         return jsonify({'message': 'Evento eliminado exitosamente'}), 200
         
@@ -167,16 +331,90 @@ def delete_event(event_id):
         db.session.rollback()
         return jsonify({'error': f'Error al eliminar evento: {str(e)}'}), 500
 
+@events_bp.route('/freebusy', methods=['GET'])
+@require_auth
+def get_freebusy():
+    """Obtener los bloques ocupados del usuario en un rango de fechas"""
+    try:
+        user_id = session['user_id']
+        
+        start = request.args.get('start')
+        end = request.args.get('end')
+        
+        if not start or not end:
+            return jsonify({'error': 'Parámetros requeridos: start, end'}), 400
+        
+        start_dt = parse_datetime(start)
+        end_dt = parse_datetime(end)
+        
+        if end_dt <= start_dt:
+            return jsonify({'error': 'La fecha de fin debe ser posterior a la de inicio'}), 400
+        
+        busy = event_index.busy_blocks(user_id, start_dt, end_dt)
+        
+        return jsonify({
+            'start': start_dt.isoformat(),
+            'end': end_dt.isoformat(),
+            'busy': [
+                {'start': block_start.isoformat(), 'end': block_end.isoformat()}
+                for block_start, block_end in busy
+            ]
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': f'Fecha inválida: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Error al obtener disponibilidad: {str(e)}'}), 500
+
+@events_bp.route('/calendar/summary', methods=['GET'])
+@require_auth
+def get_calendar_summary():
+    """Totales por día o semana para dibujar el mes sin descargar los eventos"""
+    try:
+        user_id = session['user_id']
+        
+        granularity = request.args.get('granularity', 'day')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        
+        if granularity not in ('day', 'week'):
+            return jsonify({'error': 'granularity debe ser day o week'}), 400
+        if not start or not end:
+            return jsonify({'error': 'Parámetros requeridos: start, end'}), 400
+        
+        # Días locales del usuario, rango [start, end)
+        start_day = date.fromisoformat(start[:10])
+        end_day = date.fromisoformat(end[:10])
+        
+        if end_day <= start_day:
+            return jsonify({'error': 'La fecha de fin debe ser posterior a la de inicio'}), 400
+        if (end_day - start_day).days > MAX_SUMMARY_DAYS:
+            return jsonify({'error': f'El rango máximo es de {MAX_SUMMARY_DAYS} días'}), 400
+        
+        return jsonify({
+            'granularity': granularity,
+            'start': start_day.isoformat(),
+            'end': end_day.isoformat(),
+            **summarize(user_id, start_day, end_day, granularity)
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': f'Fecha inválida: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Error al obtener resumen: {str(e)}'}), 500
+
 @events_bp.route('/categories', methods=['GET'])
 @require_auth
 def get_categories():
     """Obtener todas las categorías del usuario"""
     try:
         user_id = session['user_id']
-        categories = Category.query.filter_by(user_id=user_id).all()
+        categories = cache.get_or_load('categories', user_id, lambda: [
+            category.to_dict() for category in Category.query.filter_by(user_id=user_id).all()
+        ])
         
         return jsonify({
-            'categories': [category.to_dict() for category in categories]
+            'categories': categories
         }), 200
         
     except Exception as e:
@@ -210,7 +448,10 @@ def create_category():
         )
         
         db.session.add(category)
+        db.session.flush()
+        record_change(user_id, CATEGORY, category.id)
         db.session.commit()
+        cache.invalidate('categories', user_id)
         
         return jsonify({
             'message': 'Categoría creada exitosamente',
@@ -254,7 +495,9 @@ def update_category(category_id):
         if 'color' in data:
             category.color = data['color']
         
+        record_change(user_id, CATEGORY, category.id)
         db.session.commit()
+        cache.invalidate('categories', user_id)
         
         return jsonify({
             'message': 'Categoría actualizada exitosamente',
@@ -287,7 +530,9 @@ def delete_category(category_id):
             }), 400
         
         db.session.delete(category)
+        record_change(user_id, CATEGORY, category_id, DELETE)
         db.session.commit()
+        cache.invalidate('categories', user_id)
         
         return jsonify({'message': 'Categoría eliminada exitosamente'}), 200
         
@@ -301,9 +546,9 @@ def get_user_settings():
     """Obtener configuraciones del usuario"""
     try:
         user_id = session['user_id']
-        settings = UserSettings.query.filter_by(user_id=user_id).first()
+        settings_dict = get_settings_dict(user_id)
         
-        if not settings:
+        if not settings_dict:
             # Crear configuraciones por defecto si no existen
             settings = UserSettings(
                 user_id=user_id,
@@ -315,9 +560,10 @@ def get_user_settings():
             )
             db.session.add(settings)
             db.session.commit()
+            settings_dict = settings.to_dict()
         
         return jsonify({
-            'settings': settings.to_dict()
+            'settings': settings_dict
         }), 200
         
     except Exception as e:
@@ -333,7 +579,12 @@ def update_user_settings():
         if not data:
             return jsonify({'error': 'Datos requeridos'}), 400
         
-        settings = UserSettings.query.filter_by(user_id=user_id).first()
+        query = UserSettings.query.filter_by(user_id=user_id)
+        if 'timezone' in data:
+            # Bloquear la fila antes de recalcular: las escrituras de eventos
+            # leen la zona con la misma fila bloqueada (PostgreSQL)
+            query = query.with_for_update()
+        settings = query.first()
         
         if not settings:
             settings = UserSettings(user_id=user_id)
@@ -341,6 +592,9 @@ def update_user_settings():
         
         # Actualizar campos
         if 'timezone' in data:
+            if zone_name(data['timezone']) != zone_name(settings.timezone):
+                # Los días locales cambian: recalcular los agregados del calendario
+                rebuild_user_aggregates(user_id, data['timezone'])
             settings.timezone = data['timezone']
         if 'default_reminder_minutes' in data:
             settings.default_reminder_minutes = data['default_reminder_minutes']
@@ -357,6 +611,7 @@ def update_user_settings():
         
         settings.updated_at = datetime.utcnow()
         db.session.commit()
+        cache.invalidate('settings', user_id)
         
         return jsonify({
             'message': 'Configuraciones actualizadas exitosamente',
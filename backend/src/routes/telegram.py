@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify, session
 from models.user import db, User
 from models.event import UserSettings
-from telegram_bot import get_telegram_bot
+from cache import cache, get_settings_dict
+from datetime import datetime
 import asyncio
 
 telegram_bp = Blueprint('telegram', __name__)
@@ -56,6 +57,7 @@ def link_telegram():
         settings.telegram_username = telegram_username
         
         db.session.commit()
+        cache.invalidate('settings', user_id)
         
         return jsonify({
             'message': 'Cuenta de Telegram vinculada exitosamente',
@@ -87,6 +89,7 @@ def unlink_telegram():
         settings.daily_summary_enabled = False
         
         db.session.commit()
+        cache.invalidate('settings', user_id)
         
         return jsonify({'message': 'Cuenta de Telegram desvinculada exitosamente'}), 200
         
@@ -101,7 +104,7 @@ def get_telegram_status():
     try:
         user_id = session['user_id']
         
-        settings = UserSettings.query.filter_by(user_id=user_id).first()
+        settings = get_settings_dict(user_id)
         
         if not settings:
             return jsonify({
@@ -113,11 +116,11 @@ def get_telegram_status():
             }), 200
         
         return jsonify({
-            'linked': bool(settings.telegram_chat_id),
-            'telegram_chat_id': settings.telegram_chat_id,
-            'telegram_username': settings.telegram_username,
-            'notifications_enabled': settings.notifications_enabled,
-            'daily_summary_enabled': settings.daily_summary_enabled
+            'linked': bool(settings['telegram_chat_id']),
+            'telegram_chat_id': settings['telegram_chat_id'],
+            'telegram_username': settings['telegram_username'],
+            'notifications_enabled': settings['notifications_enabled'],
+            'daily_summary_enabled': settings['daily_summary_enabled']
         }), 200
         
     except Exception as e:
@@ -130,15 +133,17 @@ def test_telegram_notification():
     try:
         user_id = session['user_id']
         
-        settings = UserSettings.query.filter_by(user_id=user_id).first()
+        settings = get_settings_dict(user_id)
         
-        if not settings or not settings.telegram_chat_id:
+        if not settings or not settings['telegram_chat_id']:
             return jsonify({'error': 'No hay cuenta de Telegram vinculada'}), 400
         
-        if not settings.notifications_enabled:
+        if not settings['notifications_enabled']:
             return jsonify({'error': 'Las notificaciones están desactivadas'}), 400
         
         # Obtener bot de Telegram
+        # Import diferido: los workers web no cargan python-telegram-bot al arrancar
+        from telegram_bot import get_telegram_bot
         bot = get_telegram_bot()
         if not bot:
             return jsonify({'error': 'Bot de Telegram no disponible'}), 500
@@ -149,13 +154,13 @@ def test_telegram_notification():
                 self.title = "Evento de prueba"
                 self.description = "Esta es una notificación de prueba desde tu aplicación de horarios."
                 self.start_time = datetime.now()
-                self.category = None
+                self.category_name = None
         
         test_event = TestEvent()
         
         # Enviar notificación de prueba
         async def send_test():
-            await bot.send_reminder(settings.telegram_chat_id, test_event)
+            await bot.send_reminder(settings['telegram_chat_id'], test_event)
         
         # Ejecutar la función asíncrona
         loop = asyncio.new_event_loop()
@@ -178,6 +183,7 @@ def telegram_webhook():
             return jsonify({'error': 'No data received'}), 400
         
         # Obtener bot de Telegram
+        from telegram_bot import get_telegram_bot
         bot = get_telegram_bot()
         if not bot:
             return jsonify({'error': 'Bot not available'}), 500
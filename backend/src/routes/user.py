@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, session
 from models.user import User
+from cache import get_user_dict
 
 user_bp = Blueprint('user', __name__)
 
@@ -11,13 +12,13 @@ def get_user_profile():
             return jsonify({'error': 'Usuario no autenticado'}), 401
             
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = get_user_dict(user_id)
         
         if not user:
             return jsonify({'error': 'Usuario no encontrado'}), 404
             
         return jsonify({
-            'user': user.to_dict()
+            'user': user
         }), 200
         
     except Exception as e:
@@ -1,23 +1,63 @@
 import os
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.date import DateTrigger
+from flask import current_app
 from models.user import db, User
 from models.event import Event, UserSettings
 from telegram_bot import get_telegram_bot
+from interval_index import event_index
+from event_reads import list_agenda, select_events
+from write_queue import submit_write
+from archive import archive_events, maintain_database, DEFAULT_ARCHIVE_AFTER_DAYS
+from calendar_summary import event_state, record_event_changes
+from change_log import DELETE, EVENT, DEFAULT_RETENTION_DAYS, prune_change_log, record_changes
+from timezones import local_day_bounds_utc, local_today
+from metrics import instrument_scheduler
+from query_stats import query_scope
+from clock import utcnow
+from reminder_delivery import (
+    DEFAULT_RETENTION_DAYS as DEFAULT_DELIVERY_RETENTION_DAYS, FAILED, SENT,
+    delivered_keys, mark_deliveries, prune_reminder_deliveries, record_deliveries
+)
 import asyncio
-import pytz
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Los recordatorios que vencen en la misma ventana se envían en un solo lote;
+# coincide con la frecuencia de check_reminders
+REMINDER_WINDOW = timedelta(seconds=60)
+# Antelación máxima de un recordatorio respecto al inicio del evento
+REMINDER_LOOKAHEAD = timedelta(hours=1)
+
+
+def reminder_window_start(value):
+    """Inicio de la ventana de recordatorios que contiene `value`"""
+    seconds = int(REMINDER_WINDOW.total_seconds())
+    return value.replace(microsecond=0) - timedelta(seconds=(value.minute * 60 + value.second) % seconds)
+
 class NotificationScheduler:
-    def __init__(self, app_context):
+    def __init__(self, app_context, scheduler=None, loop=None):
+        """Con `loop` (proceso worker) los envíos a Telegram se ejecutan en ese
+        event loop, el mismo del bot; sin él cada envío crea su propio loop."""
         self.app_context = app_context
-        self.scheduler = BackgroundScheduler()
+        self.loop = loop
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        # Fin de la última ventana de recordatorios enviada
+        self._reminders_sent_until = None
+        self._reminders_lock = threading.Lock()
+        # Hilo propio para guardar los resultados de los envíos: el executor
+        # por defecto del loop se cierra al apagar antes de esperar los envíos
+        self._results_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reminder-results')
+        self.scheduler = scheduler or BackgroundScheduler()
+        instrument_scheduler(self.scheduler)
         self.scheduler.start()
         logger.info("Scheduler iniciado")
         
@@ -54,70 +94,277 @@ class NotificationScheduler:
             replace_existing=True
         )
         
+        # Mover eventos eliminados y antiguos a events_archive
+        self.scheduler.add_job(
+            func=self.archive_old_events,
+            trigger=CronTrigger(hour=0, minute=30, second=0),  # Después de la limpieza
+            id='archive_events',
+            name='Archivar eventos inactivos',
+            replace_existing=True
+        )
+        
+        # VACUUM/ANALYZE semanal para recuperar el espacio archivado
+        self.scheduler.add_job(
+            func=self.run_database_maintenance,
+            trigger=CronTrigger(day_of_week='sun', hour=3, minute=0, second=0),
+            id='database_maintenance',
+            name='Mantenimiento de base de datos',
+            replace_existing=True
+        )
+        
         logger.info("Tareas recurrentes programadas")
     
     def check_event_reminders(self):
         """Verificar y enviar recordatorios de eventos próximos"""
         try:
-            with self.app_context():
+            with self.app_context(), query_scope('job:check_event_reminders'):
                 logger.info("Verificando recordatorios de eventos...")
                 
-                # Obtener la hora actual
-                now = datetime.utcnow()
-                
-                # Buscar eventos que necesitan recordatorio en los próximos 60 minutos
-                upcoming_events = Event.query.filter(
-                    Event.is_active == True,
-                    Event.start_time > now,
-                    Event.start_time <= now + timedelta(hours=1)
-                ).all()
-                
-                for event in upcoming_events:
-                    # Calcular cuándo enviar el recordatorio
-                    reminder_time = event.start_time - timedelta(minutes=event.reminder_minutes)
-                    
-                    # Si es hora de enviar el recordatorio (con margen de 1 minuto)
-                    if abs((reminder_time - now).total_seconds()) <= 60:
-                        self.send_event_reminder(event)
+                # Recordatorios que vencen antes de la próxima comprobación
+                window_start = reminder_window_start(utcnow())
+                self.send_reminder_batch(window_start, window_start + REMINDER_WINDOW)
                         
         except Exception as e:
             logger.error(f"Error verificando recordatorios: {e}")
     
-    def send_event_reminder(self, event):
-        """Enviar recordatorio de un evento específico"""
+    def pending_reminder_window(self, start, end):
+        """Parte de [start, end) cuyos recordatorios aún no se enviaron.
+
+        Las ventanas ya enviadas se recortan; si la comprobación anterior se
+        retrasó o falló, la ventana empieza donde terminó la última enviada.
+        Una ventana que aún no ha empezado no se procesa.
+        """
+        if start > utcnow():
+            return None
+        if self._reminders_sent_until is not None:
+            start = self._reminders_sent_until
+        if start >= end:
+            return None
+        return start, end
+    
+    def load_reminder_batch(self, start, end, digest_window=REMINDER_WINDOW):
+        """Recordatorios que vencen en [start, end), agrupados por usuario.
+
+        A quien tiene alguno se le adelantan en el mismo mensaje los que le
+        vencen antes de start + digest_window. Tres consultas: eventos, envíos
+        ya registrados y destinatarios.
+        """
+        now = utcnow()
+        digest_end = max(end, start + min(digest_window, REMINDER_LOOKAHEAD))
+        rows = db.session.execute(select_events(
+            Event.is_active == True,
+            Event.start_time > max(start, now),
+            Event.start_time <= digest_end + REMINDER_LOOKAHEAD
+        )).all()
+        
+        candidates = {}
+        for row in rows:
+            due_at = row.start_time - timedelta(minutes=row.reminder_minutes or 0)
+            if start <= due_at < digest_end:
+                candidates.setdefault(row.user_id, []).append((due_at, row))
+        # Solo se adelantan recordatorios a quien ya tiene alguno que vence ahora
+        candidates = {
+            user_id: items for user_id, items in candidates.items()
+            if any(due_at < end for due_at, _ in items)
+        }
+        if not candidates:
+            return []
+        
+        # Los adelantados en un mensaje anterior ya tienen su envío registrado
+        delivered = delivered_keys((row.id, due_at) for items in candidates.values() for due_at, row in items)
+        if delivered:
+            candidates = {
+                user_id: [(due_at, row) for due_at, row in items if (row.id, due_at) not in delivered]
+                for user_id, items in candidates.items()
+            }
+            candidates = {
+                user_id: items for user_id, items in candidates.items()
+                if any(due_at < end for due_at, _ in items)
+            }
+            if not candidates:
+                return []
+        
+        recipients = {
+            user_id: (chat_id, timezone)
+            for user_id, chat_id, timezone in db.session.execute(
+                db.select(UserSettings.user_id, UserSettings.telegram_chat_id, UserSettings.timezone).where(
+                    UserSettings.user_id.in_(set(candidates)),
+                    UserSettings.telegram_chat_id.isnot(None),
+                    UserSettings.notifications_enabled == True
+                )
+            )
+        }
+        
+        digests = []
+        for user_id, items in candidates.items():
+            if user_id not in recipients:
+                continue
+            chat_id, timezone = recipients[user_id]
+            # Copia de los datos: el envío ocurre fuera de esta sesión
+            reminders = [
+                SimpleNamespace(
+                    id=row.id,
+                    title=row.title,
+                    description=row.description,
+                    start_time=row.start_time,
+                    reminder_minutes=row.reminder_minutes,
+                    category_name=row.category_name,
+                    due_at=due_at
+                )
+                for due_at, row in items
+            ]
+            digests.append(SimpleNamespace(user_id=user_id, chat_id=chat_id, timezone=timezone, reminders=reminders))
+        return digests
+    
+    def send_reminder_batch(self, start, end):
+        """Enviar juntos todos los recordatorios que vencen en [start, end).
+
+        Los de un mismo usuario van en un único mensaje; cada evento conserva
+        su propio estado de envío en reminder_deliveries.
+        """
         try:
-            with self.app_context():
-                # Obtener configuraciones del usuario
-                settings = UserSettings.query.filter_by(user_id=event.user_id).first()
-                
-                if not settings or not settings.telegram_chat_id or not settings.notifications_enabled:
-                    logger.info(f"Usuario {event.user_id} no tiene Telegram configurado o notificaciones desactivadas")
-                    return
+            # La ventana solo se da por enviada cuando sus envíos quedaron
+            # registrados: si falta el bot o falla la base de datos, la
+            # siguiente comprobación vuelve a intentarlo desde aquí
+            with self.app_context(), self._reminders_lock:
+                window = self.pending_reminder_window(start, end)
+                if window is None:
+                    return 0
                 
-                # Obtener bot de Telegram
                 bot = get_telegram_bot()
                 if not bot:
-                    logger.error("Bot de Telegram no disponible")
-                    return
+                    logger.error("Bot de Telegram no disponible; los recordatorios quedan pendientes")
+                    return 0
+                
+                digest_window = timedelta(seconds=current_app.config.get(
+                    'REMINDER_DIGEST_WINDOW_SECONDS', REMINDER_WINDOW.total_seconds()
+                ))
+                digests = self.load_reminder_batch(*window, digest_window)
+                if digests:
+                    submit_write(record_deliveries, [
+                        (reminder.id, digest.user_id, reminder.due_at, len(digest.reminders))
+                        for digest in digests for reminder in digest.reminders
+                    ]).result()
+                self._reminders_sent_until = window[1]
+                if not digests:
+                    return 0
+                
+                count = sum(len(digest.reminders) for digest in digests)
+                self.dispatch_batch(
+                    [
+                        bot.send_reminder(digest.chat_id, digest.reminders[0], digest.timezone)
+                        if len(digest.reminders) == 1 else
+                        bot.send_reminder_digest(digest.chat_id, digest.reminders, digest.timezone)
+                        for digest in digests
+                    ],
+                    f"{count} recordatorios enviados en {len(digests)} mensajes "
+                    f"({window[0]:%H:%M:%S}-{window[1]:%H:%M:%S})",
+                    on_results=lambda results: self.record_delivery_results(digests, results)
+                )
+                return count
                 
-                # Enviar recordatorio
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(
-                        bot.send_reminder(settings.telegram_chat_id, event)
-                    )
-                    logger.info(f"Recordatorio enviado para evento {event.id}")
-                finally:
-                    loop.close()
-                    
         except Exception as e:
-            logger.error(f"Error enviando recordatorio para evento {event.id}: {e}")
+            logger.error(f"Error enviando recordatorios de {start} a {end}: {e}")
+            return 0
     
+    def record_delivery_results(self, digests, results):
+        """Marcar cada recordatorio como enviado o fallido según su mensaje"""
+        sent = []
+        failed = {}
+        for digest, result in zip(digests, results):
+            keys = [(reminder.id, reminder.due_at) for reminder in digest.reminders]
+            if isinstance(result, Exception):
+                failed.setdefault(str(result) or type(result).__name__, []).extend(keys)
+            elif result is False:
+                failed.setdefault('El bot no pudo enviar el mensaje', []).extend(keys)
+            else:
+                sent.extend(keys)
+        
+        def log_error(future):
+            if future.exception() is not None:
+                logger.error(f"Error guardando el estado de los recordatorios: {future.exception()}")
+        
+        # Se llama desde un hilo aparte (ver dispatch_batch): sin cola de
+        # escritura, submit_write confirma aquí mismo sin tocar el loop del bot
+        with self.app_context():
+            writes = [submit_write(mark_deliveries, sent, SENT)] if sent else []
+            writes += [submit_write(mark_deliveries, keys, FAILED, error) for error, keys in failed.items()]
+        for write in writes:
+            write.add_done_callback(log_error)
+    
+    def dispatch_send(self, coro, description):
+        """Enviar un mensaje de Telegram desde un job.
+
+        En el worker se programa en el loop del bot y se registra para poder
+        esperarlo al apagar; en los demás procesos se ejecuta en un loop propio.
+        """
+        if self.loop is None:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(coro)
+                logger.info(description)
+            finally:
+                loop.close()
+            return None
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        with self._in_flight_lock:
+            self._in_flight.add(future)
+
+        def done(f):
+            with self._in_flight_lock:
+                self._in_flight.discard(f)
+            if f.cancelled():
+                logger.warning(f"Envío cancelado: {description}")
+            elif f.exception() is not None:
+                logger.error(f"Error en envío ({description}): {f.exception()}")
+            else:
+                logger.info(description)
+
+        future.add_done_callback(done)
+        return future
+
+    def dispatch_batch(self, coros, description, on_results=None):
+        """Enviar varios mensajes a la vez como un único envío (un solo loop o future).
+
+        `on_results` recibe el resultado (o la excepción) de cada mensaje y se
+        ejecuta en un hilo aparte, nunca en el propio loop.
+        """
+        async def send_all():
+            results = await asyncio.gather(*coros, return_exceptions=True)
+            failed = [result for result in results if isinstance(result, Exception) or result is False]
+            for error in failed:
+                if isinstance(error, Exception):
+                    logger.error(f"Error en envío ({description}): {error}")
+            if failed:
+                logger.warning(f"{len(failed)} de {len(results)} envíos fallaron")
+            if on_results:
+                # Fuera del loop: sin cola de escritura (PostgreSQL) el callback
+                # confirma en la base de datos y bloquearía al bot
+                await asyncio.get_running_loop().run_in_executor(self._results_executor, on_results, results)
+        
+        return self.dispatch_send(send_all(), description)
+
+    def in_flight_count(self):
+        return len(self._in_flight)
+
+    async def drain(self, timeout=30):
+        """Esperar los envíos pendientes (apagado ordenado del worker)"""
+        with self._in_flight_lock:
+            pending = [asyncio.wrap_future(future) for future in self._in_flight]
+        if not pending:
+            return 0
+        logger.info(f"Esperando {len(pending)} envíos pendientes...")
+        done, not_done = await asyncio.wait(pending, timeout=timeout)
+        if not_done:
+            logger.warning(f"{len(not_done)} envíos no terminaron en {timeout}s")
+        return len(done)
+
     def send_daily_summaries(self):
         """Enviar resúmenes diarios a usuarios que lo tengan activado"""
         try:
-            with self.app_context():
+            with self.app_context(), query_scope('job:send_daily_summaries'):
                 logger.info("Enviando resúmenes diarios...")
                 
                 # Obtener usuarios con resumen diario activado
@@ -136,17 +383,11 @@ class NotificationScheduler:
         """Enviar resumen diario a un usuario específico"""
         try:
             with self.app_context():
-                # Obtener eventos del día
-                today = datetime.now().date()
-                start_of_day = datetime.combine(today, datetime.min.time())
-                end_of_day = datetime.combine(today, datetime.max.time())
+                # Obtener eventos del día según la zona horaria del usuario
+                today = local_today(settings.timezone)
+                start_of_day, end_of_day = local_day_bounds_utc(settings.timezone, today)
                 
-                events = Event.query.filter(
-                    Event.user_id == settings.user_id,
-                    Event.is_active == True,
-                    Event.start_time >= start_of_day,
-                    Event.start_time <= end_of_day
-                ).order_by(Event.start_time).all()
+                events = list_agenda(settings.user_id, start_of_day, end_of_day)
                 
                 # Obtener bot de Telegram
                 bot = get_telegram_bot()
@@ -155,15 +396,10 @@ class NotificationScheduler:
                     return
                 
                 # Enviar resumen
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(
-                        bot.send_daily_summary(settings.telegram_chat_id, events)
-                    )
-                    logger.info(f"Resumen diario enviado a usuario {settings.user_id}")
-                finally:
-                    loop.close()
+                self.dispatch_send(
+                    bot.send_daily_summary(settings.telegram_chat_id, events, settings.timezone),
+                    f"Resumen diario enviado a usuario {settings.user_id}"
+                )
                     
         except Exception as e:
             logger.error(f"Error enviando resumen diario a usuario {settings.user_id}: {e}")
@@ -171,63 +407,77 @@ class NotificationScheduler:
     def cleanup_old_events(self):
         """Limpiar eventos antiguos (soft delete de eventos de más de 30 días)"""
         try:
-            with self.app_context():
+            with self.app_context(), query_scope('job:cleanup_old_events'):
                 logger.info("Limpiando eventos antiguos...")
                 
-                # Fecha límite (30 días atrás)
-                cutoff_date = datetime.utcnow() - timedelta(days=30)
-                
-                # Marcar eventos antiguos como inactivos
-                old_events = Event.query.filter(
-                    Event.end_time < cutoff_date,
-                    Event.is_active == True
-                ).all()
+                # La escritura masiva pasa por la cola de escritura única
+                cleaned = submit_write(self.deactivate_old_events).result()
                 
-                for event in old_events:
-                    event.is_active = False
-                
-                if old_events:
-                    db.session.commit()
-                    logger.info(f"Marcados {len(old_events)} eventos como inactivos")
+                if cleaned:
+                    logger.info(f"Marcados {cleaned} eventos como inactivos")
                 else:
                     logger.info("No hay eventos antiguos para limpiar")
                     
         except Exception as e:
             logger.error(f"Error limpiando eventos antiguos: {e}")
-            db.session.rollback()
     
-    def schedule_event_reminder(self, event):
-        """Programar recordatorio para un evento específico"""
+    def deactivate_old_events(self):
+        """Marcar como inactivos los eventos terminados hace más de 30 días"""
+        # Fecha límite (30 días atrás)
+        cutoff_date = utcnow() - timedelta(days=30)
+        
+        # Marcar eventos antiguos como inactivos
+        old_events = Event.query.filter(
+            Event.end_time < cutoff_date,
+            Event.is_active == True
+        ).all()
+        
+        events_by_user = {}
+        for event in old_events:
+            events_by_user.setdefault(event.user_id, []).append(event)
+        
+        for user_id, events in events_by_user.items():
+            record_event_changes(user_id, [(event_state(event), None) for event in events])
+            record_changes(user_id, EVENT, [event.id for event in events], DELETE)
+            for event in events:
+                event.is_active = False
+        
+        if old_events:
+            db.session.commit()
+            for event in old_events:
+                event_index.sync_event(event)
+        
+        return len(old_events)
+    
+    def archive_old_events(self):
+        """Archivar eventos inactivos y eventos terminados hace tiempo"""
         try:
-            reminder_time = event.start_time - timedelta(minutes=event.reminder_minutes)
-            
-            # Solo programar si el recordatorio es en el futuro
-            if reminder_time > datetime.utcnow():
-                job_id = f"reminder_{event.id}"
+            with self.app_context():
+                logger.info("Archivando eventos...")
                 
-                self.scheduler.add_job(
-                    func=self.send_event_reminder,
-                    trigger=DateTrigger(run_date=reminder_time),
-                    args=[event],
-                    id=job_id,
-                    name=f'Recordatorio para evento {event.id}',
-                    replace_existing=True
-                )
+                archive_after_days = int(os.environ.get('EVENT_ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS))
+                archived = submit_write(archive_events, archive_after_days).result()
+                
+                logger.info(f"Archivados {archived} eventos")
                 
-                logger.info(f"Recordatorio programado para evento {event.id} a las {reminder_time}")
+                retention_days = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+                submit_write(prune_change_log, retention_days).result()
+                
+                delivery_retention_days = int(os.environ.get(
+                    'REMINDER_DELIVERY_RETENTION_DAYS', DEFAULT_DELIVERY_RETENTION_DAYS
+                ))
+                submit_write(prune_reminder_deliveries, delivery_retention_days).result()
                 
         except Exception as e:
-            logger.error(f"Error programando recordatorio para evento {event.id}: {e}")
+            logger.error(f"Error archivando eventos: {e}")
     
-    def cancel_event_reminder(self, event_id):
-        """Cancelar recordatorio de un evento"""
+    def run_database_maintenance(self):
+        """Ejecutar VACUUM/ANALYZE"""
         try:
-            job_id = f"reminder_{event_id}"
-            if self.scheduler.get_job(job_id):
-                self.scheduler.remove_job(job_id)
-                logger.info(f"Recordatorio cancelado para evento {event_id}")
+            with self.app_context():
+                submit_write(maintain_database).result()
         except Exception as e:
-            logger.error(f"Error cancelando recordatorio para evento {event_id}: {e}")
+            logger.error(f"Error en mantenimiento de base de datos: {e}")
     
     def reschedule_user_daily_summary(self, user_id, summary_time):
         """Reprogramar resumen diario para un usuario específico"""
@@ -297,10 +547,10 @@ class NotificationScheduler:
 # Instancia global del scheduler
 notification_scheduler = None
 
-def init_scheduler(app_context):
+def init_scheduler(app_context, scheduler=None, loop=None):
     """Inicializar el scheduler de notificaciones"""
     global notification_scheduler
-    notification_scheduler = NotificationScheduler(app_context)
+    notification_scheduler = NotificationScheduler(app_context, scheduler, loop)
     return notification_scheduler
 
 def get_scheduler():
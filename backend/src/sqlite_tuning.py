@@ -0,0 +1,37 @@
+import logging
+from sqlalchemy import event
+from models.user import db
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def init_sqlite_tuning(app):
+    """Aplicar el perfil SQLITE_PRAGMAS (ver config.py) a cada conexión nueva si la base es SQLite"""
+    pragmas = dict(app.config.get('SQLITE_PRAGMAS') or {})
+    if not pragmas:
+        return None
+
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != 'sqlite':
+            return None
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, pragmas)
+
+        # Las conexiones que ya estuvieran abiertas no recibieron el perfil
+        engine.dispose()
+
+    logger.info(f"Perfil SQLite aplicado: {pragmas}")
+    return pragmas
@@ -0,0 +1,121 @@
+import importlib.abc
+import sys
+import time
+from contextlib import contextmanager
+
+# Módulos que se muestran en el informe (los de mayor tiempo propio)
+DEFAULT_TOP_MODULES = 25
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Envuelve el loader real para medir la ejecución del módulo"""
+
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profiler._enter_module()
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler._exit_module(module.__name__, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Primer finder de sys.meta_path: delega en los demás y envuelve el loader"""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self.profiler)
+                return spec
+        return None
+
+
+class StartupProfiler:
+    """Tiempos de arranque: importación de cada módulo y pasos de inicialización.
+
+    Solo mide lo que se importa después de start(); el informe separa el
+    tiempo propio de cada módulo del tiempo de los módulos que importa.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.modules = {}  # nombre -> (tiempo propio, tiempo total)
+        self.steps = []  # (nombre, segundos) en orden de ejecución
+        self._finder = _TimingFinder(self)
+        self._children = []  # tiempo de hijos acumulado por nivel de anidamiento
+        self._started = None
+
+    def start(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._started = time.perf_counter()
+        sys.meta_path.insert(0, self._finder)
+
+    def stop(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self.enabled = False
+
+    def _enter_module(self):
+        self._children.append(0.0)
+
+    def _exit_module(self, name, elapsed):
+        children = self._children.pop()
+        self.modules[name] = (elapsed - children, elapsed)
+        if self._children:
+            self._children[-1] += elapsed
+
+    @contextmanager
+    def step(self, name):
+        """Medir un paso de inicialización (sin coste si no está activo)"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - started))
+
+    def report(self, top=DEFAULT_TOP_MODULES):
+        total = time.perf_counter() - self._started if self._started else 0
+        import_total = sum(own for own, _ in self.modules.values())
+
+        lines = [f"⏱️  Arranque: {total * 1000:.0f} ms ({len(self.modules)} módulos importados, {import_total * 1000:.0f} ms)"]
+        lines.append("")
+        lines.append("Pasos de inicialización:")
+        for name, elapsed in self.steps:
+            lines.append(f"  {elapsed * 1000:8.1f} ms  {name}")
+
+        lines.append("")
+        lines.append("Módulos más lentos (propio / acumulado):")
+        ranked = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (own, cumulative) in ranked[:top]:
+            lines.append(f"  {own * 1000:8.1f} ms  {cumulative * 1000:8.1f} ms  {name}")
+        return "\n".join(lines)
+
+
+# Instancia global: create_app marca sus pasos aunque no se esté perfilando
+startup_profiler = StartupProfiler()
+
+
+def step(name):
+    return startup_profiler.step(name)
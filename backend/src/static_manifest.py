@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # Sin Brotli solo se generan variantes .gz
+    brotli = None
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Los archivos con hash en el nombre nunca cambian: se pueden cachear un año
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# index.html y los nombres sin hash se revalidan siempre con el ETag
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.html', '.json', '.svg', '.txt', '.map'}
+MIN_COMPRESS_SIZE = 256
+
+# Referencias locales en index.html (href="css/style.css", src="js/main.js")
+ASSET_REFERENCE_RE = re.compile(r'(?P<attr>href|src)="(?P<path>[^":#?]+)"')
+
+
+class StaticAsset:
+    """Archivo estático cargado en memoria con sus variantes comprimidas"""
+
+    def __init__(self, path, data, hashed_path=None):
+        self.path = path
+        self.hashed_path = hashed_path
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.variants = {}
+        self.set_data(data)
+
+    def set_data(self, data):
+        self.data = data
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.variants = {}
+        self.compressible = (
+            os.path.splitext(self.path)[1] in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_SIZE
+        )
+
+    def encodings(self):
+        """Codificaciones que se pueden servir (ya generadas o generables)"""
+        encodings = set(self.variants)
+        if self.compressible:
+            encodings.add('gzip')
+            if brotli is not None:
+                encodings.add('br')
+        return encodings
+
+    def variant(self, encoding):
+        """Variante comprimida; se genera la primera vez que se pide.
+
+        Brotli al nivel 11 es lento: comprimir todo al arrancar retrasaba
+        cada worker web aunque nunca sirviera ese archivo.
+        """
+        body = self.variants.get(encoding)
+        if body is None:
+            if encoding == 'br':
+                body = brotli.compress(self.data, quality=11)
+            else:
+                body = gzip.compress(self.data, compresslevel=9, mtime=0)
+            self.variants[encoding] = body
+        return body
+
+    def etag(self, encoding=None):
+        return f"{self.digest[:16]}-{encoding}" if encoding else self.digest[:16]
+
+
+class StaticManifest:
+    """Índice en memoria de la carpeta static construido al arrancar.
+
+    Resuelve cada ruta con un diccionario en lugar de consultar el sistema
+    de archivos, publica los assets con nombres con hash y sirve las
+    variantes .gz/.br (generadas de antemano o al primer uso).
+    """
+
+    def __init__(self, static_folder, auto_reload=False):
+        self.static_folder = static_folder
+        self.auto_reload = auto_reload
+        self.assets = {}
+        self.hashed = {}
+        self.build()
+
+    def build(self):
+        assets = {}
+        hashed = {}
+
+        if self.static_folder and os.path.isdir(self.static_folder):
+            for root, _, files in os.walk(self.static_folder):
+                for filename in files:
+                    if filename.endswith(('.gz', '.br')):
+                        continue
+                    full_path = os.path.join(root, filename)
+                    path = os.path.relpath(full_path, self.static_folder).replace(os.sep, '/')
+                    with open(full_path, 'rb') as f:
+                        asset = StaticAsset(path, f.read())
+                    self._load_precompressed(asset, full_path)
+                    assets[path] = asset
+
+        for path, asset in assets.items():
+            if path == 'index.html':
+                continue
+            base, extension = os.path.splitext(path)
+            asset.hashed_path = f"{base}.{asset.digest[:12]}{extension}"
+            hashed[asset.hashed_path] = asset
+
+        index = assets.get('index.html')
+        if index:
+            index.set_data(self._rewrite_references(index.data, assets))
+
+        self.assets = assets
+        self.hashed = hashed
+        logger.info(f"Manifiesto estático construido: {len(assets)} archivos")
+
+    def _load_precompressed(self, asset, full_path):
+        """Preferir variantes .gz/.br ya generadas junto al archivo original"""
+        for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+            if os.path.exists(full_path + suffix):
+                with open(full_path + suffix, 'rb') as f:
+                    asset.variants[encoding] = f.read()
+
+    def _rewrite_references(self, html, assets):
+        """Apuntar index.html a los nombres con hash de sus assets"""
+        def replace(match):
+            path = match.group('path')
+            asset = assets.get(path.lstrip('/'))
+            if not asset or not asset.hashed_path:
+                return match.group(0)
+            prefix = '/' if path.startswith('/') else ''
+            return f'{match.group("attr")}="{prefix}{asset.hashed_path}"'
+
+        return ASSET_REFERENCE_RE.sub(replace, html.decode('utf-8')).encode('utf-8')
+
+    def manifest(self):
+        """Mapa nombre original -> nombre con hash"""
+        return {path: asset.hashed_path for path, asset in self.assets.items() if asset.hashed_path}
+
+    def lookup(self, path):
+        """Devolver (asset, inmutable) o (None, False)"""
+        asset = self.hashed.get(path)
+        if asset:
+            return asset, True
+        return self.assets.get(path), False
+
+    def serve(self, path):
+        """Servir una ruta del frontend; las desconocidas devuelven index.html"""
+        asset, immutable = self.lookup(path) if path else (None, False)
+
+        if asset is None:
+            if self.auto_reload:
+                self.build()
+            asset = self.assets.get('index.html')
+            if asset is None:
+                return "index.html not found", 404
+
+        return self._make_response(asset, immutable)
+
+    def _make_response(self, asset, immutable):
+        encoding = None
+        encodings = asset.encodings()
+        if encodings:
+            for candidate in ('br', 'gzip'):
+                if candidate in encodings and request.accept_encodings[candidate] > 0:
+                    encoding = candidate
+                    break
+
+        etag = asset.etag(encoding)
+        headers = {
+            'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            'ETag': f'"{etag}"',
+        }
+        if encodings:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+
+        body = asset.variant(encoding) if encoding else asset.data
+        if encoding:
+            headers['Content-Encoding'] = encoding
+
+        return Response(body, mimetype=asset.mimetype, headers=headers)
+
+
+def init_static_manifest(app):
+    """Construir el manifiesto de la carpeta static de la aplicación"""
+    manifest = StaticManifest(
+        app.static_folder,
+        auto_reload=app.config.get('STATIC_MANIFEST_AUTO_RELOAD', app.debug)
+    )
+    app.extensions['static_manifest'] = manifest
+    return manifest
@@ -1,12 +1,21 @@
 import os
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, TypeHandler, filters
 from models.user import db, User
 from models.event import UserSettings, Event
-from datetime import datetime, timedelta
+from interval_index import event_index
+from event_reads import list_agenda
+from write_queue import submit_write
+from cache import cache
+from calendar_summary import event_state, record_event_change
+from change_log import EVENT, record_change
+from timezones import format_local_many, local_day_bounds_utc, local_today, localize, zone_name
+from metrics import monitor_loop_lag, observe_update
+from query_stats import query_scope
+from clock import utcnow
+from datetime import timedelta
 import asyncio
-import dateparser  # ✅ AGREGADO PARA PROCESAMIENTO DE LENGUAJE NATURAL
 
 # Configurar logging
 logging.basicConfig(
@@ -14,11 +23,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class InstrumentedApplication(Application):
+    """Application que mide las consultas de cada update (ver query_stats.py)"""
+    
+    async def process_update(self, update):
+        with query_scope(f"bot:{update_label(update)}"):
+            await super().process_update(update)
+
+def update_label(update):
+    if not isinstance(update, Update):
+        return type(update).__name__
+    if update.callback_query:
+        return 'callback'
+    text = update.effective_message.text if update.effective_message else None
+    if text and text.startswith('/'):
+        return text.split()[0].split('@')[0]
+    return 'message'
+
 class TelegramBot:
     def __init__(self, token, app_context):
         self.token = token
         self.app_context = app_context
         self.application = None
+        self.lag_monitor = None
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /start - Inicializar bot"""
@@ -127,27 +154,21 @@ Para vincular tu cuenta:
                 )
                 return
             
-            # Obtener eventos de hoy
-            today = datetime.now().date()
-            start_of_day = datetime.combine(today, datetime.min.time())
-            end_of_day = datetime.combine(today, datetime.max.time())
+            # Obtener eventos de hoy según la zona horaria del usuario
+            today = local_today(settings.timezone)
+            start_of_day, end_of_day = local_day_bounds_utc(settings.timezone, today)
             
-            events = Event.query.filter(
-                Event.user_id == settings.user_id,
-                Event.is_active == True,
-                Event.start_time >= start_of_day,
-                Event.start_time <= end_of_day
-            ).order_by(Event.start_time).all()
+            events = list_agenda(settings.user_id, start_of_day, end_of_day)
             
             if not events:
                 await update.message.reply_text("📅 No tienes eventos programados para hoy.")
                 return
             
             message = "📅 **Eventos de hoy:**\n\n"
-            for event in events:
-                start_time = event.start_time.strftime("%H:%M")
-                end_time = event.end_time.strftime("%H:%M")
-                category_name = event.category.name if event.category else "Sin categoría"
+            start_times = format_local_many([event.start_time for event in events], settings.timezone)
+            end_times = format_local_many([event.end_time for event in events], settings.timezone)
+            for event, start_time, end_time in zip(events, start_times, end_times):
+                category_name = event.category_name or "Sin categoría"
                 
                 message += f"🕐 {start_time} - {end_time}\n"
                 message += f"📋 {event.title}\n"
@@ -171,27 +192,21 @@ Para vincular tu cuenta:
                 )
                 return
             
-            # Obtener eventos de mañana
-            tomorrow = datetime.now().date() + timedelta(days=1)
-            start_of_day = datetime.combine(tomorrow, datetime.min.time())
-            end_of_day = datetime.combine(tomorrow, datetime.max.time())
+            # Obtener eventos de mañana según la zona horaria del usuario
+            tomorrow = local_today(settings.timezone) + timedelta(days=1)
+            start_of_day, end_of_day = local_day_bounds_utc(settings.timezone, tomorrow)
             
-            events = Event.query.filter(
-                Event.user_id == settings.user_id,
-                Event.is_active == True,
-                Event.start_time >= start_of_day,
-                Event.start_time <= end_of_day
-            ).order_by(Event.start_time).all()
+            events = list_agenda(settings.user_id, start_of_day, end_of_day)
             
             if not events:
                 await update.message.reply_text("📅 No tienes eventos programados para mañana.")
                 return
             
             message = "📅 **Eventos de mañana:**\n\n"
-            for event in events:
-                start_time = event.start_time.strftime("%H:%M")
-                end_time = event.end_time.strftime("%H:%M")
-                category_name = event.category.name if event.category else "Sin categoría"
+            start_times = format_local_many([event.start_time for event in events], settings.timezone)
+            end_times = format_local_many([event.end_time for event in events], settings.timezone)
+            for event, start_time, end_time in zip(events, start_times, end_times):
+                category_name = event.category_name or "Sin categoría"
                 
                 message += f"🕐 {start_time} - {end_time}\n"
                 message += f"📋 {event.title}\n"
@@ -268,21 +283,20 @@ Para vincular tu cuenta:
             
             # Usar dateparser para el procesamiento de lenguaje natural en español
             from dateparser import parse
-            import pytz  # ✅ AGREGADO PARA CONVERSIÓN DE ZONAS HORARIAS
             
             # Usar la zona horaria del usuario para el parseo y preferir fechas futuras
-            settings_timezone = settings.timezone or 'UTC'
+            settings_timezone = zone_name(settings.timezone)
             
             try:
                 # 1. Intentar parsear fecha/hora
                 parsed_datetime_utc = parse(
                     text,
                     settings={
-                        'TIMEZONE': 'UTC', 
+                        'TIMEZONE': settings_timezone,
                         'TO_TIMEZONE': 'UTC',
                         'RETURN_AS_TIMEZONE_AWARE': True,
                         'PREFER_DATES_FROM': 'future',
-                        'RELATIVE_BASE': datetime.now(),
+                        'RELATIVE_BASE': localize(utcnow(), settings_timezone).replace(tzinfo=None),
                     },
                     languages=['es'] # Especificar español
                 )
@@ -302,32 +316,20 @@ Para vincular tu cuenta:
                 default_duration_minutes = 60 
                 end_time_utc = start_time_utc + timedelta(minutes=default_duration_minutes)
 
-                # 4. Crear y guardar evento
-                new_event = Event(
+                # 4. Crear y guardar evento (a través de la cola de escritura)
+                new_event = await asyncio.wrap_future(submit_write(
+                    create_event_from_message,
                     user_id=settings.user_id,
                     title=title,
                     description=f"Agregado desde Telegram - Chat ID: {chat_id}",
                     start_time=start_time_utc,
                     end_time=end_time_utc,
-                    reminder_minutes=settings.default_reminder_minutes,
-                    is_active=True
-                )
+                    reminder_minutes=settings.default_reminder_minutes
+                ))
                 
-                db.session.add(new_event)
-                db.session.commit()
-                
-                # 5. Usar pytz para mostrar la hora en la zona horaria del usuario
-                try:
-                    tz = pytz.timezone(settings.timezone)
-                    start_time_local = pytz.utc.localize(new_event.start_time).astimezone(tz)
-                    end_time_local = pytz.utc.localize(new_event.end_time).astimezone(tz)
-
-                    start_time_display = start_time_local.strftime("%Y-%m-%d %H:%M %Z")
-                    end_time_display = end_time_local.strftime("%Y-%m-%d %H:%M %Z")
-                except pytz.UnknownTimeZoneError:
-                    # Si hay un error con la zona horaria, volvemos a mostrar UTC
-                    start_time_display = new_event.start_time.strftime("%Y-%m-%d %H:%M UTC")
-                    end_time_display = new_event.end_time.strftime("%Y-%m-%d %H:%M UTC")
+                # 5. Mostrar la hora en la zona horaria del usuario (UTC si no se reconoce)
+                start_time_display = localize(new_event.start_time, settings_timezone).strftime("%Y-%m-%d %H:%M %Z")
+                end_time_display = localize(new_event.end_time, settings_timezone).strftime("%Y-%m-%d %H:%M %Z")
                 
                 # 6. Enviar confirmación con la hora en la zona horaria del usuario
                 message = f"""
@@ -364,6 +366,7 @@ Para vincular tu cuenta:
             if query.data == "toggle_notifications":
                 settings.notifications_enabled = not settings.notifications_enabled
                 db.session.commit()
+                cache.invalidate('settings', settings.user_id)
                 
                 status = "activadas" if settings.notifications_enabled else "desactivadas"
                 await query.edit_message_text(f"✅ Notificaciones {status}")
@@ -371,6 +374,7 @@ Para vincular tu cuenta:
             elif query.data == "toggle_daily_summary":
                 settings.daily_summary_enabled = not settings.daily_summary_enabled
                 db.session.commit()
+                cache.invalidate('settings', settings.user_id)
                 
                 status = "activado" if settings.daily_summary_enabled else "desactivado"
                 await query.edit_message_text(f"✅ Resumen diario {status}")
@@ -385,11 +389,11 @@ Para vincular tu cuenta:
                     "🌍 Para cambiar la zona horaria, ve a la configuración en la aplicación web."
                 )
     
-    async def send_reminder(self, chat_id, event):
-        """Enviar recordatorio de evento"""
+    async def send_reminder(self, chat_id, event, timezone='UTC'):
+        """Enviar recordatorio de evento; devuelve si se envió"""
         try:
-            start_time = event.start_time.strftime("%H:%M")
-            category_name = event.category.name if event.category else "Sin categoría"
+            start_time = format_local_many([event.start_time], timezone)[0]
+            category_name = event.category_name or "Sin categoría"
             
             message = f"""
 🔔 **Recordatorio de evento**
@@ -407,21 +411,47 @@ Para vincular tu cuenta:
                 text=message,
                 parse_mode='Markdown'
             )
+            return True
             
         except Exception as e:
             logger.error(f"Error enviando recordatorio: {e}")
+            return False
+    
+    async def send_reminder_digest(self, chat_id, events, timezone='UTC'):
+        """Enviar en un solo mensaje varios recordatorios próximos; devuelve si se envió"""
+        try:
+            start_times = format_local_many([event.start_time for event in events], timezone)
+            
+            message = f"🔔 **Recordatorio: {len(events)} eventos próximos**\n\n"
+            for event, start_time in zip(events, start_times):
+                category_name = event.category_name or "Sin categoría"
+                
+                message += f"🕐 {start_time}\n"
+                message += f"📋 {event.title}\n"
+                message += f"🏷️ {category_name}\n\n"
+            
+            await self.application.bot.send_message(
+                chat_id=chat_id,
+                text=message,
+                parse_mode='Markdown'
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error enviando resumen de recordatorios: {e}")
+            return False
     
-    async def send_daily_summary(self, chat_id, events):
+    async def send_daily_summary(self, chat_id, events, timezone='UTC'):
         """Enviar resumen diario"""
         try:
             if not events:
                 message = "📅 **Resumen del día**\n\nNo tienes eventos programados para hoy."
             else:
                 message = "📅 **Resumen del día**\n\n"
-                for event in events:
-                    start_time = event.start_time.strftime("%H:%M")
-                    end_time = event.end_time.strftime("%H:%M")
-                    category_name = event.category.name if event.category else "Sin categoría"
+                start_times = format_local_many([event.start_time for event in events], timezone)
+                end_times = format_local_many([event.end_time for event in events], timezone)
+                for event, start_time, end_time in zip(events, start_times, end_times):
+                    category_name = event.category_name or "Sin categoría"
                     
                     message += f"🕐 {start_time} - {end_time}\n"
                     message += f"📋 {event.title}\n"
@@ -438,6 +468,8 @@ Para vincular tu cuenta:
     
     def setup_handlers(self):
         """Configurar manejadores de comandos"""
+        # Grupo -1: se ejecuta para todos los updates sin interferir con el resto
+        self.application.add_handler(TypeHandler(Update, self.track_update), group=-1)
         self.application.add_handler(CommandHandler("start", self.start_command))
         self.application.add_handler(CommandHandler("help", self.help_command))
         self.application.add_handler(CommandHandler("status", self.status_command))
@@ -454,10 +486,15 @@ Para vincular tu cuenta:
             )
         )
     
+    async def track_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Medir el retraso de cada update antes de los demás handlers"""
+        message = update.effective_message
+        observe_update(message.date if message else None)
+    
     async def start_bot(self):
         """Iniciar el bot con POLLING"""
         try:
-            self.application = Application.builder().token(self.token).build()
+            self.application = Application.builder().token(self.token).application_class(InstrumentedApplication).build()
             self.setup_handlers()
             
             print("🔄 Iniciando bot de Telegram con polling...")
@@ -465,13 +502,17 @@ Para vincular tu cuenta:
             # 1. Inicializar la aplicación
             await self.application.initialize()
             
-            # 2. Iniciar el bot y el polling. Esto es suficiente.
+            # 2. Iniciar el procesamiento de updates y el polling
+            # (application.start() solo procesa la cola; el updater la llena)
             await self.application.start()
+            await self.application.updater.start_polling()
+            
+            # Temporizador que mide el retraso del loop (ver /metrics)
+            self.lag_monitor = asyncio.get_running_loop().create_task(monitor_loop_lag())
             
             # 3. MANTENER EL BUCLE DE EVENTOS CORRIENDO
-            # Nota: La función que envuelve este método (start_polling) 
-            # ya llama a loop.run_forever(), por lo que solo necesitamos 
-            # asegurarnos de que la aplicación esté arrancada.
+            # Nota: quien llama a este método mantiene el loop vivo
+            # (loop.run_forever() en el hilo de polling o el worker).
             
             print("✅ Bot de Telegram iniciado correctamente con polling")
             
@@ -479,21 +520,59 @@ Para vincular tu cuenta:
             print(f"❌ Error iniciando bot: {e}")
             raise
     
+    async def stop_intake(self):
+        """Dejar de pedir updates a Telegram (los ya recibidos se siguen procesando)"""
+        if self.application and self.application.updater and self.application.updater.running:
+            await self.application.updater.stop()
+    
     async def stop_bot(self):
         """Detener el bot"""
         try:
+            if self.lag_monitor:
+                self.lag_monitor.cancel()
             if self.application:
-                await self.application.stop()
+                await self.stop_intake()
+                if self.application.running:
+                    await self.application.stop()
                 await self.application.shutdown()
                 logger.info("Bot de Telegram detenido")
         except Exception as e:
             logger.error(f"Error deteniendo bot: {e}")
 
+def create_event_from_message(user_id, title, description, start_time, end_time, reminder_minutes):
+    """Guardar un evento creado desde un mensaje de Telegram.
+
+    Se ejecuta en la cola de escritura; el evento se devuelve desligado de la
+    sesión para que el handler pueda leerlo desde el hilo del bot.
+    """
+    event = Event(
+        user_id=user_id,
+        title=title,
+        description=description,
+        start_time=start_time,
+        end_time=end_time,
+        reminder_minutes=reminder_minutes,
+        is_active=True
+    )
+    
+    db.session.add(event)
+    db.session.flush()
+    record_event_change(user_id, None, event_state(event))
+    record_change(user_id, EVENT, event.id)
+    db.session.commit()
+    event_index.sync_event(event)
+    db.session.expunge(event)
+    return event
+
 # Instancia global del bot
 telegram_bot = None
 
-def init_telegram_bot(token, app_context):
-    """Inicializar el bot de Telegram con POLLING"""
+def init_telegram_bot(token, app_context, polling=True):
+    """Inicializar el bot de Telegram con POLLING.
+
+    Con polling=False solo se prepara el cliente para enviar mensajes
+    (recordatorios y resúmenes del scheduler) sin recibir actualizaciones.
+    """
     global telegram_bot
     
     if not token or token == 'test':
@@ -501,6 +580,12 @@ def init_telegram_bot(token, app_context):
         return None
     
     try:
+        if not polling:
+            telegram_bot = TelegramBot(token, app_context)
+            telegram_bot.application = Application.builder().token(token).build()
+            logger.info("Bot de Telegram configurado solo para envíos")
+            return telegram_bot
+        
         print("🤖 Iniciando bot de Telegram con polling...")
         telegram_bot = TelegramBot(token, app_context)
         
@@ -534,6 +619,12 @@ def init_telegram_bot(token, app_context):
         logger.error(f"Error iniciando bot de Telegram: {e}")
         return None
 
+def create_telegram_bot(token, app_context):
+    """Crear el bot sin arrancarlo (el worker lo inicia en su propio loop)"""
+    global telegram_bot
+    telegram_bot = TelegramBot(token, app_context)
+    return telegram_bot
+
 def get_telegram_bot():
     """Obtener la instancia del bot"""
     return telegram_bot
\ No newline at end of file
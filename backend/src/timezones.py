@@ -0,0 +1,135 @@
+import logging
+from bisect import bisect_right
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from clock import utcnow
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+UTC = timezone.utc
+ONE_DAY = timedelta(days=1)
+
+
+@lru_cache(maxsize=1)
+def tz_database_available():
+    """Comprobar (una vez por proceso) que zoneinfo encuentra la base de datos IANA.
+
+    En Windows no hay base de datos del sistema: sin el paquete tzdata todas
+    las zonas acabarían en UTC, así que se avisa como error y no por zona.
+    """
+    try:
+        ZoneInfo('Etc/UTC')
+        return True
+    except ZoneInfoNotFoundError:
+        logger.error("❌ zoneinfo no encuentra la base de datos de zonas horarias "
+                     "(¿falta el paquete tzdata?): todas las zonas se tratan como UTC")
+        return False
+
+
+@lru_cache(maxsize=512)
+def get_zone(name):
+    """ZoneInfo cacheado por nombre; las zonas desconocidas se tratan como UTC"""
+    if not name:
+        return UTC
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        if tz_database_available():
+            logger.warning(f"Zona horaria desconocida '{name}', se usa UTC")
+        return UTC
+
+
+def zone_name(name):
+    """Nombre válido de la zona (o 'UTC' si no se reconoce)"""
+    zone = get_zone(name)
+    return zone.key if isinstance(zone, ZoneInfo) else 'UTC'
+
+
+def _utc_offset(zone, value):
+    return value.replace(tzinfo=UTC).astimezone(zone).utcoffset()
+
+
+@lru_cache(maxsize=8192)
+def utc_day_offsets(name, utc_date):
+    """Tabla de desfases de un día UTC: [(inicio_utc, desfase), ...].
+
+    Casi todos los días tienen un solo tramo; los de cambio de horario
+    tienen dos, con el instante exacto del cambio buscado por bisección.
+    """
+    zone = get_zone(name)
+    start = datetime.combine(utc_date, time.min)
+    end = start + ONE_DAY
+    start_offset = _utc_offset(zone, start)
+    segments = [(start, start_offset)]
+
+    # Buscar cada cambio dentro del día (como mucho uno en la práctica)
+    low, offset = start, start_offset
+    while _utc_offset(zone, end - timedelta(seconds=1)) != offset:
+        high = end
+        while high - low > timedelta(seconds=1):
+            middle = low + (high - low) / 2
+            if _utc_offset(zone, middle) == offset:
+                low = middle
+            else:
+                high = middle
+        high = high.replace(microsecond=0)
+        offset = _utc_offset(zone, high)
+        segments.append((high, offset))
+        low = high
+
+    return tuple(segments)
+
+
+def _offset_for(name, value):
+    segments = utc_day_offsets(name, value.date())
+    if len(segments) == 1:
+        return segments[0][1]
+    starts = [segment[0] for segment in segments]
+    return segments[bisect_right(starts, value) - 1][1]
+
+
+def to_local(value, name):
+    """Convertir un datetime naive en UTC a la hora local naive de la zona"""
+    if value is None:
+        return None
+    return value + _offset_for(name, value)
+
+
+def to_local_many(values, name):
+    """Convertir una lista de datetimes naive UTC a hora local en una pasada"""
+    name = zone_name(name)
+    if name == 'UTC':
+        return list(values)
+    return [to_local(value, name) for value in values]
+
+
+def localize(value, name):
+    """Datetime naive UTC -> datetime con zona (para mostrar la abreviatura %Z)"""
+    return value.replace(tzinfo=UTC).astimezone(get_zone(name))
+
+
+def format_local_many(values, name, fmt='%H:%M'):
+    """Formatear una lista de datetimes naive UTC en hora local"""
+    local_values = to_local_many(values, name)
+    if fmt == '%H:%M':
+        return [f'{value.hour:02d}:{value.minute:02d}' for value in local_values]
+    return [value.strftime(fmt) for value in local_values]
+
+
+def local_today(name, now=None):
+    """Fecha actual en la zona del usuario"""
+    now = now or utcnow()
+    return to_local(now, zone_name(name)).date()
+
+
+def local_day_bounds_utc(name, day):
+    """Inicio y fin (exclusivo) del día local `day` expresados en UTC naive"""
+    zone = get_zone(name)
+
+    def midnight_utc(date):
+        local_midnight = datetime.combine(date, time.min, tzinfo=zone)
+        return local_midnight.astimezone(UTC).replace(tzinfo=None)
+
+    return midnight_utc(day), midnight_utc(day + ONE_DAY)
@@ -0,0 +1,96 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from models.user import db
+from query_stats import current_stats, use_stats
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+class WriteQueue:
+    """Ejecuta las escrituras de segundo plano (bot, scheduler, importaciones)
+    en un único hilo escritor, en orden de llegada.
+
+    SQLite admite un solo escritor a la vez: en lugar de que varios hilos
+    compitan por el lock y reintenten, las ráfagas se encolan y se aplican
+    una detrás de otra sin bloquear a los lectores.
+    """
+
+    def __init__(self, app_context):
+        self.app_context = app_context
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name='sqlite-writer', daemon=True)
+        self._thread.start()
+        logger.info("Cola de escritura iniciada")
+
+    def submit(self, func, *args, **kwargs):
+        """Encolar una escritura; devuelve un Future con su resultado"""
+        future = Future()
+        # Las consultas de la escritura cuentan en la petición que la encola
+        self._queue.put((func, args, kwargs, future, current_stats()))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Encolar una escritura y esperar su resultado"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+
+            func, args, kwargs, future, stats = item
+            if future.set_running_or_notify_cancel():
+                with self.app_context(), use_stats(stats):
+                    try:
+                        future.set_result(func(*args, **kwargs))
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.error(f"Error en escritura encolada {getattr(func, '__name__', func)}: {e}")
+                        future.set_exception(e)
+            self._queue.task_done()
+
+    def shutdown(self, wait=True):
+        """Terminar después de aplicar las escrituras ya encoladas"""
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+
+# Instancia global de la cola
+write_queue = None
+
+
+def init_write_queue(app):
+    """Inicializar la cola de escritura (solo hace falta con SQLite)"""
+    global write_queue
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return None
+    write_queue = WriteQueue(app.app_context)
+    return write_queue
+
+
+def get_write_queue():
+    """Obtener la instancia de la cola de escritura"""
+    return write_queue
+
+
+def submit_write(func, *args, **kwargs):
+    """Encolar una escritura, o ejecutarla directamente si no hay cola"""
+    if write_queue is None:
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            db.session.rollback()
+            future.set_exception(e)
+        return future
+    return write_queue.submit(func, *args, **kwargs)
@@ -0,0 +1,103 @@
+# backend/worker.py
+# Proceso worker: bot de Telegram, scheduler y envíos en un único event loop.
+#   cd backend && python -m worker
+# Sustituye a los roles bot + scheduler (un solo proceso en todo el despliegue);
+# los procesos web se lanzan aparte con wsgi.py.
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, 'src'))
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from app_factory import create_app
+from metrics import serve_metrics
+from scheduler import init_scheduler
+from telegram_bot import create_telegram_bot
+from write_queue import get_write_queue
+
+logger = logging.getLogger(__name__)
+
+# Tiempo máximo esperando jobs y envíos en curso al recibir SIGTERM
+DRAIN_TIMEOUT = int(os.environ.get('WORKER_DRAIN_TIMEOUT', 30))
+
+
+def telegram_token():
+    token = os.environ.get('TELEGRAM_BOT_TOKEN')
+    if not token or token in ('test', 'your-telegram-bot-token'):
+        return None
+    return token
+
+
+async def run_worker(app, drain_timeout=DRAIN_TIMEOUT):
+    """Arrancar bot y scheduler en el loop actual y esperar a SIGINT/SIGTERM"""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows (ProactorEventLoop): handler clásico que avisa al loop,
+            # así Ctrl+C sigue el mismo apagado ordenado
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+
+    telegram_bot = None
+    token = telegram_token()
+    if token:
+        telegram_bot = create_telegram_bot(token, app.app_context)
+        await telegram_bot.start_bot()
+    else:
+        print("⚠️  Telegram bot token no configurado")
+
+    # Los jobs (síncronos, con acceso a la base de datos) se ejecutan en el
+    # pool de hilos del loop; sus envíos vuelven a este loop
+    notification_scheduler = init_scheduler(
+        app.app_context,
+        scheduler=AsyncIOScheduler(event_loop=loop),
+        loop=loop
+    )
+    app.extensions['background'] = {'telegram_bot': telegram_bot, 'scheduler': notification_scheduler}
+
+    metrics_port = os.environ.get('METRICS_PORT')
+    metrics_server = serve_metrics(app, int(metrics_port)) if metrics_port else None
+
+    print("🔄 Worker en ejecución (Ctrl+C para detener)")
+    await stop.wait()
+    print("🛑 Deteniendo worker...")
+
+    # 1. No aceptar trabajo nuevo: ni updates de Telegram ni nuevos disparos
+    if telegram_bot:
+        await telegram_bot.stop_intake()
+    notification_scheduler.shutdown()
+
+    # 2. Esperar a los jobs que ya estaban ejecutándose y a sus envíos
+    try:
+        await asyncio.wait_for(loop.shutdown_default_executor(), drain_timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Jobs sin terminar tras {drain_timeout}s")
+    await notification_scheduler.drain(drain_timeout)
+
+    # 3. Terminar los handlers pendientes del bot y cerrar su conexión
+    if telegram_bot:
+        await telegram_bot.stop_bot()
+
+    if metrics_server:
+        metrics_server.shutdown()
+
+    # 4. Escrituras encoladas por los handlers y los jobs
+    write_queue = get_write_queue()
+    if write_queue:
+        write_queue.shutdown()
+    print("✅ Worker detenido")
+
+
+def main():
+    app = create_app('worker', os.environ.get('FLASK_CONFIG', 'production'))
+    asyncio.run(run_worker(app))
+
+
+if __name__ == '__main__':
+    main()
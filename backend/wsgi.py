@@ -0,0 +1,14 @@
+# backend/wsgi.py
+# Punto de entrada para servidores WSGI, p. ej.:
+#   gunicorn --workers 4 --chdir backend wsgi:app
+# Los workers web no arrancan el bot ni el scheduler; esos corren en un único
+# proceso aparte (python -m worker).
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(current_dir, 'src'))
+
+from app_factory import create_app
+
+app = create_app(os.environ.get('APP_ROLE', 'web'), os.environ.get('FLASK_CONFIG', 'production'))